@@ -0,0 +1,110 @@
+"""
+Activity Log Module - Append-only automation activity log in the state DB
+
+The Automation page's "Recent Activities" used to live in
+app_settings.json (automation_activities): every event loaded the whole
+settings file, prepended one entry and rewrote it, racing with settings
+saved from the UI. Activities are now single-row inserts into the
+automation_activities table; the latest N are read newest first by
+primary key. The table is a ring buffer of MAX_ACTIVITIES rows, trimmed
+every TRIM_EVERY inserts.
+
+Activities already stored in the settings file are imported once, the
+first time the table is used. Schedule run state (last_run/last_result)
+is kept in schedule_runs by scheduler_service.py.
+"""
+import logging
+import threading
+import time
+from datetime import datetime
+
+from . import state_db
+
+logger = logging.getLogger(__name__)
+
+MAX_ACTIVITIES = 500
+TRIM_EVERY = 50
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS automation_activities (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    title TEXT NOT NULL,
+    description TEXT NOT NULL DEFAULT '',
+    status TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+"""
+
+
+def _activity(row):
+    created = datetime.fromtimestamp(row['created_at'])
+    return {
+        'title': row['title'],
+        'description': row['description'],
+        'status': row['status'],
+        'time': created.strftime('%d %b %Y, %I:%M %p'),
+        'timestamp': created.isoformat(),
+    }
+
+
+class ActivityLog:
+    def __init__(self):
+        self._ready = False
+        self._ready_lock = threading.Lock()
+
+    def _ensure(self):
+        """Create the table and import the settings file's activities into an empty table, once per process."""
+        if self._ready:
+            return
+        with self._ready_lock:
+            if self._ready:
+                return
+            state_db.ensure_schema('automation_activities', SCHEMA)
+            with state_db.connect() as conn:
+                empty = conn.execute("SELECT 1 FROM automation_activities LIMIT 1").fetchone() is None
+            if empty:
+                self._import_legacy()
+            self._ready = True
+
+    def _import_legacy(self):
+        from . import utils
+
+        try:
+            legacy = utils.load_settings().get('automation_activities') or []
+        except Exception as e:
+            logger.warning(f"⚠️ Could not read legacy automation activities: {e}")
+            return
+        rows = []
+        for activity in reversed(legacy[:MAX_ACTIVITIES]):  # Stored newest first
+            try:
+                created_at = datetime.fromisoformat(activity['timestamp']).timestamp()
+            except (KeyError, TypeError, ValueError):
+                created_at = time.time()
+            rows.append((activity.get('title', ''), activity.get('description', ''),
+                         activity.get('status', 'success'), created_at))
+        if rows:
+            with state_db.connect() as conn:
+                conn.executemany("INSERT INTO automation_activities (title, description, status, created_at) "
+                                 "VALUES (?, ?, ?, ?)", rows)
+            logger.info(f"📋 Imported {len(rows)} automation activities from the settings file")
+
+    def add(self, title, description, status='success'):
+        """Append one activity; returns its id."""
+        self._ensure()
+        with state_db.connect() as conn:
+            cursor = conn.execute("INSERT INTO automation_activities (title, description, status, created_at) "
+                                  "VALUES (?, ?, ?, ?)", (title, description or '', status, time.time()))
+            activity_id = cursor.lastrowid
+            if activity_id % TRIM_EVERY == 0:
+                conn.execute("DELETE FROM automation_activities WHERE id <= ?", (activity_id - MAX_ACTIVITIES,))
+        return activity_id
+
+    def recent(self, limit=10):
+        """The latest `limit` activities, newest first, in the format the Automation page shows."""
+        self._ensure()
+        with state_db.connect() as conn:
+            rows = conn.execute("SELECT * FROM automation_activities ORDER BY id DESC LIMIT ?", (int(limit),)).fetchall()
+        return [_activity(row) for row in rows]
+
+
+activity_log = ActivityLog()
@@ -0,0 +1,177 @@
+"""
+Alerts Module - Trade alerts coalesced into one digest per evaluation cycle
+
+An evaluation pass (monitor_trades, check_and_auto_close_trades, the
+Active Trades refresh, an automation run) opens a cycle:
+
+    with alerts.cycle("P&L Monitor"):
+        ...
+        alerts.emit(alerts.TARGET_HIT, trade['id'], pnl, tag)
+
+Events emitted inside the cycle (target hits, stoploss hits, auto-closes,
+auto-adds) are collected and sent as a single Telegram digest when the
+cycle ends, split into several messages only if it exceeds Telegram's
+message size. emit() outside a cycle sends a one-event digest right away.
+
+An event for the same trade and kind is only ever sent once: the first
+send is recorded in the state DB, so a target hit seen again by the next
+monitor pass, or by another evaluation path, is dropped. Trade ids repeat
+when a trade is deleted and added again ({instrument}_{expiry}_{Entry}),
+so events are keyed by the trade's start_time too. An event is claimed
+before its digest is queued and released again if queueing fails, so it
+is retried by the next cycle instead of being lost.
+"""
+import contextvars
+import logging
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from . import state_db
+
+logger = logging.getLogger(__name__)
+
+TARGET_HIT, STOPLOSS_HIT, AUTO_CLOSED, AUTO_ADDED = 'target_hit', 'stoploss_hit', 'auto_closed', 'auto_added'
+
+EVENT_TITLES = {
+    TARGET_HIT: "✅ Target Hit",
+    STOPLOSS_HIT: "❌ Stoploss Hit",
+    AUTO_CLOSED: "🤖 Auto Closed",
+    AUTO_ADDED: "🆕 Auto Added",
+}
+
+MAX_DIGEST_LENGTH = 4000       # Below Telegram's 4096 character message limit
+DEDUPE_RETENTION_SECONDS = 30 * 24 * 3600
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS trade_alert_log (
+    trade_id TEXT NOT NULL,
+    started TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    sent_at REAL NOT NULL,
+    PRIMARY KEY (trade_id, started, kind)
+);
+"""
+
+_current_cycle = contextvars.ContextVar('alert_cycle', default=None)
+
+
+class AlertCycle:
+    def __init__(self, source):
+        self.source = source
+        self.events = []
+
+    def add(self, kind, trade_id, pnl=None, detail="", started=None):
+        self.events.append({'kind': kind, 'trade_id': trade_id, 'pnl': pnl, 'detail': detail,
+                            'started': started or ''})
+
+    def _claim_new(self):
+        """Events not sent before (recording them as sent); repeats within the cycle are dropped too."""
+        state_db.ensure_schema('trade_alert_log', SCHEMA)
+        now = time.time()
+        fresh = []
+        with state_db.connect() as conn:
+            conn.execute("DELETE FROM trade_alert_log WHERE sent_at < ?", (now - DEDUPE_RETENTION_SECONDS,))
+            for event in self.events:
+                cursor = conn.execute("INSERT OR IGNORE INTO trade_alert_log (trade_id, started, kind, sent_at) "
+                                      "VALUES (?, ?, ?, ?)", (event['trade_id'], event['started'], event['kind'], now))
+                if cursor.rowcount:
+                    fresh.append(event)
+        return fresh
+
+    def _release(self, events):
+        """Forget claimed events whose digest could not be queued, so a later cycle sends them."""
+        with state_db.connect() as conn:
+            conn.executemany("DELETE FROM trade_alert_log WHERE trade_id = ? AND started = ? AND kind = ?",
+                             [(e['trade_id'], e['started'], e['kind']) for e in events])
+
+    def digest(self, events):
+        """Digest messages for `events`, grouped by kind, each within MAX_DIGEST_LENGTH."""
+        by_kind = defaultdict(list)
+        for event in events:
+            by_kind[event['kind']].append(event)
+
+        lines = [f"🔔 *{self.source}* - {len(events)} alert{'s' if len(events) != 1 else ''}"]
+        for kind, title in EVENT_TITLES.items():
+            if not by_kind[kind]:
+                continue
+            lines.append("")
+            lines.append(f"{title} ({len(by_kind[kind])})")
+            for event in by_kind[kind]:
+                line = f"- `{event['trade_id']}`"
+                if event['detail']:
+                    line += f" {event['detail']}"
+                if event['pnl'] is not None:
+                    line += f": ₹{event['pnl']:,.2f}"
+                lines.append(line)
+        closed_pnl = [e['pnl'] for e in events if e['kind'] != AUTO_ADDED and e['pnl'] is not None]
+        if closed_pnl:
+            lines.append("")
+            lines.append(f"Total P/L: ₹{sum(closed_pnl):,.2f}")
+
+        messages, current = [], ""
+        for line in lines:
+            if current and len(current) + len(line) + 1 > MAX_DIGEST_LENGTH:
+                messages.append(current)
+                current = f"🔔 *{self.source}* (cont.)"
+            current = f"{current}\n{line}" if current else line
+        messages.append(current)
+        return messages
+
+    def flush(self):
+        """Send the digest of this cycle's new events; returns how many events were sent."""
+        from . import utils
+
+        if not self.events:
+            return 0
+        try:
+            events = self._claim_new()
+        except Exception as e:
+            logger.warning(f"⚠️ Alert dedupe unavailable, sending all {len(self.events)} events: {e}")
+            events = self.events
+        skipped = len(self.events) - len(events)
+        self.events = []
+        if skipped:
+            logger.info(f"🔕 {self.source}: {skipped} repeat alert(s) suppressed")
+        if not events:
+            return 0
+        queued = [utils.queue_telegram_message(message)[1] is not None for message in self.digest(events)]
+        if not all(queued):
+            # Part of a split digest may be out already; resending it beats losing the rest
+            self._release(events)
+            logger.warning(f"⚠️ {self.source}: alert digest not queued, {len(events)} alert(s) kept for the next cycle")
+            return 0
+        logger.info(f"🔔 {self.source}: sent digest of {len(events)} alert(s)")
+        return len(events)
+
+
+@contextmanager
+def cycle(source):
+    """Collect emit() calls made inside the block and send them as one digest at the end."""
+    if _current_cycle.get() is not None:
+        yield _current_cycle.get()  # Nested pass: events go to the outer cycle's digest
+        return
+    alert_cycle = AlertCycle(source)
+    token = _current_cycle.set(alert_cycle)
+    try:
+        yield alert_cycle
+    finally:
+        _current_cycle.reset(token)
+        try:
+            alert_cycle.flush()
+        except Exception as e:
+            logger.error(f"❌ Failed to send {source} alert digest: {e}")
+
+
+def emit(kind, trade_id, pnl=None, detail="", source="Trade Alert", started=None):
+    """
+    Add an event to the current cycle, or send it on its own when there is none.
+    `started` is the trade's start_time, telling apart trades that reuse an id.
+    """
+    alert_cycle = _current_cycle.get()
+    if alert_cycle is not None:
+        alert_cycle.add(kind, trade_id, pnl, detail, started)
+        return
+    single = AlertCycle(source)
+    single.add(kind, trade_id, pnl, detail, started)
+    single.flush()
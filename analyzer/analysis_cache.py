@@ -0,0 +1,152 @@
+"""
+Analysis Cache Module - Memoized analysis results keyed by input fingerprint
+
+An analysis is fully determined by its inputs: instrument, calc type and
+expiry, the supply/demand zones, the option chain snapshot, the lot size,
+the strike selection config and the trading day (the payoff chart's
+days-to-expiry curve). generate_analysis fingerprints those inputs once
+the zones and chain are known and returns the stored analysis_data (and
+chart image paths, when they were rendered) on a hit.
+
+precompute() warms the cache in the background for the expiries shown on
+the index page, so the first Generate click is usually a hit. It starts at
+most once per PRECOMPUTE_THROTTLE per instrument and process, so page
+reloads do not queue chain fetches behind the rate gates.
+"""
+import copy
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+MAX_ENTRIES = 64
+PRECOMPUTE_EXPIRIES = 2           # Nearest expiries warmed from the index page
+PRECOMPUTE_CALC_TYPES = ('Weekly',)  # The form's default calculation type
+PRECOMPUTE_INTERVAL = 60          # Seconds before the same analysis is warmed again
+PRECOMPUTE_THROTTLE = 30          # Seconds between precompute starts per instrument (the chain cache TTL)
+
+
+def chain_version(option_chain_data):
+    """Hash of an option chain snapshot (any source format); 'none' when there is no chain."""
+    if not option_chain_data:
+        return 'none'
+    payload = json.dumps(option_chain_data, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def fingerprint(instrument, calc_type, expiry, zones, option_chain_data, lot_size, selection=None):
+    parts = {
+        'instrument': instrument,
+        'calc_type': calc_type,
+        'expiry': expiry,
+        'zones': [None if z is None else float(z) for z in zones],
+        'chain': chain_version(option_chain_data),
+        'lot_size': lot_size,
+        'selection': selection,
+        'day': datetime.now().date().isoformat(),
+    }
+    return hashlib.sha1(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _files_exist(analysis_data):
+    """True unless a chart image the analysis points to has been deleted (unrendered charts are None)."""
+    paths = (analysis_data.get('summary_file'), analysis_data.get('payoff_file'))
+    return all(os.path.exists(os.path.join(settings.BASE_DIR, path)) for path in paths if path)
+
+
+def _record_charts(analysis_data):
+    """Tell the chart collector (possibly in another process) that the analysis's charts are in use."""
+    from .chart_store import record_references
+
+    try:
+        record_references({key: analysis_data.get(key) for key in ('summary_file', 'payoff_file')})
+    except Exception as e:
+        logger.warning(f"⚠️ Could not record chart references: {e}")
+
+
+class AnalysisCache:
+    """Thread-safe LRU of (analysis_data, status) by fingerprint, plus last-store time per analysis."""
+
+    def __init__(self, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._last_stored = {}
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pending = set()
+        self._precompute_started = {}
+
+    def get(self, key):
+        """Copy of the cached (analysis_data, status), or None on a miss or if its images were removed."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if not _files_exist(entry[0]):
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        _record_charts(entry[0])
+        return copy.deepcopy(entry[0]), entry[1]
+
+    def put(self, key, calc_type, analysis_data, status):
+        with self._lock:
+            self._entries[key] = (copy.deepcopy(analysis_data), status)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._last_stored[(analysis_data['instrument'], calc_type, analysis_data['expiry'])] = time.time()
+        _record_charts(analysis_data)
+
+    def is_warm(self, instrument, calc_type, expiry, max_age=PRECOMPUTE_INTERVAL):
+        stored = self._last_stored.get((instrument, calc_type, expiry))
+        return stored is not None and time.time() - stored < max_age
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._last_stored.clear()
+
+    def precompute(self, instrument, expiries, calc_types=PRECOMPUTE_CALC_TYPES):
+        """Generate analyses for the nearest expiries in the background when they are not already warm."""
+        from . import utils
+
+        targets = [(instrument, calc_type, expiry)
+                   for expiry in expiries[:PRECOMPUTE_EXPIRIES] for calc_type in calc_types]
+        with self._lock:
+            now = time.time()
+            if now - self._precompute_started.get(instrument, 0.0) < PRECOMPUTE_THROTTLE:
+                return 0
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='analysis-precompute')
+            targets = [t for t in targets if t not in self._pending and not self.is_warm(*t)]
+            self._pending.update(targets)
+            if targets:
+                self._precompute_started[instrument] = now
+
+        def run(target):
+            try:
+                utils.generate_analysis(*target, render_charts=False)
+            except Exception as e:
+                logger.warning(f"⚠️ Precompute failed for {target}: {e}")
+            finally:
+                with self._lock:
+                    self._pending.discard(target)
+
+        for target in targets:
+            self._executor.submit(run, target)
+        if targets:
+            logger.info(f"🔥 Precomputing {len(targets)} analyses for {instrument}")
+        return len(targets)
+
+
+analysis_cache = AnalysisCache()
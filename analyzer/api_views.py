@@ -10,6 +10,9 @@ from django.views.decorators.http import require_http_methods
 from django.conf import settings
 from .market_data import get_market_data, get_market_status  # uses unified dhan_api internally now
 from .historical_data import historical_fetcher
+import logging
+
+logger = logging.getLogger(__name__)
 
 # Import enhanced market data with NSE support
 try:
@@ -22,10 +25,10 @@ except ImportError:
 try:
     from django_market_service import get_django_market_data, get_django_historical_data
     YFINANCE_AVAILABLE = True
-    print("📊 YFinance service available - will use on-demand only")
+    logger.debug("📊 YFinance service available - will use on-demand only")
 except ImportError:
     YFINANCE_AVAILABLE = False
-    print("⚠️ YFinance service not available, falling back to DhanHQ")
+    logger.warning("⚠️ YFinance service not available, falling back to DhanHQ")
 
 @csrf_exempt
 @require_http_methods(["GET"])
@@ -142,11 +145,11 @@ def historical_data_api(request):
             
             # Get historical data from yfinance service
             historical_data = get_django_historical_data(symbol, period)
-            print(f"📊 Historical data fetched for {symbol} ({period}) - on-demand")
+            logger.debug(f"📊 Historical data fetched for {symbol} ({period}) - on-demand")
         else:
             # Fallback to empty data for now
             historical_data = []
-            print("⚠️ Using fallback data - yfinance unavailable")
+            logger.warning("⚠️ Using fallback data - yfinance unavailable")
         
         response_data = {
             'success': True,
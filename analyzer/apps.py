@@ -1,15 +1,51 @@
 from django.apps import AppConfig
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
 
 
 class AnalyzerConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "analyzer"
-    
+    _services_started = False
+    _services_lock = threading.Lock()
+
     def ready(self):
-        """Start P&L updater when Django starts"""
+        """Configure logging when Django starts; background services start from the serving entry points"""
+        from .log_service import configure_logging
+        configure_logging()
+
+    def start_services(self):
+        """
+        Warm the chart renderers, start the notification worker, the schedule
+        runner and the P&L updater. Called by the serving processes only
+        (fifto_project/wsgi.py and asgi.py, which runserver loads in its
+        reloaded child, and runapscheduler) so management commands such as
+        check, migrate or shell and the autoreloader parent start nothing.
+        """
+        with self._services_lock:
+            if AnalyzerConfig._services_started:
+                return
+            AnalyzerConfig._services_started = True
+        try:
+            from .render_service import render_service
+            render_service.start()
+        except Exception as e:
+            logger.warning(f"⚠️ Chart render workers not pre-started: {e}")
+        try:
+            from .notifications import notification_queue
+            notification_queue.start()
+        except Exception as e:
+            logger.error(f"❌ Failed to start notification worker: {e}")
+        try:
+            from .scheduler_service import scheduler_service
+            scheduler_service.start()
+        except Exception as e:
+            logger.error(f"❌ Failed to start schedule runner: {e}")
         try:
             from .pnl_updater import pnl_updater
             pnl_updater.start_updater()
-            print("🚀 P&L Updater started automatically (30-minute intervals)")
+            logger.info("🚀 P&L Updater started automatically (30-minute intervals)")
         except Exception as e:
-            print(f"❌ Failed to start P&L updater: {e}")
+            logger.error(f"❌ Failed to start P&L updater: {e}")
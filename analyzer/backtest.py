@@ -0,0 +1,259 @@
+"""
+Backtest Module - Vectorized replay of the FiFTO weekly-zone strangle
+
+Daily candles (normally from the local candle store) are grouped into
+Monday-Sunday weeks. For every week at once:
+
+- zones follow calculate_zones_from_data_tradingview (current week open,
+  5/10-week SMA of the previous weeks' High - Low, rounded to 50/100)
+- strikes follow the default strike_selection ladder (CE stepping up from
+  the supply anchor, PE stepping down from the demand anchor, which is
+  also the premium ranking under a flat-volatility model)
+- legs are priced with Black-Scholes from trailing historical volatility,
+  or from a recorded chain snapshot for that week when one is supplied
+- the position is marked at every day's High, Low and Close until expiry,
+  exiting at the 80% target or 80% stoploss (stoploss wins a same-day tie)
+
+All weeks, days and ladder levels are evaluated as one NumPy broadcast, so
+a 10-year replay takes well under a second.
+"""
+import logging
+
+import numpy as np
+import pandas as pd
+
+from . import candle_store, greeks, strike_selection, zone_engine
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PARAMS = {
+    'lot_size': None,          # None = lot size from settings
+    'strike_increment': None,  # None = 50 for NIFTY, 100 otherwise
+    'depth': 3,                # Ladder levels (High/Mid/Low Reward)
+    'zone_multiplier': zone_engine.ZONE_MULTIPLIER,  # Zone half-width as a fraction of the range SMA
+    'range_short': zone_engine.RANGE_SHORT,          # Weeks in the short range SMA
+    'range_long': zone_engine.RANGE_LONG,            # Weeks in the long range SMA
+    'zone_step': None,         # Zone rounding; None = 50 for NIFTY, 100 otherwise
+    'target_pct': 0.80,        # Exit when profit reaches 80% of premium collected
+    'stoploss_pct': 0.80,      # Exit when loss reaches 80% of premium collected
+    'vol_window': 20,          # Trading days of returns for historical volatility
+    'iv_multiplier': 1.0,      # Scale applied to historical volatility when pricing
+    'min_iv': 0.08,
+    'expiry_weekday': 3,       # Weekly expiry: last trading day up to Thursday
+    'r': greeks.RISK_FREE_RATE,
+}
+
+TRADING_DAYS_PER_YEAR = 252
+ENTRY_TIME_TO_CLOSE = 6.25 / 24  # Entry at the 09:15 open, in days before the 15:30 close
+INTRADAY_TIME_TO_CLOSE = 0.125   # High/Low assumed mid-session, in days before the close
+
+
+def weekly_zones(daily, instrument, range_short=zone_engine.RANGE_SHORT, range_long=zone_engine.RANGE_LONG,
+                 multiplier=zone_engine.ZONE_MULTIPLIER, step=None):
+    """
+    Supply/demand zones for every week (indexed by week start Monday), using only
+    the current week's open and previous completed weeks.
+    """
+    week = daily.index - pd.to_timedelta(daily.index.weekday, unit='D')
+    weekly = daily.groupby(week).agg(Open=('Open', 'first'), High=('High', 'max'), Low=('Low', 'min'))
+    rng = weekly['High'] - weekly['Low']
+    rng_short = rng.rolling(int(range_short)).mean().shift(1)
+    rng_long = rng.rolling(int(range_long)).mean().shift(1)
+    half = multiplier * np.maximum(rng_short, rng_long)
+    step = step or zone_engine.zone_step(instrument)
+    weekly['supply'] = np.round((weekly['Open'] + half) / step) * step
+    weekly['demand'] = np.round((weekly['Open'] - half) / step) * step
+    return weekly.dropna(subset=['supply', 'demand'])
+
+
+def _day_panel(daily, weeks, expiry_weekday):
+    """(weeks, days) arrays of OHLC and dates up to each week's expiry day, NaN-padded."""
+    in_window = daily[daily.index.weekday <= expiry_weekday]
+    week = in_window.index - pd.to_timedelta(in_window.index.weekday, unit='D')
+    keep = week.isin(weeks)
+    in_window, week = in_window[keep], week[keep]
+    row = weeks.get_indexer(week)
+    col = in_window.groupby(week).cumcount().values
+    n_days = int(col.max()) + 1 if len(col) else 1
+
+    panel = {}
+    for name in ('Open', 'High', 'Low', 'Close'):
+        values = np.full((len(weeks), n_days), np.nan)
+        values[row, col] = in_window[name].values
+        panel[name] = values
+    day_ordinal = np.full((len(weeks), n_days), np.nan)
+    day_ordinal[row, col] = in_window.index.map(pd.Timestamp.toordinal).values
+    panel['day'] = day_ordinal
+    panel['expiry'] = np.nanmax(day_ordinal, axis=1)
+    return panel
+
+
+def _snapshot_for(snapshots, week_start):
+    if not snapshots:
+        return None
+    for key in (week_start, week_start.date(), week_start.strftime('%Y-%m-%d')):
+        if key in snapshots:
+            return snapshots[key]
+    return None
+
+
+def run_backtest(candles, instrument, params=None, snapshots=None, start=None, end=None):
+    """
+    Replay the weekly strangle over daily `candles` (DataFrame with Open/High/Low/Close).
+
+    `snapshots` maps a week start (Monday, date or 'YYYY-MM-DD') to a raw or
+    normalized option chain recorded at entry; those weeks take strikes, entry
+    prices and leg IVs from the snapshot. Returns one row per (week, entry level).
+    """
+    params = {**DEFAULT_PARAMS, **(params or {})}
+    if params['lot_size'] is None:
+        from . import utils
+        params['lot_size'] = utils.get_lot_size(instrument)
+    inc = params['strike_increment'] or strike_selection.default_increment(instrument)
+    depth, r = int(params['depth']), params['r']
+
+    daily = candles[candle_store.CANDLE_COLUMNS].astype(float).copy()
+    daily.index = candle_store.trading_days(daily.index)
+    daily = daily[~daily.index.duplicated(keep='last')].sort_index()
+
+    weekly = weekly_zones(daily, instrument, params['range_short'], params['range_long'],
+                          params['zone_multiplier'], params['zone_step'])
+    if start is not None:
+        weekly = weekly[weekly.index >= pd.Timestamp(start)]
+    if end is not None:
+        weekly = weekly[weekly.index <= pd.Timestamp(end)]
+
+    # Historical volatility known at the prior close, sampled at each week's first day
+    log_returns = np.log(daily['Close']).diff()
+    hist_vol = (log_returns.rolling(params['vol_window']).std() * np.sqrt(TRADING_DAYS_PER_YEAR)).shift(1)
+    panel = _day_panel(daily, weekly.index, params['expiry_weekday'])
+    first_day = panel['day'][:, 0]
+    tradable = np.isfinite(first_day)
+    weekly = weekly[tradable]
+    panel = {key: value[tradable] for key, value in panel.items()}
+    first_day = panel['day'][:, 0]
+    vol_at_entry = hist_vol.reindex(pd.DatetimeIndex([pd.Timestamp.fromordinal(int(d)) for d in first_day])).values
+    iv = np.maximum(np.nan_to_num(vol_at_entry * params['iv_multiplier'], nan=params['min_iv']), params['min_iv'])
+
+    n_weeks = len(weekly)
+    spot0 = panel['Open'][:, 0].copy()
+    t0 = ((panel['expiry'] - first_day) + ENTRY_TIME_TO_CLOSE) / 365.0
+
+    # Model chain: ladder strikes from the zone anchors
+    levels = np.arange(depth)
+    ce_anchor = np.ceil(weekly['supply'].values / inc) * inc
+    pe_anchor = np.floor(weekly['demand'].values / inc) * inc
+    ce_strike = ce_anchor[:, None] + levels * inc
+    pe_strike = pe_anchor[:, None] - levels * inc
+    ce_iv = np.repeat(iv[:, None], depth, axis=1)
+    pe_iv = ce_iv.copy()
+    ce_price = greeks.bs_price(spot0[:, None], ce_strike, t0[:, None], ce_iv, True, r)
+    pe_price = greeks.bs_price(spot0[:, None], pe_strike, t0[:, None], pe_iv, False, r)
+    source = np.array(['model'] * n_weeks, dtype=object)
+
+    # Recorded chain snapshots replace strikes, prices and IVs for their weeks
+    for w, week_start in enumerate(weekly.index):
+        snapshot = _snapshot_for(snapshots, week_start)
+        if snapshot is None:
+            continue
+        chain = snapshot if 'strikes' in snapshot else greeks.normalize_chain(snapshot)
+        if chain is None:
+            continue
+        table = strike_selection.select_strikes(chain, weekly['supply'].iloc[w], weekly['demand'].iloc[w],
+                                                inc, {'depth': depth})
+        spot0[w] = chain['spot']
+        ce_strike[w], pe_strike[w] = table['CE_Strike'].values, table['PE_Strike'].values
+        ce_price[w], pe_price[w] = table['CE_Price'].values, table['PE_Price'].values
+        for prices, strikes, ivs, is_call in ((ce_price, ce_strike, ce_iv, True), (pe_price, pe_strike, pe_iv, False)):
+            implied = greeks.implied_volatility(prices[w], chain['spot'], strikes[w], t0[w], is_call, r)
+            ivs[w] = np.where(np.isfinite(implied), implied, iv[w])
+        source[w] = 'snapshot'
+
+    premium = ce_price + pe_price  # (W, L)
+
+    # Mark every (week, day, level) at the day's High, Low (mid-session) and Close
+    days_left = (panel['expiry'][:, None] - panel['day'])  # (W, D)
+    t_close = np.nan_to_num(days_left, nan=0.0) / 365.0
+    t_intraday = t_close + INTRADAY_TIME_TO_CLOSE / 365.0
+    spots = np.stack([panel['High'], panel['Low'], panel['Close']], axis=-1)      # (W, D, 3)
+    times = np.stack([t_intraday, t_intraday, t_close], axis=-1)                  # (W, D, 3)
+    spots4, times4 = spots[:, :, None, :], times[:, :, None, :]                    # (W, D, 1, 3)
+    value = (greeks.bs_price(spots4, ce_strike[:, None, :, None], times4, ce_iv[:, None, :, None], True, r)
+             + greeks.bs_price(spots4, pe_strike[:, None, :, None], times4, pe_iv[:, None, :, None], False, r))
+    pnl = premium[:, None, :, None] - value                                       # (W, D, L, 3) per unit
+
+    valid = np.isfinite(panel['Close'])[:, :, None]
+    pnl = np.where(valid[..., None], pnl, 0.0)  # Padding days never trigger an exit
+    target = params['target_pct'] * premium[:, None, :]
+    stoploss = params['stoploss_pct'] * premium[:, None, :]
+    sl_hit = valid & (pnl.min(axis=-1) <= -stoploss)
+    target_hit = valid & (pnl.max(axis=-1) >= target) & (premium[:, None, :] > 0)
+
+    n_days = sl_hit.shape[1]
+    first_sl = np.where(sl_hit.any(axis=1), sl_hit.argmax(axis=1), n_days)          # (W, L)
+    first_target = np.where(target_hit.any(axis=1), target_hit.argmax(axis=1), n_days)
+    last_day = np.isfinite(panel['Close']).sum(axis=1) - 1                         # (W,)
+    expiry_pnl = pnl[np.arange(n_weeks), last_day, :, 2]                           # Close on expiry day
+
+    stopped = (first_sl <= first_target) & (first_sl < n_days)
+    targeted = ~stopped & (first_target < n_days)
+    exit_idx = np.where(stopped, first_sl, np.where(targeted, first_target, last_day[:, None]))
+    unit_pnl = np.where(stopped, -params['stoploss_pct'] * premium,
+                        np.where(targeted, params['target_pct'] * premium, expiry_pnl))
+    reason = np.where(stopped, 'stoploss', np.where(targeted, 'target', 'expiry'))
+    exit_day = panel['day'][np.arange(n_weeks)[:, None], exit_idx]
+
+    def to_dates(ordinals):
+        return pd.to_datetime([pd.Timestamp.fromordinal(int(d)) for d in np.ravel(ordinals)])
+
+    labels = strike_selection.entry_labels(depth)
+    results = pd.DataFrame({
+        'week_start': np.repeat(weekly.index.values, depth),
+        'entry_date': np.repeat(to_dates(first_day).values, depth),
+        'expiry_date': np.repeat(to_dates(panel['expiry']).values, depth),
+        'entry': np.tile(labels, n_weeks),
+        'spot': np.repeat(spot0, depth),
+        'supply_zone': np.repeat(weekly['supply'].values, depth),
+        'demand_zone': np.repeat(weekly['demand'].values, depth),
+        'iv': np.repeat(iv, depth),
+        'ce_strike': ce_strike.ravel(),
+        'pe_strike': pe_strike.ravel(),
+        'ce_price': ce_price.ravel(),
+        'pe_price': pe_price.ravel(),
+        'premium': premium.ravel(),
+        'exit_date': to_dates(exit_day).values if n_weeks else [],
+        'exit_reason': reason.ravel(),
+        'pnl': (unit_pnl * params['lot_size']).ravel(),
+        'source': np.repeat(source, depth),
+    })
+    return results.round({'spot': 2, 'iv': 4, 'ce_price': 2, 'pe_price': 2, 'premium': 2, 'pnl': 2})
+
+
+def summarize_backtest(results):
+    """Per-entry-level trade count, win rate, exit mix, total/average P&L and max drawdown."""
+    rows = []
+    for entry, trades in results.groupby('entry', sort=False):
+        equity = trades.sort_values('week_start')['pnl'].cumsum()
+        drawdown = (equity.cummax().clip(lower=0) - equity).max()
+        reasons = trades['exit_reason'].value_counts()
+        rows.append({
+            'entry': entry,
+            'trades': int(len(trades)),
+            'win_rate': round(float((trades['pnl'] > 0).mean() * 100), 1),
+            'total_pnl': round(float(trades['pnl'].sum()), 2),
+            'avg_pnl': round(float(trades['pnl'].mean()), 2),
+            'max_drawdown': round(float(drawdown), 2),
+            'targets': int(reasons.get('target', 0)),
+            'stoplosses': int(reasons.get('stoploss', 0)),
+            'expiries': int(reasons.get('expiry', 0)),
+        })
+    return pd.DataFrame(rows)
+
+
+def backtest_instrument(instrument, params=None, snapshots=None, start=None, end=None):
+    """Run the backtest on the locally stored candles for an instrument."""
+    candles = candle_store.load_candles(instrument)
+    if candles is None or candles.empty:
+        logger.error(f"❌ No stored candles for {instrument}. Run candle_store.backfill_candles('{instrument}') first.")
+        return None
+    return run_backtest(candles, instrument, params, snapshots, start, end)
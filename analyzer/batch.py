@@ -0,0 +1,169 @@
+"""
+Batch Analysis Module - Run several (instrument, calc_type, expiry) analyses together
+
+A batch first plans the minimal set of fetches across all jobs: one history
+fetch per instrument (only for zones missing from the weekly zone cache,
+using the longest period any of its jobs needs) and one option chain fetch
+per distinct (instrument, expiry). Those fetches run concurrently on a
+thread pool; the DhanHQ client's thread-safe rate gates keep them within
+the API budget. Each analysis is rendered on the same pool as soon as its
+own inputs are ready (chart PNGs go through the shared render_service
+workers), and per-job results carry fetch and render timings plus when the
+job's first step started and when it finished. Chains prefetched by a
+schedule warm-up (see warmup.py) are used instead of fetching again.
+"""
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from . import run_log, utils
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_WORKERS = 4
+
+
+def normalize_jobs(jobs):
+    """
+    Accept (instrument, calc_type), (instrument, calc_type, expiry) tuples or
+    dicts with those keys. A missing expiry resolves like generate_chart_for_instrument.
+    """
+    normalized = []
+    for job in jobs:
+        if isinstance(job, dict):
+            instrument, calc_type, expiry = job['instrument'], job['calc_type'], job.get('expiry')
+        else:
+            instrument, calc_type, expiry = (tuple(job) + (None,))[:3]
+        normalized.append({
+            'instrument': instrument,
+            'calc_type': calc_type,
+            'expiry': expiry or utils.default_expiry_for(calc_type),
+        })
+    return normalized
+
+
+def plan_fetches(jobs):
+    """
+    Minimal fetch plan for normalized jobs.
+
+    Returns cached zones keyed by (instrument, calc_type), the calc types
+    still needing zones per instrument, the history period to fetch per
+    instrument and the distinct (instrument, expiry) chains.
+    """
+    cached_zones, missing_zones, history = {}, {}, {}
+    for job in jobs:
+        key = (job['instrument'], job['calc_type'])
+        if key in cached_zones or job['calc_type'] in missing_zones.get(job['instrument'], []):
+            continue
+        supply_zone, demand_zone = utils.get_cached_zones(*key)
+        if supply_zone is not None and demand_zone is not None:
+            cached_zones[key] = (supply_zone, demand_zone)
+            continue
+        missing_zones.setdefault(job['instrument'], []).append(job['calc_type'])
+        period = utils.zone_history_period(*key)
+        current = history.get(job['instrument'])
+        if current is None or utils.ZONE_HISTORY_DAYS[period] > utils.ZONE_HISTORY_DAYS[current]:
+            history[job['instrument']] = period
+
+    chains = list(dict.fromkeys((job['instrument'], job['expiry']) for job in jobs))
+    return {'cached_zones': cached_zones, 'missing_zones': missing_zones, 'history': history, 'chains': chains}
+
+
+def _timed(func, *args, **kwargs):
+    """Run func, returning (result, seconds, error message, perf_counter start)."""
+    start = time.perf_counter()
+    try:
+        return func(*args, **kwargs), time.perf_counter() - start, None, start
+    except Exception as e:
+        logger.exception(f"Batch step {getattr(func, '__name__', func)} failed")
+        return None, time.perf_counter() - start, str(e), start
+
+
+def _zones_for_instrument(instrument, calc_types, period):
+    """Fetch history once and compute zones for every calc type that missed the cache."""
+    with run_log.stage('history_fetch'):
+        df = utils.get_dhan_historical(instrument, period) if utils.DHAN_AVAILABLE else None
+    if df is None or df.empty:
+        return {}  # Leave zone calculation to generate_analysis, as an unbatched run would
+    return {(instrument, calc_type): utils.calculate_zones_dhanhq(instrument, calc_type, df=df)
+            for calc_type in calc_types}
+
+
+def _chain_for(instrument, expiry):
+    """Option chain for a job, using the one fetched by the schedule warm-up when still fresh."""
+    from .warmup import chain_prefetch
+
+    chain = chain_prefetch.take(instrument, expiry)
+    return chain if chain is not None else utils.get_option_chain_data(instrument, expiry_date=expiry)
+
+
+def _run_job(job, zones_future, chain_future, cached_zones, batch_start):
+    """Wait for this job's own inputs, then generate and render its analysis."""
+    timings, starts = {}, []
+    key = (job['instrument'], job['calc_type'])
+    zones = cached_zones.get(key)
+    if zones is None and zones_future is not None:
+        zone_results, timings['history'], _, started = zones_future.result()
+        zones = (zone_results or {}).get(key)
+        starts.append(started)
+    chain, timings['chain'], _, started = chain_future.result()
+    starts.append(started)
+
+    result, timings['analysis'], error, started = _timed(
+        utils.generate_analysis, job['instrument'], job['calc_type'], job['expiry'],
+        zones=zones, option_chain_data=chain or None)
+    starts.append(started)
+    analysis_data, status = result if result else (None, f"Error generating analysis: {error}")
+    timings = {name: round(seconds, 3) for name, seconds in timings.items()}
+    timings['started_at'] = round(min(starts) - batch_start, 3)
+    timings['finished_at'] = round(time.perf_counter() - batch_start, 3)
+    timings['duration'] = round(timings['finished_at'] - timings['started_at'], 3)
+    return {**job, 'analysis_data': analysis_data, 'status': status, 'timings': timings}
+
+
+def run_analysis_batch(jobs, max_workers=DEFAULT_MAX_WORKERS):
+    """
+    Run a list of analysis jobs with shared, concurrent fetches.
+
+    Returns {'results': [...], 'plan': {...}, 'timings': {...}}. Each result
+    has instrument, calc_type, expiry, analysis_data (None on failure),
+    status and timings (history/chain fetch, analysis render, started_at and
+    finished_at relative to the batch start, duration) in seconds. The batch
+    timings hold the total and the wall-clock start ('started', epoch seconds).
+    """
+    batch_start = time.perf_counter()
+    started = time.time()
+    jobs = normalize_jobs(jobs)
+    plan = plan_fetches(jobs)
+    logger.info(f"🧮 Batch plan: {len(jobs)} jobs, {len(plan['history'])} history fetches, "
+          f"{len(plan['chains'])} chain fetches, {len(plan['cached_zones'])} cached zones")
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='analysis-batch') as pool:
+        # Fetches first, so analysis tasks waiting on them never starve the pool
+        zone_futures = {
+            instrument: run_log.submit(pool, _timed, _zones_for_instrument, instrument,
+                                       plan['missing_zones'][instrument], period)
+            for instrument, period in plan['history'].items()
+        }
+        chain_futures = {
+            (instrument, expiry): run_log.submit(pool, _timed, _chain_for, instrument, expiry)
+            for instrument, expiry in plan['chains']
+        }
+        job_futures = [
+            run_log.submit(pool, _run_job, job, zone_futures.get(job['instrument']),
+                           chain_futures[(job['instrument'], job['expiry'])], plan['cached_zones'], batch_start)
+            for job in jobs
+        ]
+        results = [future.result() for future in job_futures]
+
+    total = time.perf_counter() - batch_start
+    logger.info(f"✅ Batch finished: {sum(1 for r in results if r['analysis_data'])}/{len(jobs)} analyses in {total:.2f}s")
+    return {
+        'results': results,
+        'plan': {
+            'history_fetches': plan['history'],
+            'chain_fetches': [f"{instrument} {expiry}" for instrument, expiry in plan['chains']],
+            'cached_zones': len(plan['cached_zones']),
+        },
+        'timings': {'total': round(total, 3), 'started': started},
+    }
@@ -0,0 +1,101 @@
+"""
+Candle Store Module - Local daily OHLC history per instrument
+
+Daily candles are kept as one CSV per instrument under ~/fifto_candles,
+indexed by IST trading day. Every history fetch used for zone calculation
+is merged in, and backfill_candles() can seed years of history from
+yfinance, so backtests replay from disk instead of the API.
+"""
+import logging
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+CANDLE_STORE_DIR = os.path.join(os.path.expanduser('~'), "fifto_candles")
+CANDLE_COLUMNS = ['Open', 'High', 'Low', 'Close']
+YFINANCE_TICKERS = {"NIFTY": ["^NSEI", "NSEI.NS"], "BANKNIFTY": ["^NSEBANK"]}
+
+_store_lock = threading.Lock()
+
+
+def candle_path(instrument):
+    return os.path.join(CANDLE_STORE_DIR, f"{instrument.upper()}.csv")
+
+
+def trading_days(index):
+    """
+    Map candle timestamps to IST trading days.
+
+    DhanHQ daily candles are stamped at IST midnight expressed in naive UTC
+    (18:30 on the previous day); yfinance uses midnight dates.
+    """
+    index = pd.DatetimeIndex(index)
+    if index.tz is not None:
+        return index.tz_convert('Asia/Kolkata').tz_localize(None).normalize()
+    if (index.hour != 0).any() or (index.minute != 0).any():
+        return (index + pd.Timedelta(hours=5, minutes=30)).normalize()
+    return index.normalize()
+
+
+def load_candles(instrument):
+    """Stored daily candles (DatetimeIndex of trading days), or None if nothing is stored."""
+    path = candle_path(instrument)
+    if not os.path.exists(path):
+        return None
+    try:
+        df = pd.read_csv(path, index_col=0, parse_dates=True)
+        return df[CANDLE_COLUMNS]
+    except Exception as e:
+        logger.error(f"Error loading candles for {instrument}: {e}")
+        return None
+
+
+def update_candles(instrument, df):
+    """
+    Merge fetched candles into the store; newer rows replace stored ones for the
+    same trading day. Returns the number of trading days that were not stored
+    yet or whose stored OHLC changed (0 means the store already had this data).
+    """
+    if df is None or df.empty:
+        return 0
+    incoming = df[CANDLE_COLUMNS].astype(float).copy()
+    incoming.index = trading_days(incoming.index)
+    incoming = incoming[~incoming.index.duplicated(keep='last')]
+
+    with _store_lock:
+        stored = load_candles(instrument)
+        if stored is None:
+            merged, changed_days = incoming, len(incoming)
+        else:
+            known = incoming.index.isin(stored.index)
+            overlap = incoming[known]
+            revised = ~np.isclose(overlap.values, stored.loc[overlap.index, CANDLE_COLUMNS].values,
+                                  equal_nan=True).all(axis=1)
+            changed_days = int((~known).sum() + revised.sum())
+            if changed_days == 0:
+                return 0
+            merged = pd.concat([stored[~stored.index.isin(incoming.index)], incoming]).sort_index()
+        try:
+            os.makedirs(CANDLE_STORE_DIR, exist_ok=True)
+            merged.index.name = 'Date'
+            merged.to_csv(candle_path(instrument))
+        except Exception as e:
+            logger.error(f"Error saving candles for {instrument}: {e}")
+    return changed_days
+
+
+def backfill_candles(instrument, years=10):
+    """Seed the store with `years` of daily history from yfinance. Returns the number of new days."""
+    from . import utils
+
+    df, symbol = utils._fetch_yf_history_util(YFINANCE_TICKERS.get(instrument, []), period_days=int(years * 365))
+    if df is None or df.empty:
+        logger.error(f"❌ No yfinance history to backfill for {instrument}")
+        return 0
+    new_days = update_candles(instrument, df)
+    logger.info(f"✅ Backfilled {new_days} new or revised trading days for {instrument} from {symbol}")
+    return new_days
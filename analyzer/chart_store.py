@@ -0,0 +1,202 @@
+"""
+Chart Store Module - Content-addressed chart images with garbage collection
+
+Charts are saved as static/charts/<kind>_<hash>.png where the hash covers
+the chart kind and its render payload (see charts.py), so an identical
+chart is written once and later requests for it skip the render. Labels
+that do not change what the chart shows (the summary's "generated" time)
+are left out of the hash.
+
+collect_garbage() deletes charts that no cached analysis, background job
+result or trade refers to, once they are older than CHART_STORE_MAX_AGE_DAYS
+or, oldest first, while the folder is larger than CHART_STORE_MAX_BYTES.
+Recently written charts are always kept because they may still be shown
+from a session. Analyses are cached in each process's memory, so the
+analysis cache records the charts it holds in the state DB (chart_refs)
+and the collector, in whatever process it runs, reads them from there. Legacy <kind>_<uuid>.png files in static/ are collected
+the same way.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+from django.conf import settings
+
+from . import state_db
+from .render_service import render_service
+
+logger = logging.getLogger(__name__)
+
+STATIC_DIR = os.path.join(settings.BASE_DIR, 'static')
+CHART_DIR = os.path.join(STATIC_DIR, 'charts')
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+DEFAULT_MAX_AGE_DAYS = 7
+MIN_AGE_SECONDS = 6 * 3600  # Never collect charts younger than this
+GC_INTERVAL = 3600          # Seconds between automatic collections
+REF_TTL_SECONDS = 24 * 3600  # Cached analyses are keyed by trading day, so a recorded reference outlives them
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS chart_refs (
+    name TEXT PRIMARY KEY,
+    referenced_at REAL NOT NULL
+);
+"""
+
+# Payload keys that are only labels and are not part of a chart's identity
+UNHASHED_KEYS = {
+    'summary': ('generated',),
+}
+
+LEGACY_CHART = re.compile(r'^(summary|payoff|pl_update)_[0-9a-f]{32}\.png$')
+CHART_REF = re.compile(r'static/(?:charts/)?([\w.-]+\.png)')
+
+
+def chart_key(kind, payload):
+    """Hash of a chart kind and its render payload."""
+    hashed = {k: v for k, v in payload.items() if k not in UNHASHED_KEYS.get(kind, ())}
+    data = json.dumps({'kind': kind, 'payload': hashed}, sort_keys=True, default=str)
+    return hashlib.sha1(data.encode()).hexdigest()
+
+
+def _chart_files():
+    """(path, size, mtime) of every stored and legacy chart image."""
+    files = []
+    for folder, is_chart in ((CHART_DIR, lambda name: name.endswith('.png')), (STATIC_DIR, LEGACY_CHART.match)):
+        if not os.path.isdir(folder):
+            continue
+        for entry in os.scandir(folder):
+            if entry.is_file() and is_chart(entry.name):
+                stat = entry.stat()
+                files.append((entry.path, stat.st_size, stat.st_mtime))
+    return files
+
+
+def _find_refs(value, refs):
+    """Add the chart file names mentioned anywhere in a nested dict/list structure."""
+    if isinstance(value, dict):
+        for item in value.values():
+            _find_refs(item, refs)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            _find_refs(item, refs)
+    elif isinstance(value, str) and '.png' in value:
+        refs.update(CHART_REF.findall(value.replace('\\', '/')))
+
+
+def record_references(value):
+    """Record the charts mentioned in `value` (e.g. a cached analysis) as in use, for every process's GC."""
+    refs = set()
+    _find_refs(value, refs)
+    if not refs:
+        return
+    state_db.ensure_schema('chart_refs', SCHEMA)
+    now = time.time()
+    with state_db.connect() as conn:
+        conn.executemany("INSERT OR REPLACE INTO chart_refs (name, referenced_at) VALUES (?, ?)",
+                         [(name, now) for name in refs])
+
+
+def referenced_charts():
+    """File names of the charts used by cached analyses (in any process), stored job results and trades."""
+    from . import utils
+
+    refs = set()
+    _find_refs(utils.load_trades(), refs)
+    try:
+        state_db.ensure_schema('chart_refs', SCHEMA)
+        with state_db.connect() as conn:
+            conn.execute("DELETE FROM chart_refs WHERE referenced_at < ?", (time.time() - REF_TTL_SECONDS,))
+            refs.update(row['name'] for row in conn.execute("SELECT name FROM chart_refs").fetchall())
+    except Exception as e:
+        logger.warning(f"⚠️ Could not read cached analysis chart references: {e}")
+    try:
+        with state_db.connect() as conn:
+            rows = conn.execute("SELECT result FROM jobs WHERE result LIKE '%.png%'").fetchall()
+        for row in rows:
+            _find_refs(json.loads(row['result']), refs)
+    except Exception as e:
+        logger.warning(f"⚠️ Could not read job results for chart references: {e}")
+    return refs
+
+
+class ChartStore:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last_gc = 0.0
+        self._gc_running = False
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_render(self, kind, payload):
+        """Path of the chart relative to BASE_DIR ('static/charts/...'), rendering it only if not stored."""
+        filename = f"{kind}_{chart_key(kind, payload)}.png"
+        path = os.path.join(CHART_DIR, filename)
+        if os.path.exists(path):
+            os.utime(path)  # Refresh its age so an in-use chart is evicted last
+            self.hits += 1
+            logger.debug(f"🖼️ Chart store hit: {filename}")
+        else:
+            self.misses += 1
+            png = render_service.render(kind, payload)
+            os.makedirs(CHART_DIR, exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(png)
+            os.replace(tmp_path, path)  # Concurrent writers of the same chart write identical bytes
+            self.maybe_collect()
+        return f'static/charts/{filename}'
+
+    def collect_garbage(self, max_bytes=None, max_age_days=None):
+        """Delete unreferenced charts past the age limit, then the oldest ones over the size limit."""
+        max_bytes = max_bytes if max_bytes is not None else getattr(settings, 'CHART_STORE_MAX_BYTES', DEFAULT_MAX_BYTES)
+        max_age_days = max_age_days if max_age_days is not None else getattr(settings, 'CHART_STORE_MAX_AGE_DAYS', DEFAULT_MAX_AGE_DAYS)
+        now = time.time()
+        files = sorted(_chart_files(), key=lambda f: f[2])
+        refs = referenced_charts()
+        total = sum(size for _, size, _ in files)
+        removed, freed = 0, 0
+
+        for path, size, mtime in files:
+            age = now - mtime
+            if os.path.basename(path) in refs or age < MIN_AGE_SECONDS:
+                continue
+            if age < max_age_days * 86400 and total - freed <= max_bytes:
+                continue
+            try:
+                os.remove(path)
+                removed += 1
+                freed += size
+            except OSError as e:
+                logger.warning(f"⚠️ Could not delete chart {path}: {e}")
+
+        self._last_gc = now
+        logger.info(f"🧹 Chart GC removed {removed} of {len(files)} charts, freed {freed / 1024 / 1024:.1f} MB "
+                    f"({(total - freed) / 1024 / 1024:.1f} MB kept, {len(refs)} referenced)")
+        return {'scanned': len(files), 'removed': removed, 'freed_bytes': freed,
+                'kept_bytes': total - freed, 'referenced': len(refs)}
+
+    def maybe_collect(self):
+        """Run collect_garbage() in the background if the last collection is older than GC_INTERVAL."""
+        with self._lock:
+            if self._gc_running or time.time() - self._last_gc < GC_INTERVAL:
+                return False
+            self._gc_running = True
+            self._last_gc = time.time()
+
+        def run():
+            try:
+                self.collect_garbage()
+            except Exception as e:
+                logger.error(f"❌ Chart GC failed: {e}")
+            finally:
+                self._gc_running = False
+
+        threading.Thread(target=run, name='chart-gc', daemon=True).start()
+        return True
+
+
+chart_store = ChartStore()
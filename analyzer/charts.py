@@ -0,0 +1,314 @@
+"""
+Charts Module - Pure matplotlib renderers for analysis and P&L images
+
+Each renderer draws one chart from a plain data payload (lists, numbers and
+strings only) onto a Figure and render_png() returns the PNG bytes. Nothing
+here touches Django, the filesystem or pyplot, so the same code runs in the
+render service's worker processes and, as a fallback, in-process.
+
+Figures are kept per chart kind (and thread) and cleared between renders,
+so a worker reuses its canvas and figure setup instead of building a new
+figure each time.
+"""
+import io
+import logging
+import threading
+import time
+
+import matplotlib
+matplotlib.use('Agg')
+from matplotlib.figure import Figure
+
+logger = logging.getLogger(__name__)
+
+PAYOFF_LOSS_FLOOR = -15000  # Payoff curves are clipped at this loss for readability
+
+_local = threading.local()  # Figures per thread, so in-process fallback renders never share one
+
+
+def draw_summary(fig, payload):
+    """Strike table image: title, spot/expiry box and the styled strategy table."""
+    instrument_name = payload['instrument']
+    expiry_label = payload['expiry_label']
+    rows = payload['rows']
+    columns = ['Entry', 'CE Strike', 'CE Price', 'PE Strike', 'PE Price', 'Target/SL']
+
+    ax = fig.add_subplot()
+    fig.patch.set_facecolor('white')
+    ax.axis('off')
+
+    # Professional title with global theme styling
+    fig.suptitle(f'{instrument_name} Options Analysis - {expiry_label}',
+                 fontsize=18, fontweight='bold', y=0.94, color='#1e293b', ha='center')
+
+    # Enhanced info box with global theme styling
+    info_text = f"{instrument_name}: ₹{payload['current_price']}\nExpiry: {expiry_label}\nGenerated: {payload['generated']}"
+    ax.text(0.5, 0.85, info_text, transform=ax.transAxes, ha='center', va='center',
+            fontsize=12, fontfamily='monospace', color='#1e293b', fontweight='600',
+            bbox=dict(boxstyle='round,pad=0.8', facecolor='#f1f5f9',
+                      edgecolor='#2563eb', linewidth=1.5, alpha=0.95))
+
+    # Create professional table with global UI styling
+    table = ax.table(cellText=rows,
+                     colLabels=columns,
+                     colColours=['#2563eb'] * len(columns),  # Professional blue header
+                     cellLoc='center',
+                     loc='center',
+                     bbox=[0.05, 0.25, 0.9, 0.45])
+
+    # Style the table to match global UI theme
+    table.auto_set_font_size(False)
+    table.set_fontsize(10)
+    table.scale(1, 2.5)  # Better row height
+
+    # Header styling - matching Bootstrap primary theme
+    for col in range(len(columns)):
+        cell = table[(0, col)]
+        cell.get_text().set_color('white')
+        cell.get_text().set_fontweight('bold')
+        cell.set_facecolor('#2563eb')  # Professional blue matching our theme
+        cell.set_text_props(fontsize=11)
+        cell.set_edgecolor('#1d4ed8')  # Darker blue border
+        cell.set_linewidth(1.5)
+
+    # Data cell styling with clean alternating colors matching global theme
+    for row in range(1, len(rows) + 1):
+        for col in range(len(columns)):
+            cell = table[(row, col)]
+            # Match our global clean card colors
+            if row % 2 == 0:
+                cell.set_facecolor('#f8fafc')  # Light gray-blue like our cards
+            else:
+                cell.set_facecolor('#ffffff')  # Pure white
+
+            # Text styling matching global theme
+            cell.get_text().set_color('#1e293b')  # Dark text matching our headings
+            cell.get_text().set_fontweight('600')  # Semi-bold like our table data
+            cell.set_edgecolor('#e2e8f0')  # Light border matching our cards
+            cell.set_linewidth(1)
+
+            # Add special styling for numeric columns (prices and targets)
+            if col in [2, 4, 5]:  # Price and Target columns
+                cell.get_text().set_fontfamily('monospace')  # Monospace for numbers
+                cell.get_text().set_fontweight('bold')
+                if col == 5:  # Target/SL column - format as integer since rounded to 50
+                    cell.get_text().set_color('#16a34a')  # Green for target amounts
+                    # Format target values as integers since they're rounded to 50
+                    current_text = cell.get_text().get_text()
+                    if current_text and current_text.replace('.', '').isdigit():
+                        cell.get_text().set_text(f"₹{int(float(current_text))}")
+
+    # Enhanced footer with global theme styling
+    footer_text = f"Risk Management: 1:1 Target/SL Ratio"
+    ax.text(0.5, 0.15, footer_text, transform=ax.transAxes, ha='center', va='center',
+            fontsize=12, fontweight='bold', color='#16a34a',
+            bbox=dict(boxstyle='round,pad=0.4', facecolor='#f0fdf4',
+                      edgecolor='#16a34a', alpha=0.8, linewidth=1))
+
+    # Clean disclaimer with global theme
+    ax.text(0.5, 0.06, "For educational purposes only",
+            transform=ax.transAxes, ha='center', va='center',
+            fontsize=9, color='#64748b', style='italic')
+
+    # Centered FiFTO branding with enhanced styling
+    ax.text(0.5, 0.02, "FiFTO Analytics", transform=ax.transAxes, ha='center', va='center',
+            fontsize=11, color='#16a34a', fontweight='bold', alpha=0.9)
+
+
+def draw_payoff(fig, payload):
+    """Payoff diagram at expiry (plus today's mark-to-model curve) with breakevens and stats box."""
+    instrument_name = payload['instrument']
+    expiry_label = payload['expiry_label']
+    current_price = payload['current_price']
+    price_range = payload['prices']
+    pnl = [max(p, PAYOFF_LOSS_FLOOR) for p in payload['expiry_pnl']]
+    max_profit = payload['max_profit']
+    # No breakeven when the position never crosses zero (e.g. zero or negative net premium)
+    breakevens = payload['breakevens'] or []
+
+    ax = fig.add_subplot()
+    ax.set_facecolor('white')
+
+    # Adjust subplot to make room for external text
+    fig.subplots_adjust(right=0.75)
+
+    # Plot payoff line with thinner line styling
+    ax.plot(price_range, pnl, color='#2563eb', linewidth=2, label='Payoff Curve', alpha=0.9)
+
+    # Mark-to-model curve for today when time to expiry is left
+    if payload.get('today_pnl') is not None:
+        today_pnl = [max(p, PAYOFF_LOSS_FLOOR) for p in payload['today_pnl']]
+        ax.plot(price_range, today_pnl, color='#7c3aed', linewidth=1.5, linestyle=':', alpha=0.8,
+                label=f"Today ({payload['today_dte']:.0f} DTE)")
+
+    # Fill profit/loss areas with clean colors
+    ax.fill_between(price_range, pnl, 0, where=[p >= 0 for p in pnl],
+                    color='#16a34a', alpha=0.2, label='Profit Zone', interpolate=True)
+    ax.fill_between(price_range, pnl, 0, where=[p < 0 for p in pnl],
+                    color='#dc2626', alpha=0.2, label='Loss Zone', interpolate=True)
+
+    # Add breakeven lines with thinner styling
+    if len(breakevens) == 1:
+        ax.axvline(x=breakevens[0], color='#f59e0b', linestyle='--', alpha=0.8, linewidth=1.5,
+                   label=f'BE: {breakevens[0]:.0f}')
+    elif breakevens:
+        ax.axvline(x=breakevens[0], color='#f59e0b', linestyle='--', alpha=0.8, linewidth=1.5,
+                   label=f'Lower BE: {breakevens[0]:.0f}')
+        ax.axvline(x=breakevens[-1], color='#f59e0b', linestyle='--', alpha=0.8, linewidth=1.5,
+                   label=f'Upper BE: {breakevens[-1]:.0f}')
+
+    # Add current price line with thinner styling
+    ax.axvline(x=current_price, color='#1e293b', linestyle='-', alpha=0.9, linewidth=2,
+               label=f'Current: {current_price:.0f}')
+
+    # Zero line
+    ax.axhline(y=0, color='#64748b', linestyle='-', alpha=0.4, linewidth=1)
+
+    # Highlight max profit point with better positioning
+    mid_point = sum(payload['max_profit_range']) / 2
+    ax.scatter([mid_point], [max_profit], color='#16a34a', s=100, zorder=5,
+               edgecolor='white', linewidth=2)
+
+    # Position annotation to avoid overlap - adjust based on chart position
+    annotation_offset_y = 20 if max_profit > 0 else -30
+    ax.annotate(f'₹{max_profit:.0f}',
+                xy=(mid_point, max_profit), xytext=(0, annotation_offset_y),
+                textcoords='offset points', color='#16a34a', fontweight='bold',
+                fontsize=10, ha='center', va='center',
+                arrowprops=dict(arrowstyle='->', color='#16a34a', alpha=0.7, lw=1.5),
+                bbox=dict(boxstyle='round,pad=0.3', facecolor='white',
+                          edgecolor='#16a34a', alpha=0.9, linewidth=1))
+
+    # Calculate auto-adjusted Y-axis limits based on data
+    min_pnl = min(pnl)
+    max_pnl = max(pnl)
+    y_margin = max(abs(min_pnl), abs(max_pnl)) * 0.1  # 10% margin
+    ax.set_ylim(min_pnl - y_margin, max_pnl + y_margin)
+
+    # Auto-adjust X-axis for better view
+    x_margin = (current_price * 1.15 - current_price * 0.85) * 0.05  # 5% margin
+    ax.set_xlim(current_price * 0.85 - x_margin, current_price * 1.15 + x_margin)
+
+    # Professional title and labels - with better spacing
+    ax.set_title(f'{instrument_name} Payoff Analysis - {expiry_label}',
+                 fontsize=16, fontweight='bold', color='#1e293b', pad=30)
+    ax.set_xlabel('Price at Expiry (₹)', fontsize=12, color='#374151', fontweight='600')
+    ax.set_ylabel('Profit/Loss (₹)', fontsize=12, color='#374151', fontweight='600')
+
+    # Clean grid
+    ax.grid(True, alpha=0.3, linestyle='-', color='#e5e7eb', linewidth=0.8)
+    ax.set_axisbelow(True)
+
+    # Style legend with better positioning - move to upper left to avoid overlap
+    legend = ax.legend(loc='upper left', fancybox=True, shadow=False,
+                       frameon=True, facecolor='white', edgecolor='#e5e7eb',
+                       fontsize=10, framealpha=0.95)
+    legend.get_frame().set_linewidth(1)
+    for text in legend.get_texts():
+        text.set_color('#374151')
+
+    # Clean tick styling
+    ax.tick_params(colors='#6b7280', which='both', labelsize=10)
+    for spine in ax.spines.values():
+        spine.set_color('#d1d5db')
+        spine.set_linewidth(1)
+
+    # Improved statistics box positioning - move to upper right, outside plot area
+    breakeven_text = f"{breakevens[0]:.0f} - {breakevens[-1]:.0f}" if breakevens else "none"
+    stats_text = f'''Max Profit: ₹{max_profit:.0f}
+Breakeven: {breakeven_text}
+Max Loss: ₹{min_pnl:.0f}'''
+
+    ax.text(1.02, 0.98, stats_text, transform=ax.transAxes, fontsize=10, ha='left',
+            verticalalignment='top', fontfamily='monospace',
+            bbox=dict(boxstyle='round,pad=0.5', facecolor='#f8fafc',
+                      alpha=0.95, edgecolor='#e2e8f0', linewidth=1),
+            color='#334155')
+
+    # Move FiFTO branding to bottom right, outside plot area
+    ax.text(1.02, 0.02, "FiFTO Analytics", transform=ax.transAxes, ha='left', va='bottom',
+            fontsize=10, color='#16a34a', fontweight='bold', alpha=0.8)
+    fig.tight_layout()
+
+
+def pl_update_size(payload):
+    num_lines = 1 + sum(len(trades) + 1.5 for trades in payload['tags'].values())
+    return 8, max(3, num_lines * 0.4)
+
+
+def draw_pl_update(fig, payload):
+    """Dark P&L card for Telegram: per-tag totals and per-trade lines."""
+    num_lines = 1 + sum(len(trades) + 1.5 for trades in payload['tags'].values())
+
+    ax = fig.add_subplot()
+    ax.axis('off')
+
+    fig.text(0.5, 0.95, payload['title'], ha='center', va='top', fontsize=18, fontweight='bold', color='#f0f0f0')
+
+    y_pos = 0.85
+    line_height = 1.0 / (num_lines + 2)
+
+    for tag, trades in sorted(payload['tags'].items()):
+        tag_pnl = sum(t['pnl'] for t in trades)
+        tag_color = '#28a745' if tag_pnl >= 0 else '#dc3545'
+        ax.text(0.1, y_pos, f"{tag}", ha='left', va='top', fontsize=14, fontweight='bold', color='#007bff')
+        ax.text(0.9, y_pos, f"₹{tag_pnl:,.2f}", ha='right', va='top', fontsize=14, fontweight='bold', color=tag_color)
+        y_pos -= line_height * 1.2
+
+        for trade in trades:
+            pnl = trade['pnl']
+            pnl_color = '#28a745' if pnl >= 0 else '#dc3545'
+
+            ax.text(0.15, y_pos, f"• {trade['reward_type']}:", ha='left', va='top', fontsize=13, color='#cccccc')
+            ax.text(0.85, y_pos, f"₹{pnl:,.2f}", ha='right', va='top', fontsize=13, color=pnl_color, family='monospace')
+            y_pos -= line_height
+
+        y_pos -= (line_height / 2)
+
+    fig.text(0.98, 0.02, payload['timestamp'], ha='right', va='bottom', fontsize=9, color='#888888')
+
+
+# kind -> (draw function, figure size or size function, facecolor, savefig pad_inches)
+FIGURE_TEMPLATES = {
+    'summary': (draw_summary, (12, 8), 'white', 0.3),
+    'payoff': (draw_payoff, (16, 9), 'white', 0.5),
+    'pl_update': (draw_pl_update, pl_update_size, '#1e1e1e', 0.1),
+}
+
+
+def _figure_for(kind, size, facecolor):
+    """The reusable figure for a chart kind, cleared and resized for the next render."""
+    figures = _local.__dict__.setdefault('figures', {})
+    fig = figures.get(kind)
+    if fig is None:
+        fig = figures[kind] = Figure(figsize=size, facecolor=facecolor)
+    else:
+        fig.clear()
+        fig.subplotpars.update(**{name: matplotlib.rcParams[f'figure.subplot.{name}']
+                                  for name in ('left', 'right', 'bottom', 'top', 'wspace', 'hspace')})
+        fig.set_size_inches(size)
+        fig.set_facecolor(facecolor)
+    return fig
+
+
+def render_png(kind, payload, dpi=150):
+    """Render a chart kind from its payload. Returns (png bytes, render seconds)."""
+    start = time.perf_counter()
+    draw, size, facecolor, pad_inches = FIGURE_TEMPLATES[kind]
+    size = size(payload) if callable(size) else size
+    fig = _figure_for(kind, size, facecolor)
+    try:
+        draw(fig, payload)
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format='png', dpi=dpi, bbox_inches='tight', facecolor=facecolor,
+                    edgecolor='none', pad_inches=pad_inches)
+    except Exception:
+        _local.figures.pop(kind, None)  # Never reuse a half-drawn figure
+        raise
+    return buffer.getvalue(), time.perf_counter() - start
+
+
+def warm_up():
+    """Load fonts, the Agg backend and the mathtext/table code paths before the first real render."""
+    render_png('pl_update', {'title': 'warm-up', 'tags': {'Tag': [{'reward_type': 'High Reward', 'pnl': 1.0}]},
+                             'timestamp': ''}, dpi=20)
@@ -17,6 +17,7 @@ IMPORTANT: This is for DATA API access only, NOT for trading operations.
 
 import os
 import requests
+import threading
 import time
 from datetime import datetime, timedelta  # added timedelta
 import logging
@@ -63,27 +64,36 @@ class DhanHQIntegration:
         # Rate limiting - More conservative to avoid API limits
         self.last_request_time = 0
         self.rate_limit_delay = 2.0  # 2 seconds between requests to be extra safe
+        self.last_option_chain_request = 0
+        
+        # Locks so concurrent fetchers (batch analysis) share the same rate budget
+        self._rate_lock = threading.Lock()
+        self._option_chain_rate_lock = threading.Lock()
+        self._cache_lock = threading.Lock()
         
         # Simple in-memory cache to reduce API calls
         self.cache = {}
         self.cache_duration = 30  # Cache data for 30 seconds to reduce API calls
         
         if not self.client_id or not self.access_token:
-            print("⚠️  DhanHQ credentials not found. Using fallback mode.")
+            logger.warning("⚠️  DhanHQ credentials not found. Using fallback mode.")
         else:
-            print("✅ DhanHQ API v2 initialized successfully")
-            print(f"🔑 Client ID: {self.client_id}")
+            logger.info("✅ DhanHQ API v2 initialized successfully")
+            logger.info(f"🔑 Client ID: {self.client_id}")
     
-    def _rate_limit(self):
-        """Enforce rate limiting as per DhanHQ guidelines"""
-        current_time = time.time()
-        time_since_last_request = current_time - self.last_request_time
-        
-        if time_since_last_request < self.rate_limit_delay:
-            sleep_time = self.rate_limit_delay - time_since_last_request
+    def _reserve_slot(self, lock, attr, delay):
+        """Reserve the next request slot under the lock, then sleep outside it until the slot."""
+        with lock:
+            slot = max(time.time(), getattr(self, attr) + delay)
+            setattr(self, attr, slot)
+        sleep_time = slot - time.time()
+        if sleep_time > 0:
             time.sleep(sleep_time)
-        
-        self.last_request_time = time.time()
+        return sleep_time
+    
+    def _rate_limit(self):
+        """Enforce rate limiting as per DhanHQ guidelines (thread-safe)"""
+        self._reserve_slot(self._rate_lock, 'last_request_time', self.rate_limit_delay)
     
     def _get_cache_key(self, method, params):
         """Generate cache key for request"""
@@ -91,21 +101,24 @@ class DhanHQIntegration:
     
     def _get_cached_data(self, cache_key):
         """Get data from cache if still valid"""
-        if cache_key in self.cache:
-            cached_time, cached_data = self.cache[cache_key]
+        with self._cache_lock:
+            entry = self.cache.get(cache_key)
+        if entry:
+            cached_time, cached_data = entry
             if time.time() - cached_time < self.cache_duration:
-                print(f"📋 Using cached data for {cache_key}")
+                logger.debug(f"📋 Using cached data for {cache_key}")
                 return cached_data
         return None
     
     def _set_cached_data(self, cache_key, data):
         """Store data in cache with timestamp"""
-        self.cache[cache_key] = (time.time(), data)
-        # Clean old cache entries to prevent memory buildup
-        current_time = time.time()
-        expired_keys = [k for k, (t, _) in self.cache.items() if current_time - t > self.cache_duration * 2]
-        for k in expired_keys:
-            del self.cache[k]
+        with self._cache_lock:
+            self.cache[cache_key] = (time.time(), data)
+            # Clean old cache entries to prevent memory buildup
+            current_time = time.time()
+            expired_keys = [k for k, (t, _) in self.cache.items() if current_time - t > self.cache_duration * 2]
+            for k in expired_keys:
+                del self.cache[k]
     
     def get_current_price(self, instrument):
         """
@@ -126,13 +139,13 @@ class DhanHQIntegration:
         try:
             symbol_data = self.symbol_map.get(instrument.upper())
             if not symbol_data:
-                print(f"❌ Symbol {instrument} not found in mapping")
+                logger.error(f"❌ Symbol {instrument} not found in mapping")
                 return self._get_fallback_price(instrument)
             
             # Apply rate limiting
             self._rate_limit()
             
-            print(f"🔄 Fetching DhanHQ LTP for {instrument}...")
+            logger.info(f"🔄 Fetching DhanHQ LTP for {instrument}...")
             
             # Prepare request according to DhanHQ API v2 documentation
             # Format: {"IDX_I": [13]} for indices
@@ -142,14 +155,14 @@ class DhanHQIntegration:
             
             url = f"{self.base_url}/marketfeed/ltp"
             
-            print(f"📊 Request URL: {url}")
-            print(f"📊 Request Body: {request_body}")
-            print(f"📊 Headers: {dict(self.headers)}")
+            logger.debug(f"📊 Request URL: {url}")
+            logger.debug(f"📊 Request Body: {request_body}")
+            logger.debug(f"📊 Headers: {dict(self.headers)}")
             
             response = requests.post(url, headers=self.headers, json=request_body, timeout=10)
             
-            print(f"📊 Response Status: {response.status_code}")
-            print(f"📊 Response Content: {response.text}")
+            logger.debug(f"📊 Response Status: {response.status_code}")
+            logger.debug(f"📊 Response Content: {response.text}")
             
             if response.status_code == 200:
                 data = response.json()
@@ -162,25 +175,25 @@ class DhanHQIntegration:
                     if 'last_price' in security_data:
                         price = float(security_data['last_price'])
                         result = price
-                        print(f"✅ DhanHQ LTP for {instrument}: ₹{price:,.2f}")
+                        logger.info(f"✅ DhanHQ LTP for {instrument}: ₹{price:,.2f}")
                         
                         # Cache the successful result
                         self._set_cached_data(cache_key, result)
                         return result
                         
-                print(f"⚠️  No valid price data from DhanHQ for {instrument}")
+                logger.warning(f"⚠️  No valid price data from DhanHQ for {instrument}")
                 return self._get_fallback_price(instrument)
                 
             elif response.status_code == 429:
-                print(f"⚠️  Rate limit exceeded for {instrument} - will retry later")
+                logger.warning(f"⚠️  Rate limit exceeded for {instrument} - will retry later")
                 return self._get_fallback_price(instrument)
                 
             else:
-                print(f"❌ DhanHQ API error {response.status_code} for {instrument}: {response.text}")
+                logger.error(f"❌ DhanHQ API error {response.status_code} for {instrument}: {response.text}")
                 return self._get_fallback_price(instrument)
                 
         except Exception as e:
-            print(f"❌ DhanHQ price fetch error for {instrument}: {e}")
+            logger.error(f"❌ DhanHQ price fetch error for {instrument}: {e}")
             return self._get_fallback_price(instrument)
     
     def get_ohlc_data(self, instrument):
@@ -222,18 +235,21 @@ class DhanHQIntegration:
                             'low': float(security_data['ohlc'].get('low', 0)),
                             'close': float(security_data['ohlc'].get('close', 0))
                         }
-                        print(f"✅ DhanHQ OHLC for {instrument}: {result}")
+                        logger.info(f"✅ DhanHQ OHLC for {instrument}: {result}")
                         return result
                         
         except Exception as e:
-            print(f"❌ DhanHQ OHLC fetch error for {instrument}: {e}")
+            logger.error(f"❌ DhanHQ OHLC fetch error for {instrument}: {e}")
         
         return None
     
-    def get_current_prices(self, instruments):
-        """Batch fetch current prices (LTP) for a list of instruments with one API call per exchange."""
+    def get_current_prices(self, instruments, fallback=True):
+        """
+        Batch fetch current prices (LTP) for a list of instruments with one API call per exchange.
+        Symbols without a live price get the fallback price, or with fallback=False are left out.
+        """
         if not self.client_id or not self.access_token:
-            return {sym: self._get_fallback_price(sym) for sym in instruments}
+            return {sym: self._get_fallback_price(sym) for sym in instruments} if fallback else {}
         # Group security IDs by exchange
         exchange_map = {}
         symbol_lookup = {}
@@ -248,9 +264,9 @@ class DhanHQIntegration:
         request_body = {ex: list(ids) for ex, ids in exchange_map.items()}
         self._rate_limit()
         url = f"{self.base_url}/marketfeed/ltp"
+        result = {}
         try:
             resp = requests.post(url, headers=self.headers, json=request_body, timeout=10)
-            result = {}
             if resp.status_code == 200:
                 data = resp.json().get('data', {})
                 for ex, sec_dict in data.items():
@@ -260,16 +276,18 @@ class DhanHQIntegration:
                             try:
                                 result[sym] = float(payload['last_price'])
                             except (TypeError, ValueError):
-                                result[sym] = self._get_fallback_price(sym)
+                                pass
+            else:
+                logger.error(f"❌ Batch LTP error {resp.status_code}: {resp.text}")
+        except Exception as e:
+            logger.error(f"❌ Batch LTP error: {e}")
+        if fallback:
             # Fill fallbacks for any missing symbols
             for sym in instruments:
                 us = sym.upper()
                 if us not in result:
                     result[us] = self._get_fallback_price(us)
-            return result
-        except Exception as e:
-            print(f"❌ Batch LTP error: {e}")
-            return {sym.upper(): self._get_fallback_price(sym) for sym in instruments}
+        return result
 
     def get_ohlc_data_batch(self, instruments):
         """Batch fetch OHLC for list of instruments using single OHLC call per exchange."""
@@ -310,7 +328,7 @@ class DhanHQIntegration:
                                 results[sym] = None
             return results
         except Exception as e:
-            print(f"❌ Batch OHLC error: {e}")
+            logger.error(f"❌ Batch OHLC error: {e}")
             return results
 
     def get_historical_data(self, instrument, period='1y'):
@@ -333,7 +351,7 @@ class DhanHQIntegration:
         try:
             symbol_data = self.symbol_map.get(instrument.upper())
             if not symbol_data:
-                print(f"❌ Symbol data not found for {instrument}")
+                logger.error(f"❌ Symbol data not found for {instrument}")
                 return None
             
             # Apply rate limiting
@@ -356,7 +374,7 @@ class DhanHQIntegration:
             else:
                 start_date = end_date - timedelta(days=30)
             
-            print(f"🔄 Fetching DhanHQ historical data for {instrument}...")
+            logger.info(f"🔄 Fetching DhanHQ historical data for {instrument}...")
             
             # Prepare request according to DhanHQ API v2 documentation
             # Based on: https://dhanhq.co/docs/v2/historical-data/#daily-historical-data
@@ -373,16 +391,16 @@ class DhanHQIntegration:
             # Use correct v2 endpoint (not /v2/charts/historical but /charts/historical)
             url = "https://api.dhan.co/charts/historical"
             
-            print(f"📊 Historical Request URL: {url}")
-            print(f"📊 Historical Request Body: {request_body}")
+            logger.debug(f"📊 Historical Request URL: {url}")
+            logger.debug(f"📊 Historical Request Body: {request_body}")
             
             response = requests.post(url, headers=self.headers, json=request_body, timeout=10)
             
-            print(f"📊 Historical Response Status: {response.status_code}")
+            logger.debug(f"📊 Historical Response Status: {response.status_code}")
             
             if response.status_code == 200:
                 data = response.json()
-                print(f"📊 Historical Response Keys: {list(data.keys()) if isinstance(data, dict) else 'Not dict'}")
+                logger.debug(f"📊 Historical Response Keys: {list(data.keys()) if isinstance(data, dict) else 'Not dict'}")
                 
                 # DhanHQ v2 returns data as direct arrays (not nested in 'data' field)
                 # Check for the required arrays directly in response
@@ -401,34 +419,34 @@ class DhanHQIntegration:
                                 'Volume': float(data.get('volume', [0] * len(data['timestamp']))[i])
                             })
                         except (ValueError, IndexError) as e:
-                            print(f"⚠️ Skipping invalid data point {i}: {e}")
+                            logger.warning(f"⚠️ Skipping invalid data point {i}: {e}")
                             continue
                     
                     if df_data:
                         result = pd.DataFrame(df_data)
                         result.set_index('Date', inplace=True)
-                        print(f"✅ DhanHQ historical data: {len(result)} records for {instrument}")
+                        logger.info(f"✅ DhanHQ historical data: {len(result)} records for {instrument}")
                         
                         # Cache the result
                         self._set_cached_data(cache_key, result)
                         return result
                     else:
-                        print(f"❌ No valid data points found in response")
+                        logger.error(f"❌ No valid data points found in response")
                 else:
-                    print(f"📊 Missing required fields in response. Available keys: {list(data.keys())}")
-                    print(f"📊 Response sample: {str(data)[:500]}")
+                    logger.debug(f"📊 Missing required fields in response. Available keys: {list(data.keys())}")
+                    logger.debug(f"📊 Response sample: {str(data)[:500]}")
                 
             else:
-                print(f"❌ DhanHQ historical API error: {response.status_code}")
+                logger.error(f"❌ DhanHQ historical API error: {response.status_code}")
                 if response.status_code == 400:
                     error_text = response.text
-                    print(f"📊 Error response: {error_text}")
-                    print("💡 Check: securityId format, exchangeSegment, instrument type, date format")
+                    logger.debug(f"📊 Error response: {error_text}")
+                    logger.info("💡 Check: securityId format, exchangeSegment, instrument type, date format")
                 elif response.status_code == 429:
-                    print("⚠️ Rate limit exceeded - will use fallback data")
+                    logger.warning("⚠️ Rate limit exceeded - will use fallback data")
                 
         except Exception as e:
-            print(f"❌ Historical data error for {instrument}: {e}")
+            logger.error(f"❌ Historical data error for {instrument}: {e}")
             import traceback
             traceback.print_exc()
         
@@ -444,13 +462,19 @@ class DhanHQIntegration:
             expiry_date: Expiry date in DD-MMM-YYYY format (e.g., "21-Aug-2025")
         """
         if not self.client_id or not self.access_token:
-            print(f"⚠️  DhanHQ credentials not available for option chain")
+            logger.warning(f"⚠️  DhanHQ credentials not available for option chain")
             return None
         
+        # Check cache first - one snapshot per instrument/expiry for 30 seconds
+        cache_key = self._get_cache_key('optionchain_expiry', {'instrument': instrument, 'expiry': expiry_date})
+        cached_result = self._get_cached_data(cache_key)
+        if cached_result is not None:
+            return cached_result
+        
         try:
             symbol_data = self.symbol_map.get(instrument.upper())
             if not symbol_data:
-                print(f"⚠️  Symbol mapping not found for {instrument}")
+                logger.warning(f"⚠️  Symbol mapping not found for {instrument}")
                 return None
             
             # Convert expiry date from DD-MMM-YYYY to YYYY-MM-DD format required by DhanHQ
@@ -459,10 +483,10 @@ class DhanHQIntegration:
                 date_obj = datetime.strptime(expiry_date, '%d-%b-%Y')
                 formatted_expiry = date_obj.strftime('%Y-%m-%d')
             except ValueError:
-                print(f"❌ Invalid expiry date format: {expiry_date}. Expected DD-MMM-YYYY")
+                logger.error(f"❌ Invalid expiry date format: {expiry_date}. Expected DD-MMM-YYYY")
                 return None
             
-            print(f"🔄 Fetching DhanHQ option chain for {instrument} with expiry {expiry_date} ({formatted_expiry})...")
+            logger.info(f"🔄 Fetching DhanHQ option chain for {instrument} with expiry {expiry_date} ({formatted_expiry})...")
             
             # Apply special rate limiting for option chain (1 request per 3 seconds)
             self._option_chain_rate_limit()
@@ -476,16 +500,16 @@ class DhanHQIntegration:
             
             url = f"{self.base_url}/optionchain"
             
-            print(f"📊 Option Chain Request - Symbol: {instrument}, Expiry: {formatted_expiry}")
-            print(f"📊 Option Chain Request Body: {request_body}")
+            logger.debug(f"📊 Option Chain Request - Symbol: {instrument}, Expiry: {formatted_expiry}")
+            logger.debug(f"📊 Option Chain Request Body: {request_body}")
             
             response = requests.post(url, headers=self.headers, json=request_body, timeout=15)
             
-            print(f"📊 Option Chain Response Status: {response.status_code}")
+            logger.debug(f"📊 Option Chain Response Status: {response.status_code}")
             
             if response.status_code == 200:
                 data = response.json()
-                print(f"📊 Option Chain Response Keys: {list(data.keys()) if isinstance(data, dict) else 'Not dict'}")
+                logger.debug(f"📊 Option Chain Response Keys: {list(data.keys()) if isinstance(data, dict) else 'Not dict'}")
                 
                 # Process and enhance the response
                 if 'data' in data and data['data']:
@@ -500,27 +524,28 @@ class DhanHQIntegration:
                     if 'oc' in data['data']:
                         strike_count = len(data['data']['oc'])
                     
-                    print(f"✅ DhanHQ option chain for {instrument} expiry {expiry_date}: {strike_count} strikes")
+                    logger.info(f"✅ DhanHQ option chain for {instrument} expiry {expiry_date}: {strike_count} strikes")
+                    self._set_cached_data(cache_key, data)
                     return data
                 else:
-                    print(f"📊 Empty or invalid option chain response structure")
-                    print(f"📊 Response preview: {str(data)[:300]}")
+                    logger.debug(f"📊 Empty or invalid option chain response structure")
+                    logger.debug(f"📊 Response preview: {str(data)[:300]}")
             
             elif response.status_code == 400:
                 error_text = response.text
-                print(f"📊 Option Chain 400 Error: {error_text}")
-                print("💡 Check: UnderlyingScrip format (should be integer), UnderlyingSeg, Expiry date format")
+                logger.debug(f"📊 Option Chain 400 Error: {error_text}")
+                logger.info("💡 Check: UnderlyingScrip format (should be integer), UnderlyingSeg, Expiry date format")
             elif response.status_code == 429:
-                print("⚠️ Option chain rate limit exceeded")
+                logger.warning("⚠️ Option chain rate limit exceeded")
             else:
-                print(f"❌ Option chain API error: {response.status_code}")
-                print(f"📊 Response: {response.text[:200]}")
+                logger.error(f"❌ Option chain API error: {response.status_code}")
+                logger.debug(f"📊 Response: {response.text[:200]}")
             
-            print(f"⚠️  No option chain data from DhanHQ for {instrument} expiry {expiry_date}")
+            logger.warning(f"⚠️  No option chain data from DhanHQ for {instrument} expiry {expiry_date}")
             return None
                 
         except Exception as e:
-            print(f"❌ DhanHQ option chain error for {instrument} expiry {expiry_date}: {e}")
+            logger.error(f"❌ DhanHQ option chain error for {instrument} expiry {expiry_date}: {e}")
             import traceback
             traceback.print_exc()
             return None
@@ -534,7 +559,7 @@ class DhanHQIntegration:
         https://dhanhq.co/docs/v2/option-chain/
         """
         if not self.client_id or not self.access_token:
-            print(f"⚠️  DhanHQ credentials not available for option chain")
+            logger.warning(f"⚠️  DhanHQ credentials not available for option chain")
             return None
         
         # Check cache first - option chain cache for 30 seconds
@@ -546,10 +571,10 @@ class DhanHQIntegration:
         try:
             symbol_data = self.symbol_map.get(instrument.upper())
             if not symbol_data:
-                print(f"⚠️  Symbol mapping not found for {instrument}")
+                logger.warning(f"⚠️  Symbol mapping not found for {instrument}")
                 return None
             
-            print(f"🔄 Fetching DhanHQ option chain for {instrument}...")
+            logger.info(f"🔄 Fetching DhanHQ option chain for {instrument}...")
             
             # First, get available expiry dates using the expiry list endpoint
             expiry_dates = self._get_expiry_list_from_api(instrument)
@@ -574,16 +599,16 @@ class DhanHQIntegration:
             
             url = f"{self.base_url}/optionchain"
             
-            print(f"📊 Option Chain Request - Symbol: {instrument}, Expiry: {nearest_expiry}")
-            print(f"📊 Option Chain Request Body: {request_body}")
+            logger.debug(f"📊 Option Chain Request - Symbol: {instrument}, Expiry: {nearest_expiry}")
+            logger.debug(f"📊 Option Chain Request Body: {request_body}")
             
             response = requests.post(url, headers=self.headers, json=request_body, timeout=15)
             
-            print(f"📊 Option Chain Response Status: {response.status_code}")
+            logger.debug(f"📊 Option Chain Response Status: {response.status_code}")
             
             if response.status_code == 200:
                 data = response.json()
-                print(f"📊 Option Chain Response Keys: {list(data.keys()) if isinstance(data, dict) else 'Not dict'}")
+                logger.debug(f"📊 Option Chain Response Keys: {list(data.keys()) if isinstance(data, dict) else 'Not dict'}")
                 
                 # Process and enhance the response with all expiry dates
                 if 'data' in data and data['data']:
@@ -597,50 +622,41 @@ class DhanHQIntegration:
                     if 'oc' in data['data']:
                         strike_count = len(data['data']['oc'])
                     
-                    print(f"✅ DhanHQ option chain for {instrument}: {strike_count} strikes, {len(expiry_dates)} expiry dates")
+                    logger.info(f"✅ DhanHQ option chain for {instrument}: {strike_count} strikes, {len(expiry_dates)} expiry dates")
                     
                     # Cache the result
                     self._set_cached_data(cache_key, data)
                     return data
                 else:
-                    print(f"📊 Empty or invalid option chain response structure")
-                    print(f"📊 Response preview: {str(data)[:300]}")
+                    logger.debug(f"📊 Empty or invalid option chain response structure")
+                    logger.debug(f"📊 Response preview: {str(data)[:300]}")
             
             elif response.status_code == 400:
                 error_text = response.text
-                print(f"📊 Option Chain 400 Error: {error_text}")
-                print("💡 Check: UnderlyingScrip format (should be integer), UnderlyingSeg, Expiry date format")
+                logger.debug(f"📊 Option Chain 400 Error: {error_text}")
+                logger.info("💡 Check: UnderlyingScrip format (should be integer), UnderlyingSeg, Expiry date format")
             elif response.status_code == 429:
-                print("⚠️ Option chain rate limit exceeded - using fallback")
+                logger.warning("⚠️ Option chain rate limit exceeded - using fallback")
             else:
-                print(f"❌ Option chain API error: {response.status_code}")
-                print(f"📊 Response: {response.text[:200]}")
+                logger.error(f"❌ Option chain API error: {response.status_code}")
+                logger.debug(f"📊 Response: {response.text[:200]}")
             
-            print(f"⚠️  No option chain data from DhanHQ for {instrument}")
+            logger.warning(f"⚠️  No option chain data from DhanHQ for {instrument}")
             return None
                 
         except Exception as e:
-            print(f"❌ DhanHQ option chain error for {instrument}: {e}")
+            logger.error(f"❌ DhanHQ option chain error for {instrument}: {e}")
             import traceback
             traceback.print_exc()
             return None
     
     def _option_chain_rate_limit(self):
         """
-        Special rate limiting for option chain API (1 request per 3 seconds)
+        Special rate limiting for option chain API (1 request per 3 seconds, thread-safe)
         """
-        if not hasattr(self, 'last_option_chain_request'):
-            self.last_option_chain_request = 0
-        
-        current_time = time.time()
-        time_since_last_request = current_time - self.last_option_chain_request
-        
-        if time_since_last_request < 3.0:  # 3 seconds minimum
-            sleep_time = 3.0 - time_since_last_request
-            print(f"⏱️ Option chain rate limit: waiting {sleep_time:.1f}s")
-            time.sleep(sleep_time)
-        
-        self.last_option_chain_request = time.time()
+        sleep_time = self._reserve_slot(self._option_chain_rate_lock, 'last_option_chain_request', 3.0)
+        if sleep_time > 0:
+            logger.info(f"⏱️ Option chain rate limit: waited {sleep_time:.1f}s")
     
     def _get_expiry_list_from_api(self, instrument):
         """
@@ -663,7 +679,7 @@ class DhanHQIntegration:
             
             url = f"{self.base_url}/optionchain/expirylist"
             
-            print(f"📅 Fetching expiry list for {instrument}...")
+            logger.info(f"📅 Fetching expiry list for {instrument}...")
             
             response = requests.post(url, headers=self.headers, json=request_body, timeout=10)
             
@@ -671,13 +687,13 @@ class DhanHQIntegration:
                 data = response.json()
                 if data.get('status') == 'success' and 'data' in data:
                     expiry_list = data['data']
-                    print(f"📅 Got {len(expiry_list)} expiry dates from DhanHQ API")
+                    logger.info(f"📅 Got {len(expiry_list)} expiry dates from DhanHQ API")
                     return expiry_list[:10]  # Return first 10 expiries
             
-            print(f"⚠️ Could not fetch expiry list from API (status: {response.status_code})")
+            logger.warning(f"⚠️ Could not fetch expiry list from API (status: {response.status_code})")
             
         except Exception as e:
-            print(f"⚠️ Error fetching expiry list: {e}")
+            logger.warning(f"⚠️ Error fetching expiry list: {e}")
         
         return []
     
@@ -689,7 +705,7 @@ class DhanHQIntegration:
             # Use the new expiry list API endpoint
             return self._get_expiry_list_from_api(instrument)
         except Exception as e:
-            print(f"⚠️  Could not fetch expiry dates from DhanHQ API: {e}")
+            logger.warning(f"⚠️  Could not fetch expiry dates from DhanHQ API: {e}")
             return self._calculate_expiry_dates(instrument)
     
     def _calculate_expiry_dates(self, instrument):
@@ -754,11 +770,11 @@ class DhanHQIntegration:
                 except:
                     continue
             
-            print(f"📅 Calculated {len(formatted_dates)} expiry dates for {instrument}")
+            logger.info(f"📅 Calculated {len(formatted_dates)} expiry dates for {instrument}")
             return formatted_dates[:10]  # Return first 10 expiry dates
             
         except Exception as e:
-            print(f"❌ Error calculating expiry dates: {e}")
+            logger.error(f"❌ Error calculating expiry dates: {e}")
             return []
     
     def _get_next_expiry(self):
@@ -819,7 +835,7 @@ class DhanHQIntegration:
             try:
                 results[sym.upper()] = self.get_historical_data(sym, period)
             except Exception as e:
-                print(f"❌ Historical batch error for {sym}: {e}")
+                logger.error(f"❌ Historical batch error for {sym}: {e}")
                 results[sym.upper()] = None
         return results
 
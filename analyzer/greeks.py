@@ -0,0 +1,467 @@
+"""
+Option Greeks Module - Vectorized Black-Scholes pricing for whole option chains
+
+Implied volatility is solved for every CE and PE strike of a chain at once
+(vectorized Newton iterations safeguarded by bisection), and delta, gamma,
+theta and vega are computed in the same NumPy pass. Results are cached per
+chain snapshot so views and monitors can reuse them without recomputing.
+"""
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+import numpy as np
+import pytz
+
+logger = logging.getLogger(__name__)
+
+IST = pytz.timezone('Asia/Kolkata')
+
+RISK_FREE_RATE = 0.065  # Annualised, continuously compounded
+IV_MIN = 0.005
+IV_MAX = 5.0
+IV_TOLERANCE = 1e-6
+IV_MAX_ITERATIONS = 60
+MIN_TIME_TO_EXPIRY = 1.0 / (365 * 24 * 60)  # One minute, in years
+SECONDS_PER_YEAR = 365 * 24 * 60 * 60
+
+_SQRT_2PI = np.sqrt(2.0 * np.pi)
+
+
+# --- Normal distribution helpers ---
+def norm_pdf(x):
+    """Standard normal probability density."""
+    x = np.asarray(x, dtype=float)
+    return np.exp(-0.5 * x * x) / _SQRT_2PI
+
+
+def norm_cdf(x):
+    """Standard normal cumulative distribution (Abramowitz & Stegun 26.2.17, |error| < 7.5e-8)."""
+    x = np.asarray(x, dtype=float)
+    t = 1.0 / (1.0 + 0.2316419 * np.abs(x))
+    poly = t * (0.319381530 + t * (-0.356563782 + t * (1.781477937 + t * (-1.821255978 + t * 1.330274429))))
+    upper = 1.0 - norm_pdf(x) * poly
+    return np.where(x >= 0, upper, 1.0 - upper)
+
+
+# --- Black-Scholes core ---
+def _prepare(spot, strike, t, sigma, is_call):
+    spot, strike, t, sigma = np.broadcast_arrays(
+        np.asarray(spot, dtype=float), np.asarray(strike, dtype=float),
+        np.asarray(t, dtype=float), np.asarray(sigma, dtype=float))
+    is_call = np.broadcast_to(np.asarray(is_call, dtype=bool), spot.shape)
+    return spot, strike, t, sigma, is_call
+
+
+def _d1_d2(spot, strike, t, sigma, r):
+    t = np.maximum(t, MIN_TIME_TO_EXPIRY)
+    sigma = np.maximum(sigma, IV_MIN)
+    vol_t = sigma * np.sqrt(t)
+    d1 = (np.log(spot / strike) + (r + 0.5 * sigma * sigma) * t) / vol_t
+    return d1, d1 - vol_t
+
+
+def bs_price(spot, strike, t, sigma, is_call, r=RISK_FREE_RATE):
+    """
+    Black-Scholes price for European options. All arguments broadcast together.
+    Expired options (t <= 0) are valued at intrinsic.
+    """
+    spot, strike, t, sigma, is_call = _prepare(spot, strike, t, sigma, is_call)
+    d1, d2 = _d1_d2(spot, strike, t, sigma, r)
+    discount = np.exp(-r * np.maximum(t, 0.0))
+    call = spot * norm_cdf(d1) - strike * discount * norm_cdf(d2)
+    put = strike * discount * norm_cdf(-d2) - spot * norm_cdf(-d1)
+    price = np.where(is_call, call, put)
+    intrinsic = np.where(is_call, np.maximum(spot - strike, 0.0), np.maximum(strike - spot, 0.0))
+    return np.where(t > 0, price, intrinsic)
+
+
+def bs_greeks(spot, strike, t, sigma, is_call, r=RISK_FREE_RATE):
+    """
+    Price and Greeks in one pass.
+
+    Returns a dict of arrays: price, delta, gamma, theta (per calendar day)
+    and vega (per 1 percentage point of volatility).
+    """
+    spot, strike, t, sigma, is_call = _prepare(spot, strike, t, sigma, is_call)
+    live = (t > 0) & np.isfinite(sigma) & (sigma > 0)
+    t_safe = np.maximum(t, MIN_TIME_TO_EXPIRY)
+    sigma_safe = np.where(np.isfinite(sigma), np.maximum(sigma, IV_MIN), IV_MIN)
+    d1, d2 = _d1_d2(spot, strike, t_safe, sigma_safe, r)
+    sqrt_t = np.sqrt(t_safe)
+    discount = np.exp(-r * t_safe)
+    pdf_d1 = norm_pdf(d1)
+    cdf_d1, cdf_d2 = norm_cdf(d1), norm_cdf(d2)
+
+    call_price = spot * cdf_d1 - strike * discount * cdf_d2
+    put_price = call_price - spot + strike * discount  # Put-call parity
+    price = np.where(is_call, call_price, put_price)
+    delta = np.where(is_call, cdf_d1, cdf_d1 - 1.0)
+    gamma = pdf_d1 / (spot * sigma_safe * sqrt_t)
+    vega = spot * pdf_d1 * sqrt_t / 100.0
+    decay = -spot * pdf_d1 * sigma_safe / (2.0 * sqrt_t)
+    call_theta = decay - r * strike * discount * cdf_d2
+    put_theta = decay + r * strike * discount * (1.0 - cdf_d2)
+    theta = np.where(is_call, call_theta, put_theta) / 365.0
+
+    intrinsic = np.where(is_call, np.maximum(spot - strike, 0.0), np.maximum(strike - spot, 0.0))
+    expired_delta = np.where(is_call, (spot > strike).astype(float), -(spot < strike).astype(float))
+    return {
+        'price': np.where(live, price, intrinsic),
+        'delta': np.where(live, delta, expired_delta),
+        'gamma': np.where(live, gamma, 0.0),
+        'theta': np.where(live, theta, 0.0),
+        'vega': np.where(live, vega, 0.0),
+    }
+
+
+def implied_volatility(price, spot, strike, t, is_call, r=RISK_FREE_RATE):
+    """
+    Solve Black-Scholes implied volatility for many options at once.
+
+    Uses vectorized Newton steps inside a shrinking [IV_MIN, IV_MAX] bracket,
+    falling back to bisection wherever a Newton step would leave the bracket.
+    Options whose price violates no-arbitrage bounds, or that have no time
+    value left, get NaN.
+    """
+    price = np.asarray(price, dtype=float)
+    spot, strike, t, price, is_call = _prepare(spot, strike, t, price, is_call)
+    discount = np.exp(-r * np.maximum(t, 0.0))
+    lower = np.where(is_call, np.maximum(spot - strike * discount, 0.0), np.maximum(strike * discount - spot, 0.0))
+    upper = np.where(is_call, spot, strike * discount)
+    valid = (t > 0) & (price > 0) & (price > lower) & (price < upper) & (spot > 0) & (strike > 0)
+
+    lo = np.full(price.shape, IV_MIN)
+    hi = np.full(price.shape, IV_MAX)
+    # Brenner-Subrahmanyam seed, clipped into the bracket
+    t_safe = np.maximum(t, MIN_TIME_TO_EXPIRY)
+    sigma = np.clip(np.sqrt(2.0 * np.pi / t_safe) * price / np.where(spot > 0, spot, 1.0), 0.05, 2.0)
+    active = valid.copy()
+
+    for _ in range(IV_MAX_ITERATIONS):
+        if not active.any():
+            break
+        d1, _d2 = _d1_d2(spot, strike, t_safe, sigma, r)
+        diff = bs_price(spot, strike, t_safe, sigma, is_call, r) - price
+        vega = spot * norm_pdf(d1) * np.sqrt(t_safe)
+
+        converged = np.abs(diff) < IV_TOLERANCE * np.maximum(price, 1.0)
+        active &= ~converged
+        hi = np.where(active & (diff > 0), sigma, hi)
+        lo = np.where(active & (diff < 0), sigma, lo)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            newton = sigma - diff / vega
+        use_bisection = ~np.isfinite(newton) | (newton <= lo) | (newton >= hi)
+        step = np.where(use_bisection, 0.5 * (lo + hi), newton)
+        sigma = np.where(active, step, sigma)
+        active &= (hi - lo) > IV_TOLERANCE
+
+    return np.where(valid, sigma, np.nan)
+
+
+# --- Expiry handling ---
+def parse_expiry(expiry):
+    """Parse an expiry in DD-MMM-YYYY or YYYY-MM-DD format into a date."""
+    if hasattr(expiry, 'year') and not isinstance(expiry, str):
+        return expiry.date() if isinstance(expiry, datetime) else expiry
+    for fmt in ('%d-%b-%Y', '%Y-%m-%d'):
+        try:
+            return datetime.strptime(str(expiry), fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f"Unrecognised expiry date format: {expiry}")
+
+
+def time_to_expiry(expiry, now=None):
+    """Years until 15:30 IST on the expiry date (0 once expired)."""
+    expiry_date = parse_expiry(expiry)
+    expiry_close = IST.localize(datetime(expiry_date.year, expiry_date.month, expiry_date.day, 15, 30))
+    now = now or datetime.now(IST)
+    if now.tzinfo is None:
+        now = IST.localize(now)
+    return max((expiry_close - now).total_seconds(), 0.0) / SECONDS_PER_YEAR
+
+
+# --- Option chain normalisation ---
+def normalize_chain(option_chain_data, expiry=None):
+    """
+    Convert a DhanHQ (data.oc) or NSE (records.data) option chain into sorted NumPy arrays.
+
+    Returns a dict with spot, expiry and per-strike arrays (strikes, ce_ltp,
+    pe_ltp, ce_oi, pe_oi, ce_iv_quoted, pe_iv_quoted), or None when the
+    payload has no usable strikes.
+    """
+    if not option_chain_data:
+        return None
+
+    rows = []
+    spot = None
+    chain_expiry = expiry
+    data = option_chain_data.get('data')
+    if isinstance(data, dict) and isinstance(data.get('oc'), dict):
+        spot = data.get('last_price')
+        if not chain_expiry:
+            chain_expiry = option_chain_data.get('requested_expiry') or (option_chain_data.get('expiryDates') or [None])[0]
+        for strike_str, strike_data in data['oc'].items():
+            try:
+                ce = strike_data.get('ce') or {}
+                pe = strike_data.get('pe') or {}
+                rows.append((float(strike_str),
+                             float(ce.get('last_price') or 0), float(pe.get('last_price') or 0),
+                             float(ce.get('oi') or 0), float(pe.get('oi') or 0),
+                             float(ce.get('implied_volatility') or 0), float(pe.get('implied_volatility') or 0)))
+            except (AttributeError, TypeError, ValueError):
+                continue
+    elif isinstance(option_chain_data.get('records'), dict):
+        records = option_chain_data['records']
+        spot = records.get('underlyingValue')
+        if not chain_expiry:
+            chain_expiry = (records.get('expiryDates') or option_chain_data.get('expiryDates') or [None])[0]
+        for item in records.get('data') or []:
+            if chain_expiry and item.get('expiryDate') != chain_expiry:
+                continue
+            try:
+                ce = item.get('CE') or {}
+                pe = item.get('PE') or {}
+                rows.append((float(item['strikePrice']),
+                             float(ce.get('lastPrice') or 0), float(pe.get('lastPrice') or 0),
+                             float(ce.get('openInterest') or 0), float(pe.get('openInterest') or 0),
+                             float(ce.get('impliedVolatility') or 0), float(pe.get('impliedVolatility') or 0)))
+            except (KeyError, TypeError, ValueError):
+                continue
+
+    if not rows or not spot or not chain_expiry:
+        return None
+
+    table = np.array(sorted(rows), dtype=float)
+    return {
+        'spot': float(spot),
+        'expiry': chain_expiry,
+        'strikes': table[:, 0],
+        'ce_ltp': table[:, 1],
+        'pe_ltp': table[:, 2],
+        'ce_oi': table[:, 3],
+        'pe_oi': table[:, 4],
+        'ce_iv_quoted': table[:, 5],
+        'pe_iv_quoted': table[:, 6],
+    }
+
+
+def chain_fingerprint(chain):
+    """Stable hash identifying a normalized chain snapshot."""
+    digest = hashlib.sha1()
+    digest.update(f"{chain['spot']:.4f}|{chain['expiry']}|{datetime.now(IST).date()}".encode())
+    for key in ('strikes', 'ce_ltp', 'pe_ltp'):
+        digest.update(np.ascontiguousarray(chain[key]).tobytes())
+    return digest.hexdigest()
+
+
+# --- Snapshot cache ---
+class ChainGreeksCache:
+    """Thread-safe LRU of computed chain Greeks keyed by chain snapshot fingerprint."""
+
+    def __init__(self, max_entries=32):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, fingerprint):
+        with self._lock:
+            result = self._entries.get(fingerprint)
+            if result is not None:
+                self._entries.move_to_end(fingerprint)
+            return result
+
+    def put(self, fingerprint, result):
+        with self._lock:
+            self._entries[fingerprint] = result
+            self._entries.move_to_end(fingerprint)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+chain_greeks_cache = ChainGreeksCache()
+
+
+def get_chain_greeks(option_chain_data, expiry=None, r=RISK_FREE_RATE):
+    """
+    IV and Greeks for every CE and PE strike of an option chain.
+
+    Both sides are solved together in a single vectorized pass. Returns a dict
+    with fingerprint, spot, expiry, t, strikes and per-side dicts ('ce', 'pe')
+    of iv, delta, gamma, theta and vega arrays aligned with strikes; None if
+    the chain cannot be normalized.
+    """
+    chain = normalize_chain(option_chain_data, expiry)
+    if chain is None:
+        return None
+
+    fingerprint = chain_fingerprint(chain)
+    cached = chain_greeks_cache.get(fingerprint)
+    if cached is not None:
+        return cached
+
+    try:
+        t = time_to_expiry(chain['expiry'])
+    except ValueError as e:
+        logger.warning(f"Cannot price chain: {e}")
+        return None
+
+    strikes = chain['strikes']
+    n = len(strikes)
+    all_strikes = np.concatenate([strikes, strikes])
+    all_prices = np.concatenate([chain['ce_ltp'], chain['pe_ltp']])
+    is_call = np.concatenate([np.ones(n, dtype=bool), np.zeros(n, dtype=bool)])
+
+    iv = implied_volatility(all_prices, chain['spot'], all_strikes, t, is_call, r)
+    greeks = bs_greeks(chain['spot'], all_strikes, t, iv, is_call, r)
+    # Strikes without a solvable IV carry no meaningful Greeks
+    for key in ('delta', 'gamma', 'theta', 'vega'):
+        greeks[key] = np.where(np.isfinite(iv), greeks[key], np.nan)
+
+    def side(sl):
+        return {
+            'iv': iv[sl],
+            'delta': greeks['delta'][sl],
+            'gamma': greeks['gamma'][sl],
+            'theta': greeks['theta'][sl],
+            'vega': greeks['vega'][sl],
+        }
+
+    result = {
+        'fingerprint': fingerprint,
+        'spot': chain['spot'],
+        'expiry': chain['expiry'],
+        't': t,
+        'strikes': strikes,
+        'ce_ltp': chain['ce_ltp'],
+        'pe_ltp': chain['pe_ltp'],
+        'ce': side(slice(0, n)),
+        'pe': side(slice(n, 2 * n)),
+    }
+    chain_greeks_cache.put(fingerprint, result)
+    return result
+
+
+def strike_greeks(chain_greeks, side, strike):
+    """
+    Display-ready Greeks for one strike of a get_chain_greeks() result.
+
+    Returns model_iv (percent), delta, gamma, theta and vega rounded for
+    display, with None for anything unavailable.
+    """
+    empty = {'model_iv': None, 'delta': None, 'gamma': None, 'theta': None, 'vega': None}
+    if chain_greeks is None:
+        return empty
+    matches = np.flatnonzero(chain_greeks['strikes'] == float(strike))
+    if not len(matches):
+        return empty
+    i = matches[0]
+    values = chain_greeks[side]
+
+    def rounded(value, digits):
+        return round(float(value), digits) if np.isfinite(value) else None
+
+    return {
+        'model_iv': rounded(values['iv'][i] * 100, 2),
+        'delta': rounded(values['delta'][i], 3),
+        'gamma': rounded(values['gamma'][i], 5),
+        'theta': rounded(values['theta'][i], 2),
+        'vega': rounded(values['vega'][i], 2),
+    }
+
+
+def interpolate_iv(chain_greeks, strikes, is_call):
+    """Linearly interpolate the chain's solved IV smile at arbitrary strikes (flat beyond the wings)."""
+    strikes = np.asarray(strikes, dtype=float)
+    is_call = np.broadcast_to(np.asarray(is_call, dtype=bool), strikes.shape)
+    out = np.full(strikes.shape, np.nan)
+    for flag, key in ((True, 'ce'), (False, 'pe')):
+        iv = chain_greeks[key]['iv']
+        ok = np.isfinite(iv)
+        if not ok.any():
+            continue
+        mask = is_call == flag
+        out[mask] = np.interp(strikes[mask], chain_greeks['strikes'][ok], iv[ok])
+    return out
+
+
+# --- Held positions ---
+def trade_legs(trades):
+    """
+    Expand short-strangle trades into per-leg arrays.
+
+    Each Running trade contributes a short CE and a short PE leg. Returns a
+    dict of aligned arrays/lists: trade_index, instrument, expiry, strike,
+    is_call and premium (the entry premium of the whole strangle, repeated).
+    """
+    legs = {'trade_index': [], 'instrument': [], 'expiry': [], 'strike': [], 'is_call': []}
+    for i, trade in enumerate(trades):
+        if trade.get('status') != 'Running':
+            continue
+        for strike_key, is_call in (('ce_strike', True), ('pe_strike', False)):
+            try:
+                strike = float(trade.get(strike_key) or 0)
+            except (TypeError, ValueError):
+                continue
+            if strike <= 0:
+                continue
+            legs['trade_index'].append(i)
+            legs['instrument'].append(trade.get('instrument'))
+            legs['expiry'].append(trade.get('expiry'))
+            legs['strike'].append(strike)
+            legs['is_call'].append(is_call)
+    legs['trade_index'] = np.array(legs['trade_index'], dtype=int)
+    legs['strike'] = np.array(legs['strike'], dtype=float)
+    legs['is_call'] = np.array(legs['is_call'], dtype=bool)
+    return legs
+
+
+def _chain_for(chains, instrument, expiry):
+    return chains.get((instrument, expiry)) or chains.get(instrument)
+
+
+def held_leg_greeks(trades, chains, r=RISK_FREE_RATE):
+    """
+    Greeks for every held option leg in one NumPy pass.
+
+    `chains` maps an instrument, or an (instrument, expiry) tuple, to raw
+    option chain data. Each leg uses its own expiry for time to expiry and
+    the chain's IV smile at its strike. Legs without a chain get NaN.
+    Returns the trade_legs() dict extended with spot, t, iv, price, delta,
+    gamma, theta and vega arrays.
+    """
+    legs = trade_legs(trades)
+    n = len(legs['strike'])
+    spot = np.full(n, np.nan)
+    t = np.zeros(n)
+    iv = np.full(n, np.nan)
+
+    groups = {}
+    for i, (instrument, expiry) in enumerate(zip(legs['instrument'], legs['expiry'])):
+        groups.setdefault((instrument, expiry), []).append(i)
+
+    for (instrument, expiry), idx in groups.items():
+        idx = np.array(idx, dtype=int)
+        chain_greeks = get_chain_greeks(_chain_for(chains, instrument, expiry) or {}, None, r)
+        if chain_greeks is None:
+            continue
+        spot[idx] = chain_greeks['spot']
+        try:
+            t[idx] = time_to_expiry(expiry)
+        except ValueError:
+            t[idx] = chain_greeks['t']
+        iv[idx] = interpolate_iv(chain_greeks, legs['strike'][idx], legs['is_call'][idx])
+
+    greeks = bs_greeks(spot, legs['strike'], t, iv, legs['is_call'], r)
+    legs.update({'spot': spot, 't': t, 'iv': iv})
+    for key, values in greeks.items():
+        legs[key] = np.where(np.isfinite(spot), values, np.nan)
+    return legs
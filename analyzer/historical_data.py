@@ -9,6 +9,9 @@ from datetime import datetime, timedelta
 import requests
 from .dhan_api import DhanHQIntegration  # unified import
 import time
+import logging
+
+logger = logging.getLogger(__name__)
 
 class HistoricalDataFetcher:
     """Fetch historical market data from multiple sources"""
@@ -20,7 +23,7 @@ class HistoricalDataFetcher:
             self.dhan_api = DhanHQIntegration()
         except Exception:
             self.dhan_api = None
-            print("⚠️ DhanHQ credentials missing for historical data")
+            logger.warning("⚠️ DhanHQ credentials missing for historical data")
         
         self.symbols = {
             'NIFTY': '^NSEI',
@@ -50,7 +53,7 @@ class HistoricalDataFetcher:
             return self._get_yfinance_historical(symbol, period, interval)
             
         except Exception as e:
-            print(f"❌ Error fetching historical data for {symbol}: {e}")
+            logger.error(f"❌ Error fetching historical data for {symbol}: {e}")
             return self._get_fallback_data(symbol)
             
     def _get_dhan_historical(self, symbol, interval='5m'):
@@ -80,7 +83,7 @@ class HistoricalDataFetcher:
                 'last_updated': datetime.now().strftime('%H:%M:%S')
             }
         except Exception as e:
-            print(f"❌ Dhan historical error: {e}")
+            logger.error(f"❌ Dhan historical error: {e}")
             return None
             
     def _get_yfinance_historical(self, symbol, period='1d', interval='5m'):
@@ -95,7 +98,7 @@ class HistoricalDataFetcher:
             hist = ticker.history(period=period, interval=interval)
             
             if hist.empty:
-                print(f"⚠️ No historical data found for {symbol}")
+                logger.warning(f"⚠️ No historical data found for {symbol}")
                 return self._get_fallback_data(symbol)
             
             # Convert to our format
@@ -123,11 +126,11 @@ class HistoricalDataFetcher:
                 data['change'] = 0
                 data['change_percent'] = 0
                 
-            print(f"✅ Fetched {len(data['prices'])} data points for {symbol}")
+            logger.info(f"✅ Fetched {len(data['prices'])} data points for {symbol}")
             return data
             
         except Exception as e:
-            print(f"❌ yfinance error for {symbol}: {e}")
+            logger.error(f"❌ yfinance error for {symbol}: {e}")
             return self._get_fallback_data(symbol)
             
     def _get_fallback_data(self, symbol):
@@ -178,11 +181,11 @@ class HistoricalDataFetcher:
                 'last_updated': datetime.now().strftime('%H:%M:%S')
             }
             
-            print(f"🔄 Using fallback data for {symbol}")
+            logger.info(f"🔄 Using fallback data for {symbol}")
             return data
             
         except Exception as e:
-            print(f"❌ Fallback data generation error: {e}")
+            logger.error(f"❌ Fallback data generation error: {e}")
             return None
             
     def get_multiple_historical(self, symbols=['NIFTY', 'BANKNIFTY'], period='1d', interval='5m'):
@@ -196,7 +199,7 @@ class HistoricalDataFetcher:
                     results[symbol] = data
                     time.sleep(0.1)  # Small delay to avoid rate limiting
             except Exception as e:
-                print(f"❌ Error fetching {symbol}: {e}")
+                logger.error(f"❌ Error fetching {symbol}: {e}")
                 continue
                 
         return results
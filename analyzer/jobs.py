@@ -0,0 +1,190 @@
+"""
+Jobs Module - Local background job runner persisted to SQLite
+
+Long-running work (an analysis does a zone fetch, a chain fetch and two
+chart renders) is submitted here instead of running on the HTTP request.
+submit() stores the job in the state DB and returns its id immediately;
+a thread pool runs it, recording the current stage and percent complete,
+and the JSON result or error.
+
+Every queued or running job is owned by the process that will run it
+(owner = host:pid) and carries a lease its owner renews every
+HEARTBEAT_SECONDS. Only jobs whose lease expired, i.e. whose owner died,
+are recovered: queued ones are claimed and run here, running ones are
+marked failed. Several processes (workers, runapscheduler) can therefore
+share the table without failing or re-running each other's jobs.
+"""
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from . import state_db
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_WORKERS = 2
+JOB_RETENTION_SECONDS = 2 * 24 * 3600
+HEARTBEAT_SECONDS = 15
+LEASE_SECONDS = 60  # A job whose owner has not renewed its lease for this long is recovered
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    params TEXT NOT NULL,
+    status TEXT NOT NULL,
+    stage TEXT,
+    progress INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    owner TEXT,
+    lease_until REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status);
+"""
+
+QUEUED, RUNNING, COMPLETED, FAILED = 'queued', 'running', 'completed', 'failed'
+
+
+def _run_analysis(params, progress):
+    from . import utils
+
+    analysis_data, status = utils.generate_analysis(
+        params['instrument'], params['calc_type'], params['expiry'],
+        selection=params.get('selection'), progress=progress,
+        render_charts=params.get('render_charts', False))
+    if not analysis_data:
+        raise RuntimeError(status)
+    return {'analysis_data': analysis_data, 'status': status}
+
+
+# kind -> handler(params, progress) returning a JSON-serialisable result
+JOB_HANDLERS = {
+    'analysis': _run_analysis,
+}
+
+
+class JobRunner:
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._executor = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_started(self):
+        if self._executor is not None:
+            return
+        with self._start_lock:
+            if self._executor is not None:
+                return
+            from django.conf import settings
+            max_workers = self.max_workers or getattr(settings, 'JOB_WORKERS', DEFAULT_MAX_WORKERS)
+            state_db.ensure_schema('jobs', SCHEMA)
+            self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+            self._recover()
+            threading.Thread(target=self._heartbeat, name='job-heartbeat', daemon=True).start()
+
+    def _heartbeat(self):
+        """Renew the lease of this process's jobs and recover jobs of dead owners, forever."""
+        while True:
+            time.sleep(HEARTBEAT_SECONDS)
+            try:
+                with state_db.connect() as conn:
+                    conn.execute("UPDATE jobs SET lease_until=? WHERE owner=? AND status IN (?, ?)",
+                                 (time.time() + LEASE_SECONDS, self.owner, QUEUED, RUNNING))
+                self._recover()
+            except Exception as e:
+                logger.warning(f"⚠️ Job heartbeat failed: {e}")
+
+    def _recover(self):
+        """Fail running jobs and claim queued ones whose owner's lease expired; prune old finished jobs."""
+        now = time.time()
+        expired = "(lease_until IS NULL OR lease_until < ?)"
+        with state_db.connect() as conn:
+            interrupted = conn.execute(f"UPDATE jobs SET status=?, error=?, finished_at=? WHERE status=? AND {expired}",
+                                       (FAILED, 'Interrupted: its process stopped', now, RUNNING, now)).rowcount
+            conn.execute("DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?",
+                         (COMPLETED, FAILED, now - JOB_RETENTION_SECONDS))
+            orphaned = conn.execute(f"SELECT id, kind, params FROM jobs WHERE status=? AND {expired} "
+                                    "ORDER BY created_at", (QUEUED, now)).fetchall()
+        claimed = 0
+        for row in orphaned:
+            # Another process may recover the same rows; only the one whose UPDATE matches runs the job
+            with state_db.connect() as conn:
+                taken = conn.execute(f"UPDATE jobs SET owner=?, lease_until=? WHERE id=? AND status=? AND {expired}",
+                                     (self.owner, now + LEASE_SECONDS, row['id'], QUEUED, now)).rowcount
+            if taken:
+                claimed += 1
+                self._executor.submit(self._execute, row['id'], row['kind'], json.loads(row['params']))
+        if interrupted:
+            logger.info(f"🔄 Marked {interrupted} interrupted jobs failed")
+        if claimed:
+            logger.info(f"🔄 Resubmitted {claimed} queued jobs")
+
+    def submit(self, kind, params):
+        """Persist and queue a job; returns its id."""
+        if kind not in JOB_HANDLERS:
+            raise ValueError(f"Unknown job kind: {kind}")
+        self._ensure_started()
+        job_id = uuid.uuid4().hex
+        with state_db.connect() as conn:
+            conn.execute("INSERT INTO jobs (id, kind, params, status, stage, created_at, owner, lease_until) "
+                         "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                         (job_id, kind, json.dumps(params), QUEUED, QUEUED, time.time(),
+                          self.owner, time.time() + LEASE_SECONDS))
+        self._executor.submit(self._execute, job_id, kind, params)
+        logger.info(f"📥 Queued {kind} job {job_id}")
+        return job_id
+
+    def _claim(self, job_id, start):
+        """Move one of this process's queued jobs to running; False if it is no longer ours to run."""
+        with state_db.connect() as conn:
+            return conn.execute("UPDATE jobs SET status=?, stage=?, started_at=?, lease_until=? "
+                                "WHERE id=? AND status=? AND owner=?",
+                                (RUNNING, 'started', start, start + LEASE_SECONDS, job_id, QUEUED, self.owner)).rowcount == 1
+
+    def _update(self, job_id, **fields):
+        columns = ', '.join(f"{name}=?" for name in fields)
+        with state_db.connect() as conn:
+            conn.execute(f"UPDATE jobs SET {columns} WHERE id=?", (*fields.values(), job_id))
+
+    def _execute(self, job_id, kind, params):
+        start = time.time()
+        if not self._claim(job_id, start):
+            logger.info(f"⏭️ {kind} job {job_id} was claimed by another process")
+            return
+
+        def progress(stage, percent):
+            self._update(job_id, stage=stage, progress=int(percent))
+
+        try:
+            result = JOB_HANDLERS[kind](params, progress)
+            self._update(job_id, status=COMPLETED, stage='done', progress=100,
+                         result=json.dumps(result), finished_at=time.time())
+            logger.info(f"✅ {kind} job {job_id} completed in {time.time() - start:.2f}s")
+        except Exception as e:
+            logger.exception(f"❌ {kind} job {job_id} failed")
+            self._update(job_id, status=FAILED, error=str(e), finished_at=time.time())
+
+    def get(self, job_id):
+        """Job as a dict (params/result decoded), or None if the id is unknown."""
+        self._ensure_started()
+        with state_db.connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id=?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job['params'] = json.loads(job['params'])
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        return job
+
+
+job_runner = JobRunner()
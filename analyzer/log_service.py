@@ -0,0 +1,127 @@
+"""
+Log Service Module - Buffered, non-blocking logging for the analyzer app
+
+Every module logs through its own named logger (logging.getLogger(__name__)).
+configure_logging() attaches a single QueueHandler to the 'analyzer' logger,
+so a log call on a request path only enqueues the record. A QueueListener
+thread does the formatting and writes to the console and to an in-memory
+ring buffer of recent entries, which the Logs page reads via /api/logs/.
+"""
+import itertools
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+from collections import deque
+from datetime import datetime
+
+LOGGER_NAME = 'analyzer'
+DEFAULT_LEVEL = 'INFO'
+LOG_BUFFER_SIZE = 2000
+LOG_FORMAT = '%(asctime)s %(levelname)-7s %(name)s: %(message)s'
+
+_configure_lock = threading.Lock()
+_listener = None
+
+
+class RingBufferHandler(logging.Handler):
+    """Keeps the most recent `capacity` records as dicts with increasing ids."""
+
+    def __init__(self, capacity=LOG_BUFFER_SIZE):
+        super().__init__()
+        self.entries = deque(maxlen=capacity)
+        self._ids = itertools.count(1)
+
+    def emit(self, record):
+        try:
+            self.entries.append({
+                'id': next(self._ids),
+                'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+                'level': record.levelname,
+                'levelno': record.levelno,
+                'logger': record.name,
+                'thread': record.threadName,
+                'message': record.getMessage(),
+            })
+        except Exception:
+            self.handleError(record)
+
+
+ring_buffer = RingBufferHandler()
+
+
+def _setting(name, default=None):
+    try:
+        from django.conf import settings
+        return getattr(settings, name, default)
+    except Exception:
+        return default
+
+
+def resolve_level(level=None):
+    """Level from the argument, the FIFTO_LOG_LEVEL env var, settings.LOG_LEVEL, or INFO."""
+    if level is None:
+        level = os.environ.get('FIFTO_LOG_LEVEL')
+    if level is None:
+        level = _setting('LOG_LEVEL')
+    if isinstance(level, str):
+        level = logging.getLevelName(level.upper())
+    return level if isinstance(level, int) else logging.getLevelName(DEFAULT_LEVEL)
+
+
+def configure_logging(level=None):
+    """Route the 'analyzer' logger tree through the queue. Safe to call more than once."""
+    global _listener
+    with _configure_lock:
+        logger = logging.getLogger(LOGGER_NAME)
+        logger.setLevel(resolve_level(level))
+        if _listener is not None:
+            return logger
+
+        capacity = _setting('LOG_BUFFER_SIZE', LOG_BUFFER_SIZE)
+        if capacity != ring_buffer.entries.maxlen:
+            ring_buffer.entries = deque(ring_buffer.entries, maxlen=capacity)
+        log_queue = queue.SimpleQueue()
+        console = logging.StreamHandler()
+        console.setFormatter(logging.Formatter(LOG_FORMAT))
+        _listener = logging.handlers.QueueListener(log_queue, console, ring_buffer, respect_handler_level=True)
+        _listener.start()
+
+        logger.addHandler(logging.handlers.QueueHandler(log_queue))
+        logger.propagate = False
+        return logger
+
+
+def set_level(level):
+    """Change the level of the 'analyzer' logger tree at runtime. Returns the level name."""
+    resolved = resolve_level(level)
+    logging.getLogger(LOGGER_NAME).setLevel(resolved)
+    return logging.getLevelName(resolved)
+
+
+def stop_logging():
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    with _configure_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+def recent_logs(limit=200, level=None, logger_name=None, after_id=None):
+    """
+    Recent buffered entries, oldest first.
+
+    `level` is a minimum level, `logger_name` a logger prefix such as
+    'analyzer.dhan_api', and `after_id` returns only entries newer than a
+    previously seen id (for polling).
+    """
+    min_level = resolve_level(level) if level else logging.NOTSET
+    entries = [
+        entry for entry in list(ring_buffer.entries)
+        if entry['levelno'] >= min_level
+        and (not logger_name or entry['logger'].startswith(logger_name))
+        and (after_id is None or entry['id'] > after_id)
+    ]
+    return entries[-limit:] if limit else entries
@@ -0,0 +1,213 @@
+"""
+LTP Monitor Module - Cheap index-LTP probes between full P&L passes
+
+A full monitor pass (utils.monitor_trades) downloads the option chain of
+every instrument with open trades. Between passes, probe() polls only the
+underlying LTPs in one batched call and estimates each Running trade's
+P&L from the Greeks of its last full pricing:
+
+    pnl ~ pnl_0 + delta * dS + 1/2 * gamma * dS^2 + theta * days elapsed
+
+(position Greeks, i.e. already multiplied by the short quantity). It
+escalates to a full monitor pass, with real chain prices and the usual
+target/stoploss handling, only when:
+
+- a baseline is older than MAX_BASELINE_AGE, or a Running trade has none
+  and no full pass ran within MAX_BASELINE_AGE (a trade the last pass could
+  not price waits for the next scheduled one instead of forcing a pass on
+  every probe);
+- an index moved more than LTP_PROBE_BAND_PCT since its last full pricing;
+- a trade's estimated P&L reached LTP_PROBE_NEAR_PCT of its target or stoploss.
+
+Escalations are at least ESCALATION_COOLDOWN seconds apart and are skipped
+while another full pass holds utils.monitor_lock. Only live LTPs count: an
+index whose LTP could not be fetched is listed in the probe's no_ltp and
+neither estimated nor escalated.
+The baseline is recorded by monitor_trades itself (record_baseline), so
+scheduled full passes keep it current.
+"""
+import logging
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import pytz
+from django.conf import settings
+
+from . import pnl_change, risk, run_log
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROBE_SECONDS = 30
+DEFAULT_BAND_PCT = 0.5       # Index move (percent) since the last full pricing that forces a new one
+DEFAULT_NEAR_PCT = 80.0      # Percent of a target/stoploss the estimated P&L may reach before a full pricing
+MAX_BASELINE_AGE = 15 * 60   # Seconds a full pricing stays usable for estimates
+ESCALATION_COOLDOWN = 60     # Minimum seconds between escalated full passes
+
+NO_ESCALATION, ESCALATE = 'estimate', 'escalate'
+
+
+def trade_baselines(trades, chains, pnls, priced_at=None):
+    """{trade_id: baseline} of the Running trades priced in a full pass, with their position Greeks."""
+    priced_at = priced_at or time.time()
+    legs = risk.position_legs(trades, chains)
+    baselines = {}
+    for i, trade_id in enumerate(legs['trade_id']):
+        if trade_id not in pnls or not np.isfinite(legs['spot'][i]):
+            continue
+        trade = trades[legs['trade_index'][i]]
+        entry = baselines.setdefault(trade_id, {
+            'instrument': trade['instrument'],
+            'spot': float(legs['spot'][i]),
+            'pnl': float(pnls[trade_id]),
+            'target': float(trade.get('target_amount') or 0),
+            'stoploss': float(trade.get('stoploss_amount') or 0),
+            'delta': 0.0, 'gamma': 0.0, 'theta': 0.0,
+            'priced_at': priced_at,
+        })
+        for greek in ('delta', 'gamma', 'theta'):
+            value = legs[greek][i] * legs['quantity'][i]
+            if np.isfinite(value):
+                entry[greek] += float(value)
+    return baselines
+
+
+def estimate_pnl(baseline, spot, now=None):
+    """Second-order Greeks estimate of a trade's P&L at `spot`."""
+    now = now or time.time()
+    move = spot - baseline['spot']
+    days = (now - baseline['priced_at']) / 86400.0
+    return baseline['pnl'] + baseline['delta'] * move + 0.5 * baseline['gamma'] * move ** 2 + baseline['theta'] * days
+
+
+def escalation_reasons(baselines, spots, band_pct=DEFAULT_BAND_PCT, near_pct=DEFAULT_NEAR_PCT, now=None):
+    """(reasons, estimates): why a full pass is needed (empty if not) and the estimated P&L per trade."""
+    now = now or time.time()
+    reasons, estimates = [], {}
+    moved = set()
+    for trade_id, baseline in baselines.items():
+        spot = spots.get(baseline['instrument'].upper())
+        if spot is None:
+            continue  # No live LTP: nothing to estimate, the scheduled full pass still covers the trade
+        if now - baseline['priced_at'] > MAX_BASELINE_AGE:
+            reasons.append(f"{trade_id} last priced {now - baseline['priced_at']:.0f}s ago")
+            continue
+        move_pct = abs(spot - baseline['spot']) / baseline['spot'] * 100
+        if move_pct >= band_pct and baseline['instrument'] not in moved:
+            moved.add(baseline['instrument'])
+            reasons.append(f"{baseline['instrument']} moved {move_pct:.2f}%")
+        pnl = estimate_pnl(baseline, spot, now)
+        estimates[trade_id] = round(pnl, 2)
+        if baseline['target'] > 0 and pnl >= baseline['target'] * near_pct / 100:
+            reasons.append(f"{trade_id} near target (est. ₹{pnl:,.0f} of ₹{baseline['target']:,.0f})")
+        elif baseline['stoploss'] > 0 and pnl <= -baseline['stoploss'] * near_pct / 100:
+            reasons.append(f"{trade_id} near stoploss (est. ₹{pnl:,.0f} of -₹{baseline['stoploss']:,.0f})")
+    return reasons, estimates
+
+
+class LTPMonitor:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._baselines = {}
+        self._last_escalation = 0.0
+        self._last_full_pass = 0.0
+        self.last_probe = None
+        self.probes = 0
+        self.escalations = 0
+
+    def record_baseline(self, trades, chains, pnls):
+        """Called by monitor_trades after a full pricing with {trade_id: pnl} of the priced trades."""
+        try:
+            baselines = trade_baselines(trades, chains, pnls)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not record LTP probe baseline: {e}")
+            baselines = {}
+        with self._lock:
+            self._baselines = baselines
+            self._last_full_pass = time.time()
+        logger.debug(f"📐 LTP probe baseline recorded for {len(baselines)} trades")
+
+    def probe(self, force=False):
+        """One probe during market hours: batch LTP, estimate P&L, escalate to a full pass if needed."""
+        from . import utils
+
+        now = datetime.now(pytz.timezone('Asia/Kolkata'))
+        if not force and not pnl_change.is_market_open(now):
+            return {'action': 'skipped', 'reason': 'market closed'}
+        running = [t for t in utils.load_trades() if t.get('status') == 'Running']
+        if not running:
+            return {'action': 'skipped', 'reason': 'no running trades'}
+
+        with self._lock:
+            baselines = {trade_id: b for trade_id, b in self._baselines.items()
+                         if trade_id in {t['id'] for t in running}}
+            full_pass_age = time.time() - self._last_full_pass
+        unpriced = [t['id'] for t in running if t['id'] not in baselines]
+        stale = bool(unpriced) and full_pass_age > MAX_BASELINE_AGE
+        spots, estimates = {}, {}
+        if stale:
+            reasons = [f"{len(unpriced)} trade(s) without a full pricing"]
+        elif not baselines:
+            return {'action': 'skipped', 'reason': f"{len(unpriced)} trade(s) not priced by the last full pass"}
+        elif not utils.DHAN_AVAILABLE:
+            return {'action': 'skipped', 'reason': 'DhanHQ unavailable'}
+        else:
+            instruments = sorted({b['instrument'] for b in baselines.values()})
+            try:
+                # No fallback prices: a placeholder LTP would read as a real move
+                spots = utils.dhan_api.get_current_prices(instruments, fallback=False)
+            except Exception as e:
+                logger.warning(f"⚠️ LTP probe failed: {e}")
+            reasons, estimates = escalation_reasons(
+                baselines, spots,
+                float(getattr(settings, 'LTP_PROBE_BAND_PCT', DEFAULT_BAND_PCT)),
+                float(getattr(settings, 'LTP_PROBE_NEAR_PCT', DEFAULT_NEAR_PCT)))
+
+        self.probes += 1
+        no_ltp = sorted({b['instrument'].upper() for b in baselines.values()} - set(spots)) if not stale else []
+        if no_ltp:
+            logger.warning(f"⚠️ LTP probe got no live price for {', '.join(no_ltp)}")
+        result = {'action': ESCALATE if reasons else NO_ESCALATION, 'reasons': reasons,
+                  'spots': spots, 'no_ltp': no_ltp, 'unpriced': unpriced, 'estimates': estimates, 'timestamp': now.isoformat()}
+        if reasons:
+            result['escalated'] = self._escalate(reasons)
+        else:
+            logger.debug(f"📡 LTP probe {spots}: estimates within limits")
+        self.last_probe = result
+        return result
+
+    def _escalate(self, reasons):
+        """Run a full monitor pass unless one ran within ESCALATION_COOLDOWN or is running now."""
+        from . import utils
+
+        if time.time() - self._last_escalation < ESCALATION_COOLDOWN:
+            logger.debug(f"📡 Escalation cooling down ({'; '.join(reasons)})")
+            return False
+        if not utils.monitor_lock.acquire(blocking=False):
+            logger.debug(f"📡 A full pass is already running ({'; '.join(reasons)})")
+            return False
+        try:
+            self._last_escalation = time.time()
+            self.escalations += 1
+            logger.info(f"📡 LTP probe escalating to full pricing: {'; '.join(reasons)}")
+            with run_log.run('ltp_escalation'):
+                utils.monitor_trades(False)
+            return True
+        finally:
+            utils.monitor_lock.release()
+
+    def status(self):
+        with self._lock:
+            baselines = dict(self._baselines)
+        return {
+            'probes': self.probes,
+            'escalations': self.escalations,
+            'baseline_trades': len(baselines),
+            'baseline_age_seconds': round(time.time() - min((b['priced_at'] for b in baselines.values()),
+                                                            default=time.time()), 1),
+            'last_probe': self.last_probe,
+        }
+
+
+ltp_monitor = LTPMonitor()
@@ -2,7 +2,13 @@ from django.core.management.base import BaseCommand
 from apscheduler.schedulers.background import BackgroundScheduler
 import pytz
 import time
-from analyzer import utils
+from analyzer import run_log, utils
+from analyzer.chart_store import chart_store
+from analyzer.ltp_monitor import ltp_monitor
+from django.apps import apps
+from django.conf import settings
+from analyzer.scheduler_service import scheduler_service, schedule_trigger
+from analyzer.warmup import warm_up_auto_generation, warmup_seconds
 
 class Command(BaseCommand):
     help = "Runs the APScheduler for monitoring trades and automated chart generation."
@@ -24,19 +30,36 @@ class Command(BaseCommand):
             else:
                 kwargs = {'minutes': 15} # Default case
 
+            # Every job run is recorded with its per-stage timings (see analyzer/run_log.py)
             scheduler.add_job(
-                utils.monitor_trades, 'interval', **kwargs,
+                run_log.run('pl_monitor')(utils.monitor_trades), 'interval', **kwargs,
                 args=[False], id='pl_monitor', replace_existing=True
             )
             self.stdout.write(self.style.SUCCESS(f"Scheduled P/L monitor to run every {value} {unit}."))
 
+        # Cheap index-LTP probes between the full passes, escalating to full pricing when needed
+        probe_seconds = getattr(settings, 'LTP_PROBE_SECONDS', 30)
+        if interval_str != "Disable" and probe_seconds:
+            scheduler.add_job(
+                ltp_monitor.probe, 'interval', seconds=probe_seconds,
+                id='ltp_probe', replace_existing=True, max_instances=1, coalesce=True
+            )
+            self.stdout.write(self.style.SUCCESS(f"Scheduled LTP probes every {probe_seconds} seconds."))
+
         # Schedule EOD report
         scheduler.add_job(
-            lambda: utils.monitor_trades(is_eod_report=True), 'cron',
+            run_log.run('eod_report')(lambda: utils.monitor_trades(is_eod_report=True)), 'cron',
             day_of_week='mon-fri', hour=15, minute=45, id='eod_report', replace_existing=True
         )
         self.stdout.write(self.style.SUCCESS("Scheduled EOD report."))
 
+        # Schedule chart store garbage collection
+        scheduler.add_job(
+            run_log.run('chart_gc')(chart_store.collect_garbage), 'cron',
+            hour=16, minute=30, id='chart_gc', replace_existing=True
+        )
+        self.stdout.write(self.style.SUCCESS("Scheduled daily chart garbage collection."))
+
         # Schedule automated chart generation
         auto_gen_time = app_settings.get('auto_gen_time', '09:20')
         auto_gen_days = app_settings.get('auto_gen_days', [])
@@ -59,7 +82,7 @@ class Command(BaseCommand):
                 
                 # Add main job
                 scheduler.add_job(
-                    utils.run_automated_chart_generation, 'cron',
+                    run_log.run('auto_chart_generation')(utils.run_automated_chart_generation), 'cron',
                     day_of_week=scheduled_days, hour=hour, minute=minute, 
                     id='auto_chart_generation', replace_existing=True,
                     max_instances=1,  # Prevent overlapping executions
@@ -71,7 +94,7 @@ class Command(BaseCommand):
                 retry_hour = hour + ((minute + 5) // 60)
                 
                 scheduler.add_job(
-                    utils.run_automated_chart_generation, 'cron',
+                    run_log.run('auto_chart_generation_retry')(utils.run_automated_chart_generation), 'cron',
                     day_of_week=scheduled_days, hour=retry_hour, minute=retry_minute, 
                     id='auto_chart_generation_retry', replace_existing=True,
                     max_instances=1,
@@ -79,12 +102,31 @@ class Command(BaseCommand):
                 )
                 
                 self.stdout.write(self.style.SUCCESS(f"Scheduled automated chart generation at {auto_gen_time} (with retry at {retry_hour:02d}:{retry_minute:02d}) on {', '.join(auto_gen_days)}."))
+
+                # Pre-fetch expiries, zones and chains shortly before the main job
+                lead = warmup_seconds()
+                if lead:
+                    scheduler.add_job(
+                        run_log.run('auto_chart_generation_warmup')(warm_up_auto_generation),
+                        schedule_trigger({'time': auto_gen_time, 'active_days': auto_gen_days}, lead),
+                        id='auto_chart_generation_warmup', replace_existing=True,
+                        max_instances=1, coalesce=True
+                    )
+                    self.stdout.write(self.style.SUCCESS(f"Scheduled cache warm-up {lead}s before automated chart generation."))
                 
             except Exception as e:
                 self.stdout.write(self.style.ERROR(f"Failed to schedule automation: {str(e)}"))
         else:
             self.stdout.write(self.style.WARNING("Automated chart generation is disabled or no days configured."))
 
+        # Render workers, notification worker and the automation page schedules (multiple_schedules),
+        # which run in the elected scheduler leader
+        apps.get_app_config('analyzer').start_services()
+        if scheduler_service.is_leader:
+            self.stdout.write(self.style.SUCCESS("This process is the scheduler leader for the automation schedules."))
+        else:
+            self.stdout.write(self.style.WARNING("Automation schedules run in another process holding the scheduler lock; standing by."))
+
         self.stdout.write(self.style.SUCCESS("Starting scheduler... Press Ctrl+C to exit."))
         scheduler.start()
 
@@ -0,0 +1,332 @@
+"""
+Notifications Module - Persistent outbound Telegram queue with retry and rate limiting
+
+send_telegram_message() no longer talks to Telegram on the caller's thread:
+it stores the message (and any images, as PNG bytes) in the state DB and
+returns immediately. A background worker drains the queue over a pooled
+requests session with timeouts:
+
+- consecutive text messages for the same chat are batched into one
+  sendMessage (up to Telegram's 4096 character limit);
+- each chat gets at most one request per CHAT_MIN_INTERVAL seconds, using
+  the last delivery time in the DB so several processes share the limit;
+- network errors, 5xx and 429 responses are retried with exponential
+  backoff (or Telegram's retry_after), other 4xx fail immediately;
+- every notification keeps its status, attempts and last error; errors
+  never contain the request URL, which holds the bot token.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from urllib.parse import quote
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from . import state_db
+
+logger = logging.getLogger(__name__)
+
+API_URL = "https://api.telegram.org/bot{token}/{method}"
+REQUEST_TIMEOUT = (5, 30)       # Connect, read seconds
+CHAT_MIN_INTERVAL = 3.0         # Telegram allows about 20 messages a minute per group
+MAX_ATTEMPTS = 8
+BACKOFF_BASE = 5                # Seconds, doubled on every failed attempt
+BACKOFF_MAX = 15 * 60
+MAX_MESSAGE_LENGTH = 4096
+SENDING_TIMEOUT = 5 * 60        # A claimed notification older than this is requeued
+RETENTION_SECONDS = 2 * 24 * 3600
+IDLE_POLL_SECONDS = 30
+
+QUEUED, SENDING, SENT, FAILED = 'queued', 'sending', 'sent', 'failed'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS notifications (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    chat_id TEXT NOT NULL,
+    text TEXT NOT NULL DEFAULT '',
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    next_attempt_at REAL NOT NULL,
+    claimed_at REAL,
+    sent_at REAL
+);
+CREATE INDEX IF NOT EXISTS notifications_due ON notifications (status, next_attempt_at);
+CREATE INDEX IF NOT EXISTS notifications_chat_sent ON notifications (chat_id, sent_at);
+CREATE TABLE IF NOT EXISTS notification_images (
+    notification_id INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (notification_id, position)
+);
+"""
+
+
+class PermanentError(Exception):
+    """Telegram rejected the request; retrying will not help."""
+
+
+def redact_token(text, token):
+    """`text` with the bot token (plain or URL-quoted) masked."""
+    if not text or not token:
+        return text
+    return text.replace(token, '<token>').replace(quote(token, safe=''), '<token>')
+
+
+def _image_bytes(image, index):
+    """(file name, PNG bytes) for an image path or a binary file-like object."""
+    if isinstance(image, (str, os.PathLike)):
+        with open(image, 'rb') as f:
+            return os.path.basename(image), f.read()
+    image.seek(0)
+    return getattr(image, 'name', None) or f"image_{index}.png", image.read()
+
+
+class NotificationQueue:
+    def __init__(self):
+        self._session = None
+        self._thread = None
+        self._wakeup = threading.Event()
+        self._start_lock = threading.Lock()
+
+    def _get_session(self):
+        if self._session is None:
+            session = requests.Session()
+            session.mount('https://', HTTPAdapter(pool_connections=2, pool_maxsize=4, max_retries=0))
+            self._session = session
+        return self._session
+
+    def start(self):
+        """Start the delivery worker (idempotent); requeues deliveries a dead process left half-done."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            state_db.ensure_schema('notifications', SCHEMA)
+            now = time.time()
+            with state_db.connect() as conn:
+                conn.execute("UPDATE notifications SET status=?, claimed_at=NULL WHERE status=? AND claimed_at < ?",
+                             (QUEUED, SENDING, now - SENDING_TIMEOUT))
+                conn.execute("DELETE FROM notification_images WHERE notification_id IN "
+                             "(SELECT id FROM notifications WHERE status IN (?, ?) AND created_at < ?)",
+                             (SENT, FAILED, now - RETENTION_SECONDS))
+                conn.execute("DELETE FROM notifications WHERE status IN (?, ?) AND created_at < ?",
+                             (SENT, FAILED, now - RETENTION_SECONDS))
+            self._scrub_errors()
+            self._thread = threading.Thread(target=self._run, name='notification-worker', daemon=True)
+            self._thread.start()
+            logger.info("📨 Notification worker started")
+
+    def _scrub_errors(self):
+        """Mask the bot token in errors stored before they were redacted."""
+        from . import utils
+
+        token = utils.load_settings().get("bot_token")
+        if not token:
+            return
+        with state_db.connect() as conn:
+            for masked in (token, quote(token, safe='')):
+                conn.execute("UPDATE notifications SET last_error=replace(last_error, ?, '<token>') "
+                             "WHERE instr(last_error, ?) > 0", (masked, masked))
+
+    def enqueue(self, chat_id, text="", images=None):
+        """Queue a message and/or images (paths or buffers) for a chat; returns the notification id."""
+        self.start()
+        photos = [_image_bytes(image, i) for i, image in enumerate(images or [])]
+        now = time.time()
+        with state_db.connect() as conn:
+            cursor = conn.execute("INSERT INTO notifications (chat_id, text, status, created_at, next_attempt_at) "
+                                  "VALUES (?, ?, ?, ?, ?)", (str(chat_id), text or "", QUEUED, now, now))
+            notification_id = cursor.lastrowid
+            conn.executemany("INSERT INTO notification_images (notification_id, position, name, data) VALUES (?, ?, ?, ?)",
+                             [(notification_id, i, name, data) for i, (name, data) in enumerate(photos)])
+        self._wakeup.set()
+        logger.debug(f"📨 Queued notification {notification_id} for chat {chat_id} ({len(photos)} images)")
+        return notification_id
+
+    # --- Worker ---
+
+    def _run(self):
+        while True:
+            try:
+                delay = self._drain()
+            except Exception as e:
+                logger.exception(f"❌ Notification worker error: {e}")
+                delay = BACKOFF_BASE
+            self._wakeup.wait(timeout=min(delay, IDLE_POLL_SECONDS))
+            self._wakeup.clear()
+
+    def _drain(self):
+        """Deliver every due notification whose chat is not rate limited; returns seconds until the next is due."""
+        now = time.time()
+        with state_db.connect() as conn:
+            due = conn.execute("SELECT * FROM notifications WHERE status=? ORDER BY id", (QUEUED,)).fetchall()
+        if not due:
+            return IDLE_POLL_SECONDS
+
+        next_due = IDLE_POLL_SECONDS
+        by_chat = {}
+        for row in due:
+            by_chat.setdefault(row['chat_id'], []).append(row)
+        for chat_id, rows in by_chat.items():
+            ready = [row for row in rows if row['next_attempt_at'] <= now]
+            wait = self._chat_wait(chat_id, now)
+            if ready and wait <= 0:
+                batch = self._claim(self._batch(ready))
+                if batch:
+                    self._deliver(chat_id, batch)
+                next_due = min(next_due, CHAT_MIN_INTERVAL)  # Come back for the rest (or a quick retry)
+            else:
+                earliest = min(row['next_attempt_at'] for row in rows) - now
+                next_due = min(next_due, max(wait, earliest))
+        return max(next_due, 0.1)
+
+    def _chat_wait(self, chat_id, now):
+        with state_db.connect() as conn:
+            last = conn.execute("SELECT MAX(sent_at) FROM notifications WHERE chat_id=? AND sent_at IS NOT NULL",
+                                (chat_id,)).fetchone()[0]
+        return 0 if last is None else max(0.0, last + CHAT_MIN_INTERVAL - now)
+
+    def _batch(self, rows):
+        """The first due notification, plus following text-only ones that fit into the same message."""
+        first = rows[0]
+        batch = [first]
+        if self._image_count(first['id']):
+            return batch
+        length = len(first['text'])
+        for row in rows[1:]:
+            if self._image_count(row['id']) or length + 2 + len(row['text']) > MAX_MESSAGE_LENGTH:
+                break
+            batch.append(row)
+            length += 2 + len(row['text'])
+        return batch
+
+    def _image_count(self, notification_id):
+        with state_db.connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM notification_images WHERE notification_id=?",
+                                (notification_id,)).fetchone()[0]
+
+    def _claim(self, rows):
+        """Mark rows as sending; rows another process claimed first are dropped."""
+        claimed = []
+        with state_db.connect() as conn:
+            for row in rows:
+                cursor = conn.execute("UPDATE notifications SET status=?, claimed_at=? WHERE id=? AND status=?",
+                                      (SENDING, time.time(), row['id'], QUEUED))
+                if cursor.rowcount:
+                    claimed.append(row)
+        return claimed
+
+    def _deliver(self, chat_id, rows):
+        ids = [row['id'] for row in rows]
+        try:
+            if len(rows) == 1:
+                with state_db.connect() as conn:
+                    images = conn.execute("SELECT name, data FROM notification_images WHERE notification_id=? "
+                                          "ORDER BY position", (ids[0],)).fetchall()
+                self._post(chat_id, rows[0]['text'], [(img['name'], img['data']) for img in images])
+            else:
+                self._post(chat_id, "\n\n".join(row['text'] for row in rows), [])
+        except PermanentError as e:
+            self._finish(rows, FAILED, str(e))
+            logger.error(f"❌ Telegram rejected notification(s) {ids}: {e}")
+        except Exception as e:
+            retry_after = getattr(e, 'retry_after', None)
+            self._retry(rows, str(e), retry_after)
+        else:
+            self._finish(rows, SENT)
+            logger.info(f"📨 Delivered notification(s) {ids} to chat {chat_id}")
+
+    def _post(self, chat_id, text, images):
+        from . import utils
+
+        bot_token = utils.load_settings().get("bot_token")
+        if not bot_token:
+            raise PermanentError("Telegram bot token is not configured")
+
+        if len(images) > 1:
+            method = 'sendMediaGroup'
+            media = [{'type': 'photo', 'media': f'attach://photo{i}'} for i in range(len(images))]
+            if text:
+                media[0]['caption'] = text
+            data = {'chat_id': chat_id, 'media': json.dumps(media)}
+            files = {f'photo{i}': (name, content) for i, (name, content) in enumerate(images)}
+        elif images:
+            method = 'sendPhoto'
+            data = {'chat_id': chat_id, 'caption': text}
+            files = {'photo': images[0]}
+        else:
+            method = 'sendMessage'
+            data = {'chat_id': chat_id, 'text': text, 'parse_mode': 'Markdown'}
+            files = None
+
+        try:
+            response = self._get_session().post(API_URL.format(token=bot_token, method=method),
+                                                data=data, files=files, timeout=REQUEST_TIMEOUT)
+        except requests.exceptions.RequestException as e:
+            # str(e) carries the request URL, and with it the bot token
+            raise requests.exceptions.ConnectionError(
+                f"{method} failed: {type(e).__name__}: {redact_token(str(e), bot_token)}") from None
+        if response.ok:
+            return
+        try:
+            description = response.json().get('description', response.text)
+            retry_after = response.json().get('parameters', {}).get('retry_after')
+        except ValueError:
+            description, retry_after = response.text, None
+        if response.status_code == 429 or response.status_code >= 500:
+            error = requests.exceptions.HTTPError(f"{method} {response.status_code}: {description}")
+            error.retry_after = retry_after
+            raise error
+        raise PermanentError(f"{method} {response.status_code}: {description}")
+
+    def _retry(self, rows, error, retry_after=None):
+        now = time.time()
+        with state_db.connect() as conn:
+            for row in rows:
+                attempts = row['attempts'] + 1
+                if attempts >= MAX_ATTEMPTS:
+                    conn.execute("UPDATE notifications SET status=?, attempts=?, last_error=? WHERE id=?",
+                                 (FAILED, attempts, error, row['id']))
+                    logger.error(f"❌ Giving up on notification {row['id']} after {attempts} attempts: {error}")
+                    continue
+                delay = retry_after or min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_MAX)
+                conn.execute("UPDATE notifications SET status=?, attempts=?, last_error=?, next_attempt_at=?, "
+                             "claimed_at=NULL WHERE id=?", (QUEUED, attempts, error, now + delay, row['id']))
+                logger.warning(f"⚠️ Notification {row['id']} failed (attempt {attempts}), retrying in {delay:.0f}s: {error}")
+
+    def _finish(self, rows, status, error=None):
+        now = time.time()
+        with state_db.connect() as conn:
+            for row in rows:
+                conn.execute("UPDATE notifications SET status=?, attempts=?, last_error=?, sent_at=? WHERE id=?",
+                             (status, row['attempts'] + 1, error, now if status == SENT else None, row['id']))
+            conn.execute(f"DELETE FROM notification_images WHERE notification_id IN ({','.join('?' * len(rows))})",
+                         [row['id'] for row in rows])
+
+    # --- Status ---
+
+    def get(self, notification_id):
+        state_db.ensure_schema('notifications', SCHEMA)
+        with state_db.connect() as conn:
+            row = conn.execute("SELECT * FROM notifications WHERE id=?", (notification_id,)).fetchone()
+        return dict(row) if row else None
+
+    def status(self, limit=50):
+        """Counts by status and the most recent notifications (text truncated)."""
+        state_db.ensure_schema('notifications', SCHEMA)
+        with state_db.connect() as conn:
+            counts = dict(conn.execute("SELECT status, COUNT(*) FROM notifications GROUP BY status").fetchall())
+            recent = [dict(row) for row in conn.execute(
+                "SELECT id, chat_id, substr(text, 1, 120) AS text, status, attempts, last_error, created_at, sent_at "
+                "FROM notifications ORDER BY id DESC LIMIT ?", (limit,)).fetchall()]
+        return {'counts': counts, 'recent': recent}
+
+
+notification_queue = NotificationQueue()
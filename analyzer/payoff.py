@@ -0,0 +1,200 @@
+"""
+Payoff Module - Aggregated payoff surfaces for strangles, independent of rendering
+
+Legs of any set of analysis rows or Running trades are valued over a
+price grid x days-to-expiry grid in one broadcasted Black-Scholes pass.
+The expiry payoff is piecewise linear with kinks only at the strikes, so
+breakevens and extrema are solved exactly from the kink values instead of
+being read off the sampled grid. compute_payoff() returns plain lists and
+floats that the PNG renderer and JSON views can both consume.
+"""
+import logging
+
+import numpy as np
+
+from . import greeks
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PRICE_RANGE = (0.85, 1.15)  # Fraction of spot at the grid edges
+DEFAULT_PRICE_POINTS = 300
+DEFAULT_DTE_STEPS = 5  # Curves from today to expiry, inclusive
+DEFAULT_IV = 0.15  # Used when a leg has no quoted price to imply volatility from
+
+
+def _empty_legs():
+    return {'strike': [], 'is_call': [], 'quantity': [], 'entry_price': [], 'expiry': [], 'credit': 0.0}
+
+
+def _finalise(legs):
+    legs['strike'] = np.array(legs['strike'], dtype=float)
+    legs['is_call'] = np.array(legs['is_call'], dtype=bool)
+    legs['quantity'] = np.array(legs['quantity'], dtype=float)
+    legs['entry_price'] = np.array(legs['entry_price'], dtype=float)
+    return legs
+
+
+def analysis_legs(strategies, lot_size, expiry=None):
+    """
+    Short CE/PE legs for analysis rows (a DataFrame or the df_data records).
+
+    Every row is one short strangle of `lot_size` units; the combined
+    premium collected across rows is the position's credit.
+    """
+    rows = strategies.to_dict('records') if hasattr(strategies, 'to_dict') else list(strategies)
+    legs = _empty_legs()
+    for row in rows:
+        for strike_key, price_key, is_call in (('CE_Strike', 'CE_Price', True), ('PE_Strike', 'PE_Price', False)):
+            legs['strike'].append(float(row[strike_key]))
+            legs['is_call'].append(is_call)
+            legs['quantity'].append(-float(lot_size))
+            legs['entry_price'].append(float(row.get(price_key, np.nan)))
+            legs['expiry'].append(expiry)
+        legs['credit'] += float(row['Combined_Premium']) * lot_size
+    return _finalise(legs)
+
+
+def trade_legs(trades, instrument=None, lot_sizes=None):
+    """
+    Short CE/PE legs for Running trades, optionally limited to one instrument.
+
+    Trades only record the combined entry premium, so per-leg entry prices
+    are NaN and the premium enters the payoff through the credit.
+    """
+    from . import utils
+
+    lot_sizes = dict(lot_sizes or {})
+    legs = _empty_legs()
+    for trade in trades:
+        if trade.get('status') != 'Running':
+            continue
+        if instrument and trade.get('instrument') != instrument:
+            continue
+        name = trade.get('instrument')
+        if name not in lot_sizes:
+            lot_sizes[name] = utils.get_lot_size(name)
+        lot_size = lot_sizes[name]
+        for strike_key, is_call in (('ce_strike', True), ('pe_strike', False)):
+            try:
+                strike = float(trade.get(strike_key) or 0)
+            except (TypeError, ValueError):
+                continue
+            if strike <= 0:
+                continue
+            legs['strike'].append(strike)
+            legs['is_call'].append(is_call)
+            legs['quantity'].append(-float(lot_size))
+            legs['entry_price'].append(np.nan)
+            legs['expiry'].append(trade.get('expiry'))
+        legs['credit'] += float(trade.get('initial_premium') or 0) * lot_size
+    return _finalise(legs)
+
+
+def _expiry_payoff(legs, prices):
+    """P&L at expiry for each price in `prices` (1-D)."""
+    prices = np.asarray(prices, dtype=float)[:, None]
+    intrinsic = np.where(legs['is_call'], np.maximum(prices - legs['strike'], 0.0),
+                         np.maximum(legs['strike'] - prices, 0.0))
+    return legs['credit'] + (intrinsic * legs['quantity']).sum(axis=1)
+
+
+def expiry_profile(legs):
+    """
+    Exact breakevens and extrema of the expiry payoff.
+
+    The payoff is linear between consecutive strikes, so it is fully
+    described by its value at each strike (and at zero) plus the slope of
+    the upper tail. Extrema sit on the kinks unless the upper tail slopes,
+    in which case that side is unbounded (reported as None).
+    """
+    if not len(legs['strike']):
+        return {'breakevens': [], 'max_profit': legs['credit'], 'max_profit_range': None,
+                'max_loss': legs['credit'], 'max_loss_range': None}
+
+    kinks = np.unique(np.concatenate(([0.0], legs['strike'])))
+    values = _expiry_payoff(legs, kinks)
+    upper_slope = float(legs['quantity'][legs['is_call']].sum())
+
+    # Roots inside each segment between kinks, plus kinks that are exactly zero
+    a, b = values[:-1], values[1:]
+    crossing = (a * b) < 0
+    roots = kinks[:-1][crossing] - a[crossing] * (kinks[1:][crossing] - kinks[:-1][crossing]) / (b[crossing] - a[crossing])
+    roots = np.concatenate((roots, kinks[values == 0]))
+    if upper_slope != 0:
+        tail_root = kinks[-1] - values[-1] / upper_slope
+        if tail_root > kinks[-1]:
+            roots = np.append(roots, tail_root)
+
+    def extremum(best, unbounded):
+        if unbounded:
+            return None, None
+        at = kinks[np.isclose(values, best)]
+        # A flat upper tail at the extreme extends the range without bound
+        upper = None if upper_slope == 0 and np.isclose(values[-1], best) else round(float(at.max()), 2)
+        return round(float(best), 2), [round(float(at.min()), 2), upper]
+
+    max_profit, max_profit_range = extremum(values.max(), upper_slope > 0)
+    max_loss, max_loss_range = extremum(values.min(), upper_slope < 0)
+    return {
+        'breakevens': [round(float(x), 2) for x in np.unique(roots)],
+        'max_profit': max_profit,
+        'max_profit_range': max_profit_range,
+        'max_loss': max_loss,
+        'max_loss_range': max_loss_range,
+    }
+
+
+def leg_volatility(legs, spot, t, default_iv=DEFAULT_IV):
+    """Per-leg IV implied from the quoted entry prices, falling back to `default_iv`."""
+    iv = greeks.implied_volatility(legs['entry_price'], spot, legs['strike'], t, legs['is_call'])
+    return np.where(np.isfinite(iv), iv, default_iv)
+
+
+def payoff_surface(legs, prices, days_to_expiry, iv):
+    """
+    Position P&L over the (days_to_expiry, prices) grid in one broadcast.
+
+    `days_to_expiry` counts calendar days left on the legs; `iv` is a scalar
+    or per-leg array. Returns an array of shape (len(days_to_expiry), len(prices)).
+    """
+    prices = np.asarray(prices, dtype=float)
+    t = np.asarray(days_to_expiry, dtype=float) / 365.0
+    values = greeks.bs_price(prices[None, :, None], legs['strike'], t[:, None, None],
+                             iv, legs['is_call'])
+    return legs['credit'] + (values * legs['quantity']).sum(axis=2)
+
+
+def compute_payoff(legs, spot, expiry=None, iv=None, price_range=DEFAULT_PRICE_RANGE,
+                   points=DEFAULT_PRICE_POINTS, dte_steps=DEFAULT_DTE_STEPS):
+    """
+    Payoff surface plus exact expiry profile, as JSON-serializable data.
+
+    Without an expiry (or once expired) only the expiry curve is returned.
+    `iv` overrides the volatility implied from the legs' entry prices.
+    """
+    prices = np.linspace(spot * price_range[0], spot * price_range[1], points)
+    t = 0.0
+    if expiry is not None:
+        try:
+            t = greeks.time_to_expiry(expiry)
+        except ValueError:
+            logger.warning(f"Payoff: unrecognised expiry {expiry}, showing expiry curve only")
+
+    days_left = t * 365.0
+    if days_left > 0 and len(legs['strike']):
+        days = np.unique(np.round(np.linspace(days_left, 0.0, dte_steps), 2))[::-1]
+        sigma = leg_volatility(legs, spot, t) if iv is None else iv
+        surface = payoff_surface(legs, prices, days, sigma)
+    else:
+        days = np.array([0.0])
+        surface = _expiry_payoff(legs, prices)[None, :]
+
+    return {
+        'spot': round(float(spot), 2),
+        'credit': round(float(legs['credit']), 2),
+        'prices': np.round(prices, 2).tolist(),
+        'days_to_expiry': days.tolist(),
+        'surface': np.round(surface, 2).tolist(),
+        'expiry_pnl': np.round(surface[-1], 2).tolist(),
+        **expiry_profile(legs),
+    }
@@ -0,0 +1,159 @@
+"""
+PnL Change Module - Decides whether a periodic P/L update is worth sending
+
+monitor_trades computes the P/L of every Running trade each interval and
+groups it by entry tag. A fingerprint per tag (total P/L, total target and
+the trades in it) is compared with the fingerprint of the last image that
+was sent. The P/L image is only rendered and sent when a tag appears,
+disappears, changes its trades, or its P/L moved by at least both
+thresholds: an absolute rupee amount and a percentage of the tag's target.
+Otherwise a short text heartbeat digest is sent at most every
+`pl_update_heartbeat_minutes`, and only during market hours.
+
+The last sent fingerprints live in the state DB, so a restart does not
+trigger an immediate resend. An update only counts as sent once the
+notification worker delivered it: mark_queued() keeps it pending with its
+notification id, and the next decide() applies it if it was delivered,
+drops it if delivery failed, and skips while it is still queued.
+"""
+import json
+import logging
+import time
+from datetime import datetime
+
+from . import state_db
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MIN_CHANGE = 500          # Rupees a tag's P/L must move
+DEFAULT_MIN_CHANGE_PCT = 10.0     # ... and percent of the tag's target it must move
+DEFAULT_HEARTBEAT_MINUTES = 60
+
+RENDER, HEARTBEAT, SKIP = 'render', 'heartbeat', 'skip'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pl_update_state (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    fingerprints TEXT NOT NULL,
+    image_sent_at REAL NOT NULL DEFAULT 0,
+    digest_sent_at REAL NOT NULL DEFAULT 0,
+    pending TEXT
+);
+"""
+
+
+def is_market_open(now=None):
+    """NSE cash session, 9:15 AM to 3:30 PM on weekdays (local time of `now`)."""
+    now = now or datetime.now()
+    market_open = now.replace(hour=9, minute=15, second=0, microsecond=0)
+    market_close = now.replace(hour=15, minute=30, second=0, microsecond=0)
+    return now.weekday() < 5 and market_open <= now <= market_close
+
+
+def tag_fingerprints(tagged_trades):
+    """{tag: {pnl, target, trades}} from {tag: [{id, pnl, target_amount}, ...]}."""
+    return {
+        tag: {
+            'pnl': round(sum(t['pnl'] for t in trades), 2),
+            'target': round(sum(t.get('target_amount') or 0 for t in trades), 2),
+            'trades': sorted(t['id'] for t in trades),
+        }
+        for tag, trades in tagged_trades.items()
+    }
+
+
+def changed_tags(current, previous, min_change=DEFAULT_MIN_CHANGE, min_change_pct=DEFAULT_MIN_CHANGE_PCT):
+    """Tags whose trades changed or whose P/L moved past both thresholds since `previous`."""
+    changed = [tag for tag in previous if tag not in current]
+    for tag, fp in current.items():
+        last = previous.get(tag)
+        if last is None or last['trades'] != fp['trades']:
+            changed.append(tag)
+            continue
+        threshold = max(min_change, abs(fp['target']) * min_change_pct / 100)
+        if abs(fp['pnl'] - last['pnl']) >= threshold:
+            changed.append(tag)
+    return changed
+
+
+def heartbeat_message(current, previous):
+    lines = ["💓 *P/L Heartbeat* - no significant change"]
+    for tag, fp in sorted(current.items()):
+        delta = fp['pnl'] - previous.get(tag, {}).get('pnl', fp['pnl'])
+        lines.append(f"- {tag}: ₹{fp['pnl']:,.0f} ({delta:+,.0f})")
+    lines.append(f"Total: ₹{sum(fp['pnl'] for fp in current.values()):,.0f}")
+    return "\n".join(lines)
+
+
+class PnLChangeDetector:
+    def _load(self):
+        state_db.ensure_schema('pl_update_state', SCHEMA)
+        with state_db.connect() as conn:
+            row = conn.execute("SELECT * FROM pl_update_state WHERE id = 1").fetchone()
+        if row is None:
+            return {}, 0.0, 0.0, None
+        pending = json.loads(row['pending']) if row['pending'] else None
+        return json.loads(row['fingerprints']), row['image_sent_at'], row['digest_sent_at'], pending
+
+    def _save(self, fingerprints, image_sent_at, digest_sent_at, pending=None):
+        with state_db.connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO pl_update_state (id, fingerprints, image_sent_at, digest_sent_at, pending) "
+                         "VALUES (1, ?, ?, ?, ?)", (json.dumps(fingerprints), image_sent_at, digest_sent_at,
+                                                    json.dumps(pending) if pending else None))
+
+    def _settle(self):
+        """Apply or drop the pending update by its notification's status; True while it is still in flight."""
+        from .notifications import notification_queue, SENT, FAILED
+
+        previous, image_sent_at, digest_sent_at, pending = self._load()
+        if not pending:
+            return False
+        notification = notification_queue.get(pending['notification_id'])
+        status = notification['status'] if notification else FAILED
+        if status == SENT:
+            sent_at = notification['sent_at'] or time.time()
+            if pending['action'] == RENDER:
+                self._save(pending['fingerprints'], sent_at, digest_sent_at)
+            else:
+                self._save(previous, image_sent_at, sent_at)
+            return False
+        if status == FAILED:
+            logger.warning(f"⚠️ P/L {pending['action']} (notification {pending['notification_id']}) was not delivered")
+            self._save(previous, image_sent_at, digest_sent_at)
+            return False
+        return True
+
+    def decide(self, tagged_trades, app_settings, now=None):
+        """
+        (action, detail) for this interval: (RENDER, changed tags), (HEARTBEAT, digest text)
+        or (SKIP, reason). Call mark_queued() once the chosen update was queued for Telegram.
+        """
+        if self._settle():
+            return SKIP, 'previous update not delivered yet'
+        current = tag_fingerprints(tagged_trades)
+        previous, image_sent_at, digest_sent_at, _ = self._load()
+        changed = changed_tags(current, previous,
+                               float(app_settings.get('pl_update_min_change', DEFAULT_MIN_CHANGE)),
+                               float(app_settings.get('pl_update_min_change_pct', DEFAULT_MIN_CHANGE_PCT)))
+        if changed:
+            return RENDER, changed
+
+        heartbeat_seconds = float(app_settings.get('pl_update_heartbeat_minutes', DEFAULT_HEARTBEAT_MINUTES)) * 60
+        last_sent = max(image_sent_at, digest_sent_at)
+        if heartbeat_seconds > 0 and is_market_open(now) and time.time() - last_sent >= heartbeat_seconds:
+            return HEARTBEAT, heartbeat_message(current, previous)
+        return SKIP, 'no significant change'
+
+    def mark_queued(self, action, tagged_trades, notification_id):
+        """
+        Record an update queued as `notification_id`. It counts as sent (an image resets
+        the P/L baseline, a heartbeat only its own clock) once the notification is delivered.
+        """
+        previous, image_sent_at, digest_sent_at, _ = self._load()
+        self._save(previous, image_sent_at, digest_sent_at, {
+            'action': action,
+            'fingerprints': tag_fingerprints(tagged_trades),
+            'notification_id': notification_id,
+        })
+
+pnl_change_detector = PnLChangeDetector()
@@ -10,6 +10,9 @@ import requests
 from . import utils
 from .dhan_api import DhanHQIntegration  # unified import replacing duplicate
 from django.conf import settings
+import logging
+
+logger = logging.getLogger(__name__)
 
 class PnLUpdater:
     def __init__(self):
@@ -28,7 +31,7 @@ class PnLUpdater:
         
     def start_updater(self):
         """Start the 30-minute P&L update thread - DISABLED for on-demand only"""
-        print("📝 Automatic P&L updates disabled - Use manual refresh when needed")
+        logger.info("📝 Automatic P&L updates disabled - Use manual refresh when needed")
         # Automatic updater disabled - use manual refresh only
         # if self.update_thread is None or not self.update_thread.is_alive():
         #     self.stop_event.clear()
@@ -44,7 +47,7 @@ class PnLUpdater:
         if self.update_thread and self.update_thread.is_alive():
             self.stop_event.set()
             self.update_thread.join(timeout=5)
-            print("🛑 P&L Updater stopped")
+            logger.warning("🛑 P&L Updater stopped")
             
         # Stop option chain refresh
         self.stop_option_chain_refresh()
@@ -57,12 +60,12 @@ class PnLUpdater:
                 if self._is_market_open():
                     self._update_active_trades_pnl()
                     self.last_update = datetime.now()
-                    print(f"📊 Active trades P&L updated at {self.last_update.strftime('%H:%M:%S')}")
+                    logger.debug(f"📊 Active trades P&L updated at {self.last_update.strftime('%H:%M:%S')}")
                 else:
-                    print("🕐 Market closed - P&L update skipped")
+                    logger.info("🕐 Market closed - P&L update skipped")
                     
             except Exception as e:
-                print(f"❌ P&L Update Error: {e}")
+                logger.error(f"❌ P&L Update Error: {e}")
                 
             # Wait for 30 minutes or until stop event
             self.stop_event.wait(self.update_interval)
@@ -70,7 +73,7 @@ class PnLUpdater:
     def start_option_chain_refresh(self):
         """Start option chain refresh thread"""
         if not self.option_chain_refresh_enabled:
-            print("🔄 Option chain refresh is disabled")
+            logger.info("🔄 Option chain refresh is disabled")
             return
             
         if self.option_chain_thread is None or not self.option_chain_thread.is_alive():
@@ -78,14 +81,14 @@ class PnLUpdater:
             self.option_chain_thread = Thread(target=self._option_chain_refresh_loop, daemon=True)
             self.option_chain_thread.start()
             interval_text = self._get_interval_text(self.option_chain_refresh_interval)
-            print(f"✅ Option chain refresh started - {interval_text} intervals")
+            logger.info(f"✅ Option chain refresh started - {interval_text} intervals")
             
     def stop_option_chain_refresh(self):
         """Stop option chain refresh thread"""
         if self.option_chain_thread and self.option_chain_thread.is_alive():
             self.option_chain_stop_event.set()
             self.option_chain_thread.join(timeout=3)
-            print("🛑 Option chain refresh stopped")
+            logger.warning("🛑 Option chain refresh stopped")
             
     def _option_chain_refresh_loop(self):
         """Option chain refresh loop"""
@@ -95,12 +98,12 @@ class PnLUpdater:
                     self._refresh_option_chains()
                     self.last_option_chain_update = datetime.now()
                     interval_text = self._get_interval_text(self.option_chain_refresh_interval)
-                    print(f"📊 Option chains refreshed at {self.last_option_chain_update.strftime('%H:%M:%S')} - Next refresh in {interval_text}")
+                    logger.debug(f"📊 Option chains refreshed at {self.last_option_chain_update.strftime('%H:%M:%S')} - Next refresh in {interval_text}")
                 else:
-                    print("🕐 Market closed - Option chain refresh skipped")
+                    logger.info("🕐 Market closed - Option chain refresh skipped")
                     
             except Exception as e:
-                print(f"❌ Option Chain Refresh Error: {e}")
+                logger.error(f"❌ Option Chain Refresh Error: {e}")
                 
             # Wait for the specified interval or until stop event
             self.option_chain_stop_event.wait(self.option_chain_refresh_interval)
@@ -113,7 +116,7 @@ class PnLUpdater:
             active_trades = [t for t in trades if t.get('status') == 'Running']
             
             if not active_trades:
-                print("📝 No active trades - skipping option chain refresh")
+                logger.info("📝 No active trades - skipping option chain refresh")
                 return
                 
             # Get unique instruments from active trades
@@ -121,19 +124,19 @@ class PnLUpdater:
             
             for instrument in instruments:
                 try:
-                    print(f"🔄 Refreshing option chain for {instrument}...")
+                    logger.info(f"🔄 Refreshing option chain for {instrument}...")
                     # Force refresh by calling DhanHQ API
                     option_data = self.dhan_api.get_option_chain(instrument)
                     if option_data:
-                        print(f"✅ {instrument} option chain refreshed successfully")
+                        logger.info(f"✅ {instrument} option chain refreshed successfully")
                     else:
-                        print(f"⚠️ Failed to refresh {instrument} option chain")
+                        logger.warning(f"⚠️ Failed to refresh {instrument} option chain")
                         
                 except Exception as e:
-                    print(f"❌ Error refreshing {instrument} option chain: {e}")
+                    logger.error(f"❌ Error refreshing {instrument} option chain: {e}")
                     
         except Exception as e:
-            print(f"❌ Option chain refresh error: {e}")
+            logger.error(f"❌ Option chain refresh error: {e}")
             
     def set_option_chain_refresh_interval(self, interval_minutes):
         """Set option chain refresh interval
@@ -144,7 +147,7 @@ class PnLUpdater:
         if interval_minutes == 0:
             self.option_chain_refresh_enabled = False
             self.stop_option_chain_refresh()
-            print("🛑 Option chain refresh disabled")
+            logger.warning("🛑 Option chain refresh disabled")
         else:
             self.option_chain_refresh_enabled = True
             self.option_chain_refresh_interval = interval_minutes * 60  # Convert to seconds
@@ -155,7 +158,7 @@ class PnLUpdater:
                 
             self.start_option_chain_refresh()
             interval_text = self._get_interval_text(self.option_chain_refresh_interval)
-            print(f"✅ Option chain refresh interval set to {interval_text}")
+            logger.info(f"✅ Option chain refresh interval set to {interval_text}")
             
     def _get_interval_text(self, interval_seconds):
         """Convert interval seconds to readable text"""
@@ -185,7 +188,7 @@ class PnLUpdater:
             active_trades = [t for t in trades if t.get('status') == 'Running']
             
             if not active_trades:
-                print("📝 No active trades to update")
+                logger.info("📝 No active trades to update")
                 return
                 
             updated_count = 0
@@ -222,30 +225,30 @@ class PnLUpdater:
                             trade['status'] = 'Auto Closed - Target Hit'
                             trade['final_pnl'] = new_pnl
                             trade['closed_date'] = datetime.now().isoformat()
-                            print(f"🎯 Target hit: {trade['id']} - P&L: ₹{new_pnl:,.2f}")
+                            logger.info(f"🎯 Target hit: {trade['id']} - P&L: ₹{new_pnl:,.2f}")
                             
                         elif new_pnl <= -trade['stoploss_amount']:
                             trade['status'] = 'Auto Closed - Stoploss Hit'
                             trade['final_pnl'] = new_pnl
                             trade['closed_date'] = datetime.now().isoformat()
-                            print(f"🛑 Stoploss hit: {trade['id']} - P&L: ₹{new_pnl:,.2f}")
+                            logger.warning(f"🛑 Stoploss hit: {trade['id']} - P&L: ₹{new_pnl:,.2f}")
                             
                         updated_count += 1
-                        print(f"📈 Updated {trade['id']}: ₹{old_pnl:,.2f} → ₹{new_pnl:,.2f}")
+                        logger.info(f"📈 Updated {trade['id']}: ₹{old_pnl:,.2f} → ₹{new_pnl:,.2f}")
                         
                 except Exception as e:
-                    print(f"❌ Error updating trade {trade.get('id', 'unknown')}: {e}")
+                    logger.error(f"❌ Error updating trade {trade.get('id', 'unknown')}: {e}")
                     continue
                     
             # Save updated trades
             if updated_count > 0:
                 utils.save_trades(trades)
-                print(f"✅ Updated {updated_count} active trades")
+                logger.info(f"✅ Updated {updated_count} active trades")
             else:
-                print("⚠️ No trades updated - check option data")
+                logger.warning("⚠️ No trades updated - check option data")
                 
         except Exception as e:
-            print(f"❌ P&L Update Error: {e}")
+            logger.error(f"❌ P&L Update Error: {e}")
             
     def _get_option_price(self, instrument, strike, expiry, option_type):
         """Get current option price from DhanHQ"""
@@ -259,7 +262,7 @@ class PnLUpdater:
                 
                 # Debugging: Check data types
                 if not isinstance(oc_data, dict):
-                    print(f"❌ Unexpected oc_data type: {type(oc_data)}, value: {str(oc_data)[:100]}...")
+                    logger.error(f"❌ Unexpected oc_data type: {type(oc_data)}, value: {str(oc_data)[:100]}...")
                     return None
                 
                 # Look for the specific strike in the oc dictionary
@@ -268,7 +271,7 @@ class PnLUpdater:
                     strike_data = oc_data[strike_key]
                     
                     if not isinstance(strike_data, dict):
-                        print(f"❌ Unexpected strike_data type: {type(strike_data)}, value: {str(strike_data)[:100]}...")
+                        logger.error(f"❌ Unexpected strike_data type: {type(strike_data)}, value: {str(strike_data)[:100]}...")
                         return None
                     
                     # Get CE or PE data based on option_type
@@ -277,19 +280,19 @@ class PnLUpdater:
                         if isinstance(ce_data, dict):
                             return ce_data.get('last_price', 0)
                         else:
-                            print(f"❌ CE data is not dict: {type(ce_data)}")
+                            logger.error(f"❌ CE data is not dict: {type(ce_data)}")
                     elif option_type == 'PE' and 'pe' in strike_data:
                         pe_data = strike_data['pe']
                         if isinstance(pe_data, dict):
                             return pe_data.get('last_price', 0)
                         else:
-                            print(f"❌ PE data is not dict: {type(pe_data)}")
+                            logger.error(f"❌ PE data is not dict: {type(pe_data)}")
                         
             # Fallback to NSE if DhanHQ fails
             return self._get_nse_option_price(instrument, strike, expiry, option_type)
             
         except Exception as e:
-            print(f"❌ Option price fetch error: {e}")
+            logger.error(f"❌ Option price fetch error: {e}")
             return None
             
     def _get_nse_option_price(self, instrument, strike, expiry, option_type):
@@ -310,7 +313,7 @@ class PnLUpdater:
             return 0
             
         except Exception as e:
-            print(f"❌ NSE fallback error: {e}")
+            logger.error(f"❌ NSE fallback error: {e}")
             return 0
             
     def get_status(self):
@@ -333,12 +336,12 @@ class PnLUpdater:
     def force_update(self):
         """Force immediate P&L update (for settings refresh)"""
         try:
-            print("🔄 Force updating active trades P&L...")
+            logger.info("🔄 Force updating active trades P&L...")
             self._update_active_trades_pnl()
             self.last_update = datetime.now()
             return True
         except Exception as e:
-            print(f"❌ Force update error: {e}")
+            logger.error(f"❌ Force update error: {e}")
             return False
 
 # Global instance
@@ -0,0 +1,126 @@
+"""
+Render Service Module - Chart rendering on a pool of pre-warmed worker processes
+
+render() sends a chart kind and its data payload to a worker process and
+returns the PNG bytes (render_buffer() wraps them in a BytesIO for uploads). Workers are spawned (not forked from the threaded
+Django process), import matplotlib once and render a warm-up chart in their
+initializer, then reuse per-kind figures (see charts.py). If the pool cannot
+be started or breaks, rendering falls back to the calling thread.
+
+Every render is timed (worker render time and end-to-end time including
+pickling) and stats() reports count, mean, p95 and last duration per kind.
+"""
+import io
+import logging
+import multiprocessing
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+from django.conf import settings
+
+from . import charts, run_log
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 2
+RENDER_TIMEOUT = 60  # Seconds before a render is treated as failed
+MAX_POOL_RESTARTS = 3  # After this many broken pools, render in-process for good
+TIMING_HISTORY = 200  # Renders kept per kind for stats()
+
+
+class RenderService:
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers
+        self._pool = None
+        self._workers = 0
+        self._pool_failed = False
+        self._restarts = 0
+        self._lock = threading.Lock()
+        self._timings = defaultdict(lambda: deque(maxlen=TIMING_HISTORY))
+
+    def _get_pool(self):
+        if self._pool is not None or self._pool_failed:
+            return self._pool
+        if getattr(multiprocessing.current_process(), '_inheriting', False):
+            return None  # Never spawn while a child process is still importing __main__
+        with self._lock:
+            if self._pool is None and not self._pool_failed:
+                workers = self.max_workers or getattr(settings, 'RENDER_WORKERS', DEFAULT_WORKERS)
+                try:
+                    self._workers = workers
+                    self._pool = ProcessPoolExecutor(max_workers=workers,
+                                                     mp_context=multiprocessing.get_context('spawn'),
+                                                     initializer=charts.warm_up)
+                    logger.info(f"🖼️ Render service started with {workers} worker processes")
+                except Exception as e:
+                    self._pool_failed = True
+                    logger.warning(f"⚠️ Render pool unavailable, rendering in-process: {e}")
+        return self._pool
+
+    def start(self):
+        """Spawn and warm the workers ahead of the first render."""
+        pool = self._get_pool()
+        if pool is not None:
+            for _ in range(self._workers):
+                pool.submit(int)  # Any task makes the executor spawn (and warm) a worker
+
+    @run_log.stage('render')
+    def render(self, kind, payload):
+        """PNG bytes for a chart kind ('summary', 'payoff', 'pl_update') drawn from `payload`."""
+        start = time.perf_counter()
+        pool = self._get_pool()
+        where = 'process'
+        png = None
+        if pool is not None:
+            try:
+                png, render_seconds = pool.submit(charts.render_png, kind, payload).result(timeout=RENDER_TIMEOUT)
+            except FutureTimeout:
+                logger.error(f"❌ {kind} render timed out in the worker pool, rendering in-process")
+            except BrokenProcessPool as e:
+                logger.error(f"❌ Render pool broke: {e}")
+                with self._lock:
+                    self._pool = None
+                    self._restarts += 1
+                    self._pool_failed = self._restarts >= MAX_POOL_RESTARTS
+        if png is None:
+            where = 'inline'
+            png, render_seconds = charts.render_png(kind, payload)
+
+        total_seconds = time.perf_counter() - start
+        self._timings[kind].append((render_seconds, total_seconds))
+        logger.debug(f"🖼️ Rendered {kind} ({where}) in {render_seconds:.3f}s, {total_seconds:.3f}s end to end")
+        return png
+
+    def render_buffer(self, kind, payload, name=None):
+        """render() as an in-memory PNG file (BytesIO named `name`) for uploading without touching disk."""
+        buffer = io.BytesIO(self.render(kind, payload))
+        buffer.name = name or f"{kind}.png"
+        return buffer
+
+    def stats(self):
+        """Per kind: renders, mean/p95/last render seconds and mean end-to-end seconds."""
+        report = {}
+        for kind, timings in list(self._timings.items()):
+            render_times = np.array([t[0] for t in timings])
+            total_times = np.array([t[1] for t in timings])
+            report[kind] = {
+                'renders': len(timings),
+                'mean_render': round(float(render_times.mean()), 3),
+                'p95_render': round(float(np.percentile(render_times, 95)), 3),
+                'last_render': round(float(render_times[-1]), 3),
+                'mean_total': round(float(total_times.mean()), 3),
+            }
+        return report
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+
+render_service = RenderService()
@@ -0,0 +1,147 @@
+"""
+Portfolio Risk Module - Aggregated Greeks and scenario grid for open trades
+
+Every Running short strangle (from add_to_analysis or auto_add_to_portfolio)
+is expanded into its CE and PE legs, priced with the chain-implied volatility
+smile, and aggregated into net delta, gamma, vega and theta by instrument,
+expiry and entry_tag. A spot-shock x vol-shock scenario grid for the whole
+book is evaluated in a single broadcasted Black-Scholes computation.
+"""
+import logging
+import threading
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from . import greeks
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SPOT_SHOCKS = np.round(np.linspace(-0.05, 0.05, 11), 4)  # -5% .. +5%
+DEFAULT_VOL_SHOCKS = np.round(np.linspace(-0.30, 0.30, 7), 4)    # -30% .. +30% of current IV
+GROUP_DIMENSIONS = ('instrument', 'expiry', 'entry_tag')
+
+
+def position_legs(trades, chains, lot_sizes=None):
+    """
+    Priced legs of all Running trades with signed quantities.
+
+    Each strangle is short one lot of each leg, so quantity is -lot_size.
+    `lot_sizes` maps instrument to lot size; missing entries are looked up
+    from settings once per instrument.
+    """
+    from . import utils
+
+    legs = greeks.held_leg_greeks(trades, chains)
+    lot_sizes = dict(lot_sizes or {})
+    for instrument in set(legs['instrument']):
+        if instrument not in lot_sizes:
+            lot_sizes[instrument] = utils.get_lot_size(instrument)
+
+    legs['quantity'] = -np.array([lot_sizes[i] for i in legs['instrument']], dtype=float)
+    legs['entry_tag'] = [trades[i].get('entry_tag', 'General Trades') for i in legs['trade_index']]
+    legs['trade_id'] = [trades[i].get('id') for i in legs['trade_index']]
+    return legs
+
+
+def aggregate_greeks(legs, dimensions=GROUP_DIMENSIONS):
+    """
+    Net position Greeks per group for each requested dimension, plus the book total.
+
+    Delta is in units of the underlying, gamma per 1 point of spot, vega in
+    rupees per IV point and theta in rupees per calendar day.
+    """
+    frame = pd.DataFrame({
+        'instrument': legs['instrument'],
+        'expiry': legs['expiry'],
+        'entry_tag': legs['entry_tag'],
+        'delta': legs['delta'] * legs['quantity'],
+        'gamma': legs['gamma'] * legs['quantity'],
+        'vega': legs['vega'] * legs['quantity'],
+        'theta': legs['theta'] * legs['quantity'],
+    })
+    columns = ['delta', 'gamma', 'vega', 'theta']
+    priced = frame.dropna(subset=columns)
+
+    def summarise(df):
+        return {col: round(float(df[col].sum()), 4) for col in columns}
+
+    result = {'total': summarise(priced), 'unpriced_legs': int(len(frame) - len(priced))}
+    for dim in dimensions:
+        result[f'by_{dim}'] = {str(key): summarise(group) for key, group in priced.groupby(dim)}
+    return result
+
+
+def scenario_grid(legs, spot_shocks=DEFAULT_SPOT_SHOCKS, vol_shocks=DEFAULT_VOL_SHOCKS, days_forward=0):
+    """
+    P&L of the whole book under every (spot shock, vol shock) pair.
+
+    Spot shocks are relative moves of each leg's underlying, vol shocks are
+    relative changes of each leg's IV. Evaluated as one (spots, vols, legs)
+    broadcast; returns total and per-instrument P&L matrices of shape
+    (len(spot_shocks), len(vol_shocks)) relative to the current model value.
+    """
+    spot_shocks = np.asarray(spot_shocks, dtype=float)
+    vol_shocks = np.asarray(vol_shocks, dtype=float)
+    priced = np.isfinite(legs['spot']) & np.isfinite(legs['iv'])
+    instruments = np.asarray(legs['instrument'], dtype=object)[priced]
+
+    spot = legs['spot'][priced][None, None, :] * (1.0 + spot_shocks[:, None, None])
+    sigma = legs['iv'][priced][None, None, :] * (1.0 + vol_shocks[None, :, None])
+    t = np.maximum(legs['t'][priced] - days_forward / 365.0, 0.0)[None, None, :]
+    shocked = greeks.bs_price(spot, legs['strike'][priced], t, sigma, legs['is_call'][priced])
+    leg_pnl = (shocked - legs['price'][priced]) * legs['quantity'][priced]
+
+    by_instrument = {
+        instrument: leg_pnl[:, :, instruments == instrument].sum(axis=2)
+        for instrument in sorted(set(instruments))
+    }
+    return {
+        'spot_shocks': spot_shocks,
+        'vol_shocks': vol_shocks,
+        'days_forward': days_forward,
+        'total': leg_pnl.sum(axis=2),
+        'by_instrument': by_instrument,
+    }
+
+
+def build_risk_report(trades, chains, spot_shocks=DEFAULT_SPOT_SHOCKS, vol_shocks=DEFAULT_VOL_SHOCKS, lot_sizes=None):
+    """Aggregated Greeks and scenario grid for all Running trades, JSON-serializable."""
+    legs = position_legs(trades, chains, lot_sizes)
+    grid = scenario_grid(legs, spot_shocks, vol_shocks)
+    return {
+        'timestamp': datetime.now().isoformat(),
+        'legs': int(len(legs['strike'])),
+        'greeks': aggregate_greeks(legs),
+        'scenarios': {
+            'spot_shocks': grid['spot_shocks'].tolist(),
+            'vol_shocks': grid['vol_shocks'].tolist(),
+            'total': np.round(grid['total'], 2).tolist(),
+            'by_instrument': {k: np.round(v, 2).tolist() for k, v in grid['by_instrument'].items()},
+        },
+    }
+
+
+# --- Latest snapshot shared with views ---
+_latest_report = None
+_report_lock = threading.Lock()
+
+
+def refresh_risk_snapshot(trades, chains):
+    """Recompute the book risk report (called from every P&L cycle) and keep it as the latest snapshot."""
+    global _latest_report
+    try:
+        report = build_risk_report(trades, chains)
+    except Exception as e:
+        logger.warning(f"Risk snapshot refresh failed: {e}")
+        return None
+    with _report_lock:
+        _latest_report = report
+    return report
+
+
+def get_latest_risk_snapshot():
+    """Most recent risk report, or None if no P&L cycle has produced one yet."""
+    with _report_lock:
+        return _latest_report
@@ -0,0 +1,198 @@
+"""
+Run Log Module - History of scheduled job runs with per-stage timings
+
+Each scheduled job execution (pl_monitor, eod_report, auto_chart_generation,
+permanent_schedule_<id>, ...) is recorded in the state DB with its start,
+end, outcome and how long it spent in each stage:
+
+    @run_log.run('pl_monitor')          # or: with run_log.run(job_id):
+    def job(): ...
+
+    @run_log.stage('chain_fetch')       # or: with run_log.stage('render'):
+    def get_option_chain_data(...): ...
+
+Stages are timed wherever they are marked (history_fetch, zone_calc,
+chain_fetch, render, telegram) and add up inside the run active in the
+current context; outside a run they cost nothing. Work handed to a thread
+pool keeps its run when submitted with run_log.submit(). Stages that run
+concurrently each add their own time, so stage totals can exceed the
+run's wall-clock duration.
+
+recent_runs() and summary() (p50/p95 of the duration and every stage per
+job) back the /api/job-runs/ endpoints.
+"""
+import contextvars
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+from . import state_db
+
+logger = logging.getLogger(__name__)
+
+RETENTION_SECONDS = 30 * 24 * 3600
+SUMMARY_WINDOW = 200  # Most recent runs per job used for the percentiles
+MAX_DETAIL_LENGTH = 500
+
+SUCCESS, ERROR = 'success', 'error'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS job_runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    finished_at REAL NOT NULL,
+    duration REAL NOT NULL,
+    outcome TEXT NOT NULL,
+    detail TEXT,
+    stages TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS job_runs_job ON job_runs (job_id, started_at);
+"""
+
+_current_run = contextvars.ContextVar('job_run', default=None)
+
+
+class RunRecord:
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self.started_at = time.time()
+        self.stages = {}
+        self.outcome = SUCCESS
+        self.detail = None
+        self._lock = threading.Lock()
+
+    def add_stage(self, name, seconds):
+        with self._lock:
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def fail(self, detail):
+        self.outcome = ERROR
+        self.detail = str(detail)[:MAX_DETAIL_LENGTH]
+
+    def save(self):
+        finished_at = time.time()
+        with self._lock:
+            stages = {name: round(seconds, 3) for name, seconds in self.stages.items()}
+        state_db.ensure_schema('job_runs', SCHEMA)
+        with state_db.connect() as conn:
+            conn.execute("INSERT INTO job_runs (job_id, started_at, finished_at, duration, outcome, detail, stages) "
+                         "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                         (self.job_id, self.started_at, finished_at, round(finished_at - self.started_at, 3),
+                          self.outcome, self.detail, json.dumps(stages)))
+            conn.execute("DELETE FROM job_runs WHERE started_at < ?", (finished_at - RETENTION_SECONDS,))
+        logger.info(f"🗂️ {self.job_id} {self.outcome} in {finished_at - self.started_at:.2f}s "
+                    f"({', '.join(f'{k} {v:.2f}s' for k, v in stages.items()) or 'no stages'})")
+
+
+@contextmanager
+def run(job_id):
+    """Record the block as one run of `job_id`; a run inside another run only adds to the outer one."""
+    if _current_run.get() is not None:
+        yield _current_run.get()
+        return
+    record = RunRecord(job_id)
+    token = _current_run.set(record)
+    try:
+        yield record
+    except Exception as e:
+        record.fail(e)
+        raise
+    finally:
+        _current_run.reset(token)
+        try:
+            record.save()
+        except Exception as e:
+            logger.warning(f"⚠️ Could not save run log for {job_id}: {e}")
+
+
+@contextmanager
+def stage(name):
+    """Add the block's duration to stage `name` of the current run, if any."""
+    record = _current_run.get()
+    if record is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record.add_stage(name, time.perf_counter() - start)
+
+
+def fail(detail):
+    """Mark the current run as failed without raising, e.g. where errors are caught and reported."""
+    record = _current_run.get()
+    if record is not None:
+        record.fail(detail)
+
+
+def submit(pool, func, *args, **kwargs):
+    """pool.submit() that runs `func` inside the caller's run, so its stages are recorded."""
+    return pool.submit(contextvars.copy_context().run, func, *args, **kwargs)
+
+
+def _row(row):
+    return {
+        'id': row['id'],
+        'job_id': row['job_id'],
+        'started_at': row['started_at'],
+        'finished_at': row['finished_at'],
+        'duration': row['duration'],
+        'outcome': row['outcome'],
+        'detail': row['detail'],
+        'stages': json.loads(row['stages']),
+    }
+
+
+def recent_runs(job_id=None, limit=50):
+    """Latest runs, newest first, optionally of one job (a trailing '*' matches a prefix)."""
+    state_db.ensure_schema('job_runs', SCHEMA)
+    query, params = "SELECT * FROM job_runs", []
+    if job_id and job_id.endswith('*'):
+        query += " WHERE substr(job_id, 1, ?) = ?"
+        params += [len(job_id) - 1, job_id[:-1]]
+    elif job_id:
+        query += " WHERE job_id = ?"
+        params.append(job_id)
+    query += " ORDER BY started_at DESC LIMIT ?"
+    params.append(int(limit))
+    with state_db.connect() as conn:
+        return [_row(row) for row in conn.execute(query, params).fetchall()]
+
+
+def _percentiles(values):
+    values = np.array(values, dtype=float)
+    return {'p50': round(float(np.percentile(values, 50)), 3), 'p95': round(float(np.percentile(values, 95)), 3)}
+
+
+def summary(window=SUMMARY_WINDOW):
+    """Per job: run and error counts, last run, and p50/p95 of the duration and of each stage."""
+    state_db.ensure_schema('job_runs', SCHEMA)
+    with state_db.connect() as conn:
+        rows = conn.execute("SELECT * FROM (SELECT *, ROW_NUMBER() OVER (PARTITION BY job_id ORDER BY started_at DESC) AS n "
+                            "FROM job_runs) WHERE n <= ? ORDER BY job_id, started_at DESC", (int(window),)).fetchall()
+    by_job = {}
+    for row in rows:
+        by_job.setdefault(row['job_id'], []).append(_row(row))
+
+    report = {}
+    for job_id, runs in by_job.items():
+        stage_times = {}
+        for entry in runs:
+            for name, seconds in entry['stages'].items():
+                stage_times.setdefault(name, []).append(seconds)
+        report[job_id] = {
+            'runs': len(runs),
+            'errors': sum(1 for entry in runs if entry['outcome'] == ERROR),
+            'last_started_at': runs[0]['started_at'],
+            'duration': _percentiles([entry['duration'] for entry in runs]),
+            # Stages missing from a run count as 0s, so percentiles compare across all runs
+            'stages': {name: _percentiles(times + [0.0] * (len(runs) - len(times)))
+                       for name, times in sorted(stage_times.items())},
+        }
+    return report
@@ -0,0 +1,354 @@
+"""
+Scheduler Service - Persistent, single-leader scheduler for the automation schedules
+
+The schedules created on the Automation page (settings['multiple_schedules'])
+used to live in an in-memory scheduler of whichever web process handled the
+form, so they were lost on restart and ran once per worker. Now:
+
+- the serving processes start this service (see apps.py), but only
+  the one holding an exclusive lock on ~/fifto_scheduler.lock runs jobs.
+  The others retry the lock every SCHEDULER_SYNC_SECONDS and take over when
+  the leader exits, since the OS releases the lock with the process;
+- the leader's jobs are kept in the state DB (scheduler_jobs), so next run
+  times survive a restart and a run missed by less than the misfire grace
+  time is still made;
+- the leader loads all enabled schedules at startup and re-syncs them from
+  the settings every SCHEDULER_SYNC_SECONDS, so schedules saved by any
+  process are picked up. Only the leader edits the stored jobs: stopping a
+  schedule in the leader removes its jobs at once, elsewhere on the next sync;
+- last_run / last_result of each schedule are recorded in schedule_runs
+  instead of being written back into app_settings.json;
+- each schedule also gets a warm-up job SCHEDULE_WARMUP_SECONDS before it,
+  which pre-fetches the run's inputs in the same process (see warmup.py).
+"""
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytz
+from apscheduler.job import Job
+from apscheduler.jobstores.base import BaseJobStore, ConflictingIdError, JobLookupError
+from apscheduler.jobstores.memory import MemoryJobStore
+from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.triggers.cron import CronTrigger
+from apscheduler.util import datetime_to_utc_timestamp, utc_timestamp_to_datetime
+from django.conf import settings
+
+from . import run_log, state_db
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+LOCK_FILE = os.path.join(os.path.expanduser('~'), "fifto_scheduler.lock")
+TIMEZONE = pytz.timezone('Asia/Kolkata')
+JOB_PREFIX = 'permanent_schedule_'
+WARMUP_PREFIX = 'schedule_warmup_'
+DAY_ORDER = ['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun']
+DEFAULT_SYNC_SECONDS = 30
+DEFAULT_MISFIRE_GRACE_SECONDS = 10 * 60
+
+DAY_NAMES = {
+    'monday': 'mon', 'tuesday': 'tue', 'wednesday': 'wed', 'thursday': 'thu',
+    'friday': 'fri', 'saturday': 'sat', 'sunday': 'sun',
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scheduler_jobs (
+    id TEXT PRIMARY KEY,
+    next_run_time REAL,
+    job_state BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS scheduler_jobs_next_run ON scheduler_jobs (next_run_time);
+CREATE TABLE IF NOT EXISTS schedule_runs (
+    schedule_id TEXT PRIMARY KEY,
+    last_run TEXT,
+    last_result TEXT
+);
+"""
+
+
+class SQLiteJobStore(BaseJobStore):
+    """APScheduler job store on the shared state DB (APScheduler's own needs SQLAlchemy)."""
+
+    def start(self, scheduler, alias):
+        super().start(scheduler, alias)
+        state_db.ensure_schema('scheduler', SCHEMA)
+
+    def _reconstitute_job(self, job_state):
+        job_state = pickle.loads(job_state)
+        job_state['jobstore'] = self
+        job = Job.__new__(Job)
+        job.__setstate__(job_state)
+        job._scheduler = self._scheduler
+        job._jobstore_alias = self._alias
+        return job
+
+    def _get_jobs(self, where="", params=()):
+        with state_db.connect() as conn:
+            rows = conn.execute(f"SELECT id, job_state FROM scheduler_jobs {where} ORDER BY next_run_time",
+                                params).fetchall()
+        jobs, broken = [], []
+        for row in rows:
+            try:
+                jobs.append(self._reconstitute_job(row['job_state']))
+            except Exception:
+                self._logger.exception(f"Unable to restore job '{row['id']}' -- removing it")
+                broken.append((row['id'],))
+        if broken:
+            with state_db.connect() as conn:
+                conn.executemany("DELETE FROM scheduler_jobs WHERE id = ?", broken)
+        return jobs
+
+    def lookup_job(self, job_id):
+        with state_db.connect() as conn:
+            row = conn.execute("SELECT job_state FROM scheduler_jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._reconstitute_job(row['job_state']) if row else None
+
+    def get_due_jobs(self, now):
+        return self._get_jobs("WHERE next_run_time <= ?", (datetime_to_utc_timestamp(now),))
+
+    def get_next_run_time(self):
+        with state_db.connect() as conn:
+            row = conn.execute("SELECT MIN(next_run_time) AS next_run_time FROM scheduler_jobs "
+                               "WHERE next_run_time IS NOT NULL").fetchone()
+        return utc_timestamp_to_datetime(row['next_run_time']) if row['next_run_time'] is not None else None
+
+    def get_all_jobs(self):
+        jobs = self._get_jobs()
+        self._fix_paused_jobs_sorting(jobs)
+        return jobs
+
+    def add_job(self, job):
+        try:
+            with state_db.connect() as conn:
+                conn.execute("INSERT INTO scheduler_jobs (id, next_run_time, job_state) VALUES (?, ?, ?)",
+                             (job.id, datetime_to_utc_timestamp(job.next_run_time),
+                              pickle.dumps(job.__getstate__(), pickle.HIGHEST_PROTOCOL)))
+        except sqlite3.IntegrityError:
+            raise ConflictingIdError(job.id)
+
+    def update_job(self, job):
+        with state_db.connect() as conn:
+            cursor = conn.execute("UPDATE scheduler_jobs SET next_run_time = ?, job_state = ? WHERE id = ?",
+                                  (datetime_to_utc_timestamp(job.next_run_time),
+                                   pickle.dumps(job.__getstate__(), pickle.HIGHEST_PROTOCOL), job.id))
+        if cursor.rowcount == 0:
+            raise JobLookupError(job.id)
+
+    def remove_job(self, job_id):
+        with state_db.connect() as conn:
+            cursor = conn.execute("DELETE FROM scheduler_jobs WHERE id = ?", (job_id,))
+        if cursor.rowcount == 0:
+            raise JobLookupError(job_id)
+
+    def remove_all_jobs(self):
+        with state_db.connect() as conn:
+            conn.execute("DELETE FROM scheduler_jobs")
+
+
+def schedule_trigger(schedule, lead_seconds=0):
+    """
+    Cron trigger for a schedule's HH:MM time on its active days (every day if none
+    are set), or `lead_seconds` earlier, moving to the previous day if that crosses midnight.
+    """
+    hour, minute = schedule.get('time', '09:20').split(':')
+    run_at = datetime(2000, 1, 3, int(hour), int(minute))  # A Monday, only the time of day matters
+    fire_at = run_at - timedelta(seconds=lead_seconds)
+    shift = (fire_at.date() - run_at.date()).days
+    days = [DAY_ORDER[(DAY_ORDER.index(DAY_NAMES.get(day.lower(), day.lower()[:3])) + shift) % 7]
+            for day in schedule.get('active_days') or []]
+    return CronTrigger(day_of_week=','.join(days) or '*', hour=fire_at.hour, minute=fire_at.minute,
+                       second=fire_at.second, timezone=TIMEZONE)
+
+
+def run_schedule(schedule_id):
+    """Job entry point: run the schedule as currently saved in the settings."""
+    from . import utils
+
+    schedule = next((s for s in utils.load_settings().get('multiple_schedules', []) if s.get('id') == schedule_id), None)
+    if schedule is None:
+        logger.warning(f"⚠️ Schedule {schedule_id} no longer exists, skipping run")
+        return
+    with run_log.run(f"{JOB_PREFIX}{schedule_id}"):
+        utils.run_permanent_schedule(schedule)
+
+
+def warm_up_schedule(schedule_id):
+    """Job entry point: pre-fetch the inputs of the schedule's next run."""
+    from . import utils, warmup
+
+    schedule = next((s for s in utils.load_settings().get('multiple_schedules', []) if s.get('id') == schedule_id), None)
+    if schedule is None or not schedule.get('enabled', False):
+        return
+    logger.info(f"♨️ Warming up schedule '{schedule['name']}' ahead of {schedule.get('time')}")
+    with run_log.run(f"{WARMUP_PREFIX}{schedule_id}"):
+        warmup.warm_up(utils.schedule_instrument_jobs(schedule))
+
+
+class SchedulerService:
+    def __init__(self):
+        self.scheduler = None
+        self._lock_file = None
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    @property
+    def is_leader(self):
+        return self.scheduler is not None
+
+    def _try_lock(self):
+        """Take the leader lock without blocking; True if this process now holds it."""
+        lock_file = open(LOCK_FILE, 'a+')
+        try:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            lock_file.close()
+            return False
+        lock_file.seek(0)
+        lock_file.truncate()
+        lock_file.write(f"{os.getpid()}\n")
+        lock_file.flush()
+        self._lock_file = lock_file  # Kept open for the life of the process
+        return True
+
+    def start(self):
+        """Join the leader election (idempotent); the winner starts executing the schedules."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            state_db.ensure_schema('scheduler', SCHEMA)
+            self._campaign_once()
+            self._thread = threading.Thread(target=self._campaign, name='scheduler-election', daemon=True)
+            self._thread.start()
+
+    def _campaign_once(self):
+        if self.is_leader or not self._try_lock():
+            return
+        scheduler = BackgroundScheduler(timezone=TIMEZONE, jobstores={
+            'default': SQLiteJobStore(),
+            'memory': MemoryJobStore(),
+        }, job_defaults={
+            'coalesce': True,
+            'max_instances': 1,
+            'misfire_grace_time': getattr(settings, 'SCHEDULER_MISFIRE_GRACE_SECONDS', DEFAULT_MISFIRE_GRACE_SECONDS),
+        })
+        scheduler.start()
+        self.scheduler = scheduler
+        logger.info(f"👑 Scheduler leader elected (pid {os.getpid()})")
+        self.sync()
+
+    def _campaign(self):
+        """Followers keep retrying the lock so one of them takes over when the leader exits."""
+        interval = getattr(settings, 'SCHEDULER_SYNC_SECONDS', DEFAULT_SYNC_SECONDS)
+        while True:
+            time.sleep(interval)
+            try:
+                if self.is_leader:
+                    self.sync()
+                else:
+                    self._campaign_once()
+            except Exception as e:
+                logger.error(f"❌ Scheduler sync failed: {e}")
+
+    def sync(self):
+        """Make the stored jobs match the enabled schedules in the settings (leader only)."""
+        from . import utils, warmup
+
+        if not self.is_leader:
+            return False
+        lead = warmup.warmup_seconds()
+        wanted = {}
+        for schedule in utils.load_settings().get('multiple_schedules', []):
+            if not schedule.get('enabled', False):
+                continue
+            try:
+                wanted[f"{JOB_PREFIX}{schedule['id']}"] = (run_schedule, schedule, schedule_trigger(schedule))
+                if lead:
+                    wanted[f"{WARMUP_PREFIX}{schedule['id']}"] = (warm_up_schedule, schedule, schedule_trigger(schedule, lead))
+            except (ValueError, AttributeError) as e:
+                logger.error(f"[ERROR] Schedule '{schedule.get('name')}' has an invalid time: {e}")
+
+        for job in self.scheduler.get_jobs(jobstore='default'):
+            if job.id.startswith((JOB_PREFIX, WARMUP_PREFIX)) and job.id not in wanted:
+                job.remove()
+                logger.info(f"[+] Removed schedule job {job.id}")
+        for job_id, (func, schedule, trigger) in wanted.items():
+            job = self.scheduler.get_job(job_id, jobstore='default')
+            if job is None:
+                self.scheduler.add_job(func, trigger, id=job_id, name=schedule.get('name', job_id),
+                                       args=[schedule['id']], jobstore='default')
+                logger.info(f"[+] Scheduled {job_id} for '{schedule.get('name')}' ({trigger})")
+            elif str(job.trigger) != str(trigger) or job.name != schedule.get('name', job_id):
+                job.modify(name=schedule.get('name', job_id))
+                job.reschedule(trigger)
+                logger.info(f"[+] Rescheduled {job_id} for '{schedule.get('name')}' ({trigger})")
+        return True
+
+    def remove(self, schedule_id):
+        """
+        Drop a schedule's jobs at once in the leader; elsewhere returns False and the
+        leader's next sync() drops them (run_schedule skips disabled schedules meanwhile).
+        Only the leader touches scheduler_jobs, so its in-memory scheduler stays consistent.
+        """
+        if not self.is_leader:
+            return False
+        for job_id in (f"{JOB_PREFIX}{schedule_id}", f"{WARMUP_PREFIX}{schedule_id}"):
+            try:
+                self.scheduler.remove_job(job_id, jobstore='default')
+            except JobLookupError:
+                pass
+        return True
+
+    def record_run(self, schedule_id, last_run, last_result):
+        state_db.ensure_schema('scheduler', SCHEMA)
+        with state_db.connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO schedule_runs (schedule_id, last_run, last_result) VALUES (?, ?, ?)",
+                         (str(schedule_id), last_run, last_result))
+
+    def forget_runs(self, schedule_id):
+        state_db.ensure_schema('scheduler', SCHEMA)
+        with state_db.connect() as conn:
+            conn.execute("DELETE FROM schedule_runs WHERE schedule_id = ?", (str(schedule_id),))
+
+    def run_state(self):
+        """{schedule_id: {'last_run', 'last_result'}} of every schedule that has run."""
+        state_db.ensure_schema('scheduler', SCHEMA)
+        with state_db.connect() as conn:
+            rows = conn.execute("SELECT * FROM schedule_runs").fetchall()
+        return {row['schedule_id']: {'last_run': row['last_run'], 'last_result': row['last_result']} for row in rows}
+
+    def with_run_state(self, schedules):
+        """Copies of the schedules with last_run / last_result from schedule_runs filled in."""
+        runs = self.run_state()
+        return [{**schedule, **runs.get(str(schedule.get('id')), {})} for schedule in schedules]
+
+    def status(self):
+        state_db.ensure_schema('scheduler', SCHEMA)
+        with state_db.connect() as conn:
+            rows = conn.execute("SELECT id, next_run_time FROM scheduler_jobs ORDER BY next_run_time").fetchall()
+        return {
+            'pid': os.getpid(),
+            'is_leader': self.is_leader,
+            'jobs': [{'id': row['id'],
+                      'next_run_time': (datetime.fromtimestamp(row['next_run_time'], TIMEZONE).isoformat()
+                                        if row['next_run_time'] is not None else None)}
+                     for row in rows],
+        }
+
+
+scheduler_service = SchedulerService()
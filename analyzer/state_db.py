@@ -0,0 +1,56 @@
+"""
+State DB Module - Shared SQLite database for durable app state
+
+A single file (~/fifto_state.sqlite3, next to the other data files) holds
+the tables of the background subsystems that need to survive a restart,
+such as the job runner. Each module declares its own schema with
+ensure_schema(); connections are short-lived, in WAL mode with a busy
+timeout so threads and processes can share the file.
+"""
+import logging
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+STATE_DB_FILE = os.path.join(os.path.expanduser('~'), "fifto_state.sqlite3")
+BUSY_TIMEOUT_SECONDS = 10
+
+_schema_lock = threading.Lock()
+_ready_schemas = set()
+
+
+def _connect():
+    conn = sqlite3.connect(STATE_DB_FILE, timeout=BUSY_TIMEOUT_SECONDS)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+@contextmanager
+def connect():
+    """Connection that commits on success, rolls back on error and is always closed."""
+    conn = _connect()
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def ensure_schema(name, ddl):
+    """Run a module's CREATE TABLE/INDEX IF NOT EXISTS script once per process."""
+    if name in _ready_schemas:
+        return
+    with _schema_lock:
+        if name in _ready_schemas:
+            return
+        with connect() as conn:
+            conn.executescript(ddl)
+        _ready_schemas.add(name)
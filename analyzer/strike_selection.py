@@ -0,0 +1,158 @@
+"""
+Strike Selection Module - Vectorized, configurable strike ladders
+
+Selects N-deep CE and PE ladders from the normalized chain arrays produced
+by greeks.normalize_chain. Each side is anchored at the zone-derived strike
+(CE at or above the supply zone, PE at or below the demand zone) and filled
+by a ranking rule applied with vectorized masks and a stable argsort:
+
+- ladder:   consecutive strikes stepping away from the anchor
+- premium:  highest last traded price beyond the anchor
+- oi:       highest open interest beyond the anchor
+- distance: listed strikes nearest to the anchor
+- delta:    |delta| closest to a target delta
+
+DEFAULT_SELECTION reproduces the original FifSel.py picks: three CE strikes
+stepping up from the supply anchor, and the PE anchor followed by the two
+highest-premium puts below it.
+"""
+import logging
+import math
+
+import numpy as np
+import pandas as pd
+
+from . import greeks
+
+logger = logging.getLogger(__name__)
+
+ENTRY_LABELS = ["High Reward", "Mid Reward", "Low Reward"]
+RANK_RULES = ('ladder', 'premium', 'oi', 'distance', 'delta')
+DEFAULT_TARGET_DELTA = 0.15
+
+DEFAULT_SELECTION = {
+    'depth': 3,
+    'strike_increment': None,  # None = instrument default (50 NIFTY, 100 others)
+    'ce': {'rank': 'ladder', 'include_anchor': True},
+    'pe': {'rank': 'premium', 'include_anchor': True},
+}
+
+
+def default_increment(instrument_name):
+    return 50 if instrument_name == "NIFTY" else 100
+
+
+def entry_labels(depth):
+    """Entry names: the classic three reward levels, then Level N for deeper ladders."""
+    return [ENTRY_LABELS[i] if i < len(ENTRY_LABELS) else f"Level {i + 1}" for i in range(depth)]
+
+
+def anchor_strikes(upper, lower, strike_increment):
+    """CE anchor at or above `upper`, PE anchor at or below `lower`, on the strike grid."""
+    ce_anchor = math.ceil(upper / strike_increment) * strike_increment
+    pe_anchor = math.floor(lower / strike_increment) * strike_increment
+    return ce_anchor, pe_anchor
+
+
+def chain_from_prices(ce_prices, pe_prices, spot):
+    """Normalized chain arrays from {strike: price} dicts (no OI or IV), e.g. sample data."""
+    strikes = np.array(sorted(set(ce_prices) | set(pe_prices)), dtype=float)
+    zeros = np.zeros(len(strikes))
+    return {
+        'spot': float(spot),
+        'expiry': None,
+        'strikes': strikes,
+        'ce_ltp': np.array([ce_prices.get(s, 0.0) for s in strikes], dtype=float),
+        'pe_ltp': np.array([pe_prices.get(s, 0.0) for s in strikes], dtype=float),
+        'ce_oi': zeros,
+        'pe_oi': zeros,
+        'ce_iv_quoted': zeros,
+        'pe_iv_quoted': zeros,
+    }
+
+
+def prices_at(chain, strikes, side):
+    """Last traded price at each strike, 0.0 where the strike is not listed."""
+    listed = chain['strikes']
+    strikes = np.asarray(strikes, dtype=float)
+    if not len(listed):
+        return np.zeros(len(strikes))
+    idx = np.clip(np.searchsorted(listed, strikes), 0, len(listed) - 1)
+    return np.where(listed[idx] == strikes, chain[f'{side}_ltp'][idx], 0.0)
+
+
+def _abs_delta(chain, is_call):
+    """|delta| per listed strike, from IV implied by the chain's own prices."""
+    ltp = chain['ce_ltp'] if is_call else chain['pe_ltp']
+    try:
+        t = greeks.time_to_expiry(chain['expiry'])
+    except (TypeError, ValueError):
+        return np.full(len(ltp), np.nan)
+    iv = greeks.implied_volatility(ltp, chain['spot'], chain['strikes'], t, is_call)
+    return np.abs(greeks.bs_greeks(chain['spot'], chain['strikes'], t, iv, is_call)['delta'])
+
+
+def select_side(chain, side, anchor, depth, strike_increment, rule=None):
+    """
+    Pick `depth` strikes for one side ('ce' or 'pe') in ranked order.
+
+    Ranked rules choose among listed strikes strictly beyond the anchor with
+    a positive premium; if too few qualify, the ladder is padded by stepping
+    one increment outward from the last pick.
+    """
+    rule = dict(rule or DEFAULT_SELECTION[side])
+    rank = rule.get('rank', 'ladder')
+    if rank not in RANK_RULES:
+        raise ValueError(f"Unknown strike ranking rule: {rank}")
+    direction = 1 if side == 'ce' else -1
+    picks = [anchor] if rule.get('include_anchor', True) else []
+
+    if rank == 'ladder':
+        start = 0 if picks else 1
+        return [anchor + direction * i * strike_increment for i in range(start, start + depth)][:depth]
+
+    strikes = chain['strikes']
+    premium = chain[f'{side}_ltp']
+    beyond = (strikes > anchor) if direction > 0 else (strikes < anchor)
+    mask = beyond & (premium > rule.get('min_premium', 0))
+    if rank == 'premium':
+        score = -premium
+    elif rank == 'oi':
+        score = -chain[f'{side}_oi']
+    elif rank == 'distance':
+        score = np.abs(strikes - anchor)
+    else:
+        score = np.abs(_abs_delta(chain, side == 'ce') - rule.get('target_delta', DEFAULT_TARGET_DELTA))
+        mask &= np.isfinite(score)
+
+    candidates = np.flatnonzero(mask)
+    ranked = candidates[np.argsort(score[candidates], kind='stable')]
+    picks.extend(float(s) for s in strikes[ranked[:depth - len(picks)]])
+
+    while len(picks) < depth:
+        last = picks[-1] if picks else anchor
+        picks.append(last + direction * strike_increment)
+    return picks
+
+
+def select_strikes(chain, upper, lower, strike_increment, config=None):
+    """
+    Strategy table for one chain: Entry, CE_Strike, CE_Price, PE_Strike, PE_Price.
+
+    `upper`/`lower` are the supply/demand zones (or the spot for both when
+    zones are unavailable). `config` overrides keys of DEFAULT_SELECTION.
+    """
+    config = {**DEFAULT_SELECTION, **(config or {})}
+    depth = int(config['depth'])
+    strike_increment = config.get('strike_increment') or strike_increment
+    ce_anchor, pe_anchor = anchor_strikes(upper, lower, strike_increment)
+
+    strikes_ce = select_side(chain, 'ce', ce_anchor, depth, strike_increment, config['ce'])
+    strikes_pe = select_side(chain, 'pe', pe_anchor, depth, strike_increment, config['pe'])
+    return pd.DataFrame({
+        "Entry": entry_labels(depth),
+        "CE_Strike": strikes_ce,
+        "CE_Price": prices_at(chain, strikes_ce, 'ce'),
+        "PE_Strike": strikes_pe,
+        "PE_Price": prices_at(chain, strikes_pe, 'pe'),
+    })
@@ -0,0 +1,140 @@
+"""
+Sweep Module - Parallel parameter sweeps over the backtest engine
+
+Every combination of a parameter grid (any keys of backtest.DEFAULT_PARAMS,
+e.g. zone_multiplier, range_short/range_long, zone_step, target_pct and
+stoploss_pct) is backtested on a process pool. The candle arrays are
+placed once in shared memory and every worker maps them read-only in its
+initializer, so tasks only carry their parameter dict. Results come back
+as a DataFrame ranked by the chosen metric.
+"""
+import itertools
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from . import backtest, candle_store
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RANK_BY = 'total_pnl'
+METRICS = ('trades', 'win_rate', 'total_pnl', 'avg_pnl', 'max_drawdown', 'pnl_per_drawdown')
+LOWER_IS_BETTER = {'max_drawdown'}  # Ranked ascending; every other metric descending
+
+# Per-worker state set by _init_worker
+_worker = {}
+
+
+def parameter_grid(grid):
+    """Expand {name: [values]} into a list of parameter dicts (cartesian product)."""
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+def _share_candles(candles):
+    """Copy trading days (as epoch days) + OHLC into one shared float64 block; returns (block, shape)."""
+    daily = candles[candle_store.CANDLE_COLUMNS].astype(float)
+    epoch_days = candle_store.trading_days(daily.index).values.astype('datetime64[D]').astype(float)
+    table = np.column_stack([epoch_days, daily.values])
+    block = shared_memory.SharedMemory(create=True, size=table.nbytes)
+    np.ndarray(table.shape, dtype=float, buffer=block.buf)[:] = table
+    return block, table.shape
+
+
+def _init_worker(block_name, shape, instrument, base_params, entry):
+    block = shared_memory.SharedMemory(name=block_name)
+    table = np.ndarray(shape, dtype=float, buffer=block.buf)
+    table.flags.writeable = False
+    index = pd.DatetimeIndex(table[:, 0].astype('int64').astype('datetime64[D]'))
+    _worker.update({
+        'block': block,  # Keep the mapping alive for the worker's lifetime
+        'candles': pd.DataFrame(table[:, 1:], index=index, columns=candle_store.CANDLE_COLUMNS, copy=False),
+        'instrument': instrument,
+        'base_params': base_params,
+        'entry': entry,
+    })
+
+
+def _metrics(results, entry=None):
+    trades = results if entry is None else results[results['entry'] == entry]
+    if trades.empty:
+        return {name: 0 for name in METRICS}
+    # Pool ladder levels week by week so drawdown reflects the combined equity curve
+    weekly_pnl = trades.groupby('week_start')['pnl'].sum()
+    equity = weekly_pnl.cumsum()
+    drawdown = float((equity.cummax().clip(lower=0) - equity).max())
+    total = float(trades['pnl'].sum())
+    return {
+        'trades': int(len(trades)),
+        'win_rate': round(float((trades['pnl'] > 0).mean() * 100), 1),
+        'total_pnl': round(total, 2),
+        'avg_pnl': round(float(trades['pnl'].mean()), 2),
+        'max_drawdown': round(drawdown, 2),
+        # Undefined without a drawdown (e.g. a single winning week); ranked after every defined ratio
+        'pnl_per_drawdown': round(total / drawdown, 3) if drawdown > 0 else float('nan'),
+    }
+
+
+def _evaluate(combo):
+    start = time.perf_counter()
+    params = {**_worker['base_params'], **combo}
+    try:
+        results = backtest.run_backtest(_worker['candles'], _worker['instrument'], params)
+        row = {**combo, **_metrics(results, _worker['entry'])}
+    except Exception as e:
+        row = {**combo, 'error': str(e)}
+    row['seconds'] = round(time.perf_counter() - start, 3)
+    return row
+
+
+def run_sweep(candles, instrument, grid, base_params=None, entry=None, rank_by=DEFAULT_RANK_BY,
+              max_workers=None):
+    """
+    Backtest every combination in `grid` and return a ranked DataFrame.
+
+    `base_params` fixes the parameters that are not swept (lot_size defaults
+    to the configured lot size), `entry` limits metrics to one ladder level
+    such as 'High Reward' (all levels pooled by default), and rows are
+    sorted best first by `rank_by` (ascending for LOWER_IS_BETTER metrics),
+    with undefined values and failed combinations last.
+    """
+    combos = parameter_grid(grid)
+    base_params = dict(base_params or {})
+    if base_params.get('lot_size') is None:
+        from . import utils
+        base_params['lot_size'] = utils.get_lot_size(instrument)
+
+    max_workers = max_workers or os.cpu_count() or 1
+    chunksize = max(1, len(combos) // (max_workers * 4))
+    sweep_start = time.perf_counter()
+    block, shape = _share_candles(candles)
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                 initargs=(block.name, shape, instrument, base_params, entry)) as pool:
+            rows = list(pool.map(_evaluate, combos, chunksize=chunksize))
+    finally:
+        block.close()
+        block.unlink()
+
+    table = pd.DataFrame(rows)
+    if rank_by in table:
+        table = table.sort_values(rank_by, ascending=rank_by in LOWER_IS_BETTER, kind='stable',
+                                  na_position='last').reset_index(drop=True)
+        table.insert(0, 'rank', np.arange(1, len(table) + 1))
+    logger.info(f"✅ Sweep of {len(combos)} combinations for {instrument} finished in "
+          f"{time.perf_counter() - sweep_start:.1f}s on {max_workers} workers")
+    return table
+
+
+def sweep_instrument(instrument, grid, **kwargs):
+    """Run a sweep on the locally stored candles for an instrument."""
+    candles = candle_store.load_candles(instrument)
+    if candles is None or candles.empty:
+        logger.error(f"❌ No stored candles for {instrument}. Run candle_store.backfill_candles('{instrument}') first.")
+        return None
+    return run_sweep(candles, instrument, grid, **kwargs)
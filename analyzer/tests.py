@@ -1,3 +1,40 @@
-from django.test import TestCase
+from datetime import date, timedelta
 
-# Create your tests here.
+import numpy as np
+import pandas as pd
+from django.test import SimpleTestCase
+
+from . import utils
+from .zone_engine import ZoneEngine
+
+
+def dhan_daily_frame(first_monday, weeks):
+    """Weekday candles stamped like DhanHQ: IST midnight as naive UTC, i.e. 18:30 on the day before."""
+    days = [first_monday + timedelta(days=7 * week + weekday) for week in range(weeks) for weekday in range(5)]
+    opens = np.arange(len(days), dtype=float) * 10 + 20000
+    index = pd.DatetimeIndex([pd.Timestamp(day) - pd.Timedelta(hours=5, minutes=30) for day in days])
+    df = pd.DataFrame({'Open': opens, 'High': opens + 50 + np.arange(len(days)) % 7 * 10,
+                       'Low': opens - 50, 'Close': opens + 5}, index=index)
+    return days, df
+
+
+class DhanTimestampZoneTests(SimpleTestCase):
+    """A Monday candle stamped on Sunday 18:30 must open the new week, not close the last one."""
+
+    def test_zone_engine_uses_monday_open_as_base(self):
+        days, df = dhan_daily_frame(date(2025, 1, 6), 15)
+        engine = ZoneEngine()
+        engine.ingest('NIFTY', df.iloc[:-4])  # Through the last week's Monday
+        self.assertEqual(engine.details('NIFTY', 'Weekly')['base_open'], df['Open'].iloc[-5])
+
+    def test_tradingview_zones_ignore_utc_stamps(self):
+        days, df = dhan_daily_frame(date(2025, 1, 6), 15)
+        ist_df = df.set_axis(pd.DatetimeIndex(days), axis=0)
+        self.assertEqual(utils.calculate_zones_from_data_tradingview(df.iloc[:-4], 'NIFTY', 'Weekly', 'DhanHQ'),
+                         utils.calculate_zones_from_data_tradingview(ist_df.iloc[:-4], 'NIFTY', 'Weekly', 'DhanHQ'))
+
+    def test_monday_candle_covers_current_week(self):
+        monday = date.fromisoformat(utils.current_week_start())
+        _, df = dhan_daily_frame(monday - timedelta(weeks=1), 2)
+        self.assertTrue(utils.covers_current_week(df.iloc[:-4]))
+        self.assertFalse(utils.covers_current_week(df.iloc[:-5]))
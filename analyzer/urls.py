@@ -18,6 +18,16 @@ urlpatterns = [
     path('api/market-status/', api_views.market_status_api, name='market_status_api'),
     path('api/historical-data/', api_views.historical_data_api, name='historical_data_api'),
     path('api/refresh-trades/', views.refresh_trades_api, name='refresh_trades_api'),
+    path('api/portfolio-risk/', views.portfolio_risk_api, name='portfolio_risk_api'),
+    path('api/logs/', views.logs_api, name='logs_api'),
+    path('api/render-stats/', views.render_stats_api, name='render_stats_api'),
+    path('api/notifications/', views.notifications_api, name='notifications_api'),
+    path('api/scheduler/', views.scheduler_status_api, name='scheduler_status_api'),
+    path('api/ltp-probe/', views.ltp_probe_api, name='ltp_probe_api'),
+    path('api/job-runs/', views.job_runs_api, name='job_runs_api'),
+    path('api/job-runs/summary/', views.job_runs_summary_api, name='job_runs_summary_api'),
+    path('api/analysis/', views.analysis_data_api, name='analysis_data_api'),
+    path('api/analysis/payoff/', views.payoff_data_api, name='payoff_data_api'),
 
     # Form submission actions
     path('generate/', views.generate_and_show_analysis, name='generate_analysis'),
@@ -33,6 +43,7 @@ urlpatterns = [
     path('settings/', views.settings_view, name='settings'),
     path('nse-test/', views.nse_test_view, name='nse_test'),
     path('test_telegram/', views.test_telegram, name='test_telegram'),
+    path('logs/', views.logs_view, name='logs'),
 
     # Action for closing a specific trade
     path('close_trade/<str:trade_id>/', views.close_trade, name='close_trade'),
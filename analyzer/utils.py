@@ -1,25 +1,34 @@
 # analyzer/utils.py
 
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
 import pandas as pd
 import requests
-import math, time, json, os, pytz, uuid
+import math, time, json, os, pytz, uuid, threading
 from datetime import datetime, timedelta
 from collections import defaultdict
 import numpy as np
 from django.conf import settings
+import logging
+
+logger = logging.getLogger(__name__)
 
 # DhanHQ Integration
 try:
     from .dhan_api import dhan_api, get_dhan_price, get_dhan_historical, get_dhan_option_chain, get_dhan_option_chain_with_expiry
     DHAN_AVAILABLE = True
-    print("✅ DhanHQ API module loaded successfully")
+    logger.info("✅ DhanHQ API module loaded successfully")
 except ImportError as e:
-    print(f"⚠️  DhanHQ not available: {e}. Using fallback methods.")
+    logger.warning(f"⚠️  DhanHQ not available: {e}. Using fallback methods.")
     DHAN_AVAILABLE = False
 
+from . import alerts, analysis_cache, candle_store, greeks, notifications, payoff, pnl_change, risk, run_log, strike_selection
+from .notifications import notification_queue
+from .pnl_change import pnl_change_detector
+from .ltp_monitor import ltp_monitor
+from .activity_log import activity_log
+from .zone_engine import zone_engine
+from .chart_store import chart_store
+from .render_service import render_service
+
 # Fallback imports
 import yfinance as yf
 
@@ -28,6 +37,7 @@ BASE_DIR_USER = os.path.expanduser('~') # User's home directory for data files
 TRADES_DB_FILE = os.path.join(BASE_DIR_USER, "active_trades.json")
 SETTINGS_FILE = os.path.join(BASE_DIR_USER, "app_settings.json")
 EXPIRY_CACHE_FILE = os.path.join(BASE_DIR_USER, "expiry_cache.json")
+ZONE_CACHE_FILE = os.path.join(BASE_DIR_USER, "zone_cache.json")
 STATIC_FOLDER_PATH = os.path.join(settings.BASE_DIR, 'static') # Django project's static folder
 
 # --- Settings & Trade Management ---
@@ -44,6 +54,10 @@ def load_settings():
         "enable_trade_alerts": True,
         "enable_bulk_alerts": True,
         "enable_summary_alerts": True,
+        # Periodic P/L image: sent only when a tag's P/L moves by both thresholds, else a heartbeat
+        "pl_update_min_change": 500,
+        "pl_update_min_change_pct": 10,
+        "pl_update_heartbeat_minutes": 60,
         # Lot size configuration
         "nifty_lot_size": 75,
         "banknifty_lot_size": 35,
@@ -72,10 +86,10 @@ def save_settings(settings_data):
         with open(SETTINGS_FILE, 'w') as f:
             json.dump(settings_data, f, indent=4)
         
-        print(f"Settings saved successfully to: {SETTINGS_FILE}")
+        logger.info(f"Settings saved successfully to: {SETTINGS_FILE}")
         return True
     except Exception as e:
-        print(f"Error saving settings: {e}")
+        logger.error(f"Error saving settings: {e}")
         raise e
 
 def load_trades():
@@ -117,7 +131,7 @@ def save_expiry_cache(cache_data):
             json.dump(cache_data, f, indent=4)
         return True
     except Exception as e:
-        print(f"Error saving expiry cache: {e}")
+        logger.error(f"Error saving expiry cache: {e}")
         return False
 
 def is_thursday():
@@ -165,7 +179,77 @@ def update_expiry_cache(instrument, expiry_dates):
     cache['last_refresh'] = datetime.now().isoformat()
     
     save_expiry_cache(cache)
-    print(f"✅ Updated expiry cache for {instrument}: {len(expiry_dates)} dates")
+    logger.info(f"✅ Updated expiry cache for {instrument}: {len(expiry_dates)} dates")
+
+# --- Weekly Zone Cache Management ---
+# Zones only depend on completed weekly bars and the current week's open,
+# so they are cached per (instrument, calculation type, week start).
+_zone_cache_lock = threading.Lock()
+
+def current_week_start():
+    """Monday of the current IST week as YYYY-MM-DD."""
+    today = datetime.now(pytz.timezone('Asia/Kolkata')).date()
+    return (today - timedelta(days=today.weekday())).isoformat()
+
+def zone_cache_key(instrument, calculation_type, week_start=None):
+    return f"{instrument}|{calculation_type}|{week_start or current_week_start()}"
+
+def load_zone_cache():
+    """Load cached supply/demand zones."""
+    if not os.path.exists(ZONE_CACHE_FILE):
+        return {}
+    try:
+        with open(ZONE_CACHE_FILE, 'r') as f:
+            return json.load(f)
+    except (json.JSONDecodeError, FileNotFoundError):
+        return {}
+
+def save_zone_cache(cache_data):
+    """Save supply/demand zone cache."""
+    try:
+        with open(ZONE_CACHE_FILE, 'w') as f:
+            json.dump(cache_data, f, indent=4)
+        return True
+    except Exception as e:
+        logger.error(f"Error saving zone cache: {e}")
+        return False
+
+def covers_current_week(df):
+    """True if the history has a candle on or after this IST week's Monday (its open is known)."""
+    return candle_store.trading_days(df.index).max().date().isoformat() >= current_week_start()
+
+def get_cached_zones(instrument, calculation_type):
+    """Cached (supply, demand) for this week, or (None, None) on a miss."""
+    entry = load_zone_cache().get(zone_cache_key(instrument, calculation_type))
+    if not entry:
+        return None, None
+    return entry['supply_zone'], entry['demand_zone']
+
+def update_zone_cache(instrument, calculation_type, supply_zone, demand_zone, data_source):
+    """Store this week's (rounded) zones, dropping entries from previous weeks."""
+    week_start = current_week_start()
+    with _zone_cache_lock:
+        cache = {key: value for key, value in load_zone_cache().items()
+                 if value.get('week_start') == week_start}
+        cache[zone_cache_key(instrument, calculation_type, week_start)] = {
+            'supply_zone': int(supply_zone),
+            'demand_zone': int(demand_zone),
+            'week_start': week_start,
+            'data_source': data_source,
+            'cached_on': datetime.now().isoformat(),
+        }
+        save_zone_cache(cache)
+    logger.info(f"✅ Cached {calculation_type} zones for {instrument} (week of {week_start})")
+
+def invalidate_zone_cache(instrument=None):
+    """Drop cached zones for one instrument, or all of them (e.g. after new candles arrive)."""
+    with _zone_cache_lock:
+        cache = load_zone_cache()
+        if instrument is None:
+            cache = {}
+        else:
+            cache = {key: value for key, value in cache.items() if not key.startswith(f"{instrument}|")}
+        save_zone_cache(cache)
 
 def round_to_nearest_50(value):
     """Round a value to the nearest 50 for cleaner target/stoploss amounts."""
@@ -195,7 +279,7 @@ def _fetch_yf_history_util(symbols, period_days=180, interval='1d'):
                         df_single.index = pd.to_datetime(df_single.index)
                         return df_single, sym
     except Exception as e:
-        print(f"⚠️ yfinance fetch failed in util: {e}")
+        logger.warning(f"⚠️ yfinance fetch failed in util: {e}")
     return None, None
 
 def try_yfinance_zones_only(instrument_name, calculation_type):
@@ -205,16 +289,16 @@ def try_yfinance_zones_only(instrument_name, calculation_type):
     TICKERS = {"NIFTY": ["^NSEI", "NSEI.NS"], "BANKNIFTY": ["^NSEBANK"]}
     symbols_to_try = TICKERS.get(instrument_name, [])
     if not symbols_to_try:
-        print(f"❌ No yfinance tickers defined for {instrument_name}")
+        logger.error(f"❌ No yfinance tickers defined for {instrument_name}")
         return None, None
 
     df_zones, used_symbol = _fetch_yf_history_util(symbols_to_try)
 
     if df_zones is None or df_zones.empty:
-        print(f"❌ yfinance failed to fetch data for {instrument_name} using {symbols_to_try}")
+        logger.error(f"❌ yfinance failed to fetch data for {instrument_name} using {symbols_to_try}")
         return None, None
 
-    print(f"✅ yfinance got {len(df_zones)} records from {used_symbol} for {instrument_name}")
+    logger.info(f"✅ yfinance got {len(df_zones)} records from {used_symbol} for {instrument_name}")
 
     resample_period = 'W' if calculation_type == "Weekly" else 'ME'
     agg_df = df_zones.resample(resample_period).agg({
@@ -224,7 +308,7 @@ def try_yfinance_zones_only(instrument_name, calculation_type):
     }).dropna()
 
     if len(agg_df) < 10:
-        print(f"❌ Not enough weekly data from yfinance for {instrument_name} (need 10, got {len(agg_df)})")
+        logger.error(f"❌ Not enough weekly data from yfinance for {instrument_name} (need 10, got {len(agg_df)})")
         return None, None
 
     high_low = (agg_df['High'] - agg_df['Low'])
@@ -250,16 +334,16 @@ def calculate_weekly_zones_yfinance_only(instrument_name, calculation_type):
     """
     Calculate zones using ONLY yfinance data (for testing/comparison)
     """
-    print(f"🔄 YFINANCE-ONLY calculation for {instrument_name} {calculation_type}...")
+    logger.info(f"🔄 YFINANCE-ONLY calculation for {instrument_name} {calculation_type}...")
     
     # Force yfinance method only
     supply_zone, demand_zone = try_yfinance_zones_only(instrument_name, calculation_type)
     
     if supply_zone is not None and demand_zone is not None:
-        print(f"✅ yfinance-only method successful for {instrument_name}")
+        logger.info(f"✅ yfinance-only method successful for {instrument_name}")
         return supply_zone, demand_zone
     
-    print(f"❌ yfinance-only method failed for {instrument_name}")
+    logger.error(f"❌ yfinance-only method failed for {instrument_name}")
     return None, None
 
 def calculate_weekly_zones(instrument_name, calculation_type):
@@ -268,50 +352,67 @@ def calculate_weekly_zones(instrument_name, calculation_type):
     This is the primary and only method used for production calculations.
     The yfinance fallback has been removed due to persistent reliability issues.
     """
-    print(f"🔄 Calculating {calculation_type} zones for {instrument_name} using DhanHQ...")
+    supply_zone, demand_zone = get_cached_zones(instrument_name, calculation_type)
+    if supply_zone is not None and demand_zone is not None:
+        logger.info(f"⚡ Using cached {calculation_type} zones for {instrument_name} (week of {current_week_start()})")
+        return supply_zone, demand_zone
+
+    logger.info(f"🔄 Calculating {calculation_type} zones for {instrument_name} using DhanHQ...")
     
     # Directly use the robust DhanHQ method.
     supply_zone, demand_zone = calculate_zones_dhanhq(instrument_name, calculation_type)
     
     if supply_zone is not None and demand_zone is not None:
-        print(f"✅ DhanHQ method successful for {instrument_name}")
+        logger.info(f"✅ DhanHQ method successful for {instrument_name}")
         # Return the raw, unrounded values for display
         return supply_zone, demand_zone
     
     # If DhanHQ fails, we return None to indicate a failure that needs attention.
-    print(f"❌ CRITICAL: DhanHQ data fetch failed for {instrument_name}. Zone calculation aborted.")
+    logger.error(f"❌ CRITICAL: DhanHQ data fetch failed for {instrument_name}. Zone calculation aborted.")
     return None, None
 
-def calculate_zones_dhanhq(instrument_name, calculation_type):
+ZONE_HISTORY_DAYS = {'3m': 90, '6m': 180, '1y': 365}
+
+def zone_history_period(instrument_name, calculation_type):
+    """Historical data period fetched for a zone calculation."""
+    # NIFSEL.py specifically uses 6 months of daily data for Weekly NIFTY zones.
+    if calculation_type == 'Weekly' and instrument_name == 'NIFTY':
+        return '6m'
+    # Default periods for other calculations.
+    period_map = {'Weekly': '3m', 'Monthly': '1y', 'Quarterly': '1y'}
+    return period_map.get(calculation_type, '6m')
+
+def calculate_zones_dhanhq(instrument_name, calculation_type, df=None):
     """
     Calculate zones using ONLY the DhanHQ data source, following the exact FifSel.py logic.
+    Pass `df` to reuse history that was already fetched (e.g. by a batch run).
     """
     try:
         if not DHAN_AVAILABLE or not getattr(settings, 'USE_DHAN_API', True):
-            print("❌ DhanHQ is not available or is disabled in settings.")
+            logger.error("❌ DhanHQ is not available or is disabled in settings.")
             return None, None
 
-        # Determine the correct historical data period based on NIFSEL.py logic.
-        # NIFSEL.py specifically uses 6 months of daily data for Weekly NIFTY zones.
-        if calculation_type == 'Weekly' and instrument_name == 'NIFTY':
-            period = '6m'
-        else:
-            # Default periods for other calculations.
-            period_map = {'Weekly': '3m', 'Monthly': '1y', 'Quarterly': '1y'}
-            period = period_map.get(calculation_type, '6m')
-        
-        print(f"📊 Fetching {period} of historical data from DhanHQ for {instrument_name}...")
-        df = get_dhan_historical(instrument_name, period)
+        if df is None:
+            # Determine the correct historical data period based on NIFSEL.py logic.
+            period = zone_history_period(instrument_name, calculation_type)
+            logger.debug(f"📊 Fetching {period} of historical data from DhanHQ for {instrument_name}...")
+            with run_log.stage('history_fetch'):
+                df = get_dhan_historical(instrument_name, period)
         
         if df is not None and not df.empty and len(df) > 10:
             # Use the new TradingView logic for zone calculation.
-            return calculate_zones_from_data_tradingview(df, instrument_name, calculation_type, 'DhanHQ')
+            supply_zone, demand_zone = calculate_zones_incremental(df, instrument_name, calculation_type, 'DhanHQ')
+            # Only cache once the data includes the current week's open, otherwise
+            # the zones are still based on last week's bar.
+            if supply_zone is not None and covers_current_week(df):
+                update_zone_cache(instrument_name, calculation_type, supply_zone, demand_zone, 'DhanHQ')
+            return supply_zone, demand_zone
         else:
-            print(f"❌ Insufficient data from DhanHQ for {instrument_name}. Received {len(df) if df is not None else 0} records.")
+            logger.error(f"❌ Insufficient data from DhanHQ for {instrument_name}. Received {len(df) if df is not None else 0} records.")
             return None, None
             
     except Exception as e:
-        print(f"❌ Error during DhanHQ zone calculation for {instrument_name}: {e}")
+        logger.error(f"❌ Error during DhanHQ zone calculation for {instrument_name}: {e}")
         import traceback
         traceback.print_exc()
         return None, None
@@ -323,7 +424,7 @@ def try_yfinance_zones(instrument_name, calculation_type):
     It should not be used in production due to yfinance reliability issues.
     """
     try:
-        print(f"🔄 [TESTING ONLY] Calculating {calculation_type} zones for {instrument_name} via yfinance...")
+        logger.info(f"🔄 [TESTING ONLY] Calculating {calculation_type} zones for {instrument_name} via yfinance...")
         
         # Fallback to yfinance - using exact FifSel.py logic
         TICKERS = {"NIFTY": ["^NSEI", "NSEI.NS"], "BANKNIFTY": ["^NSEBANK"]}
@@ -332,13 +433,13 @@ def try_yfinance_zones(instrument_name, calculation_type):
         if not symbols_to_try:
             return None, None
             
-        print(f"Using ticker symbols: {', '.join(symbols_to_try)}")
+        logger.info(f"Using ticker symbols: {', '.join(symbols_to_try)}")
         
         # Fetch historical data for zone calculation - use the robust utility
         df_zones, used_symbol = _fetch_yf_history_util(symbols_to_try)
             
         if df_zones is None or df_zones.empty:
-            print(f"❌ yfinance method failed to fetch data for {instrument_name}")
+            logger.error(f"❌ yfinance method failed to fetch data for {instrument_name}")
             return None, None
             
         # Convert index to datetime
@@ -348,7 +449,7 @@ def try_yfinance_zones(instrument_name, calculation_type):
         return calculate_zones_from_data_tradingview(df_zones, instrument_name, calculation_type, f'yfinance ({used_symbol})')
         
     except Exception as e:
-        print(f"❌ yfinance method failed for {instrument_name}: {e}")
+        logger.error(f"❌ yfinance method failed for {instrument_name}: {e}")
         return None, None
 
 
@@ -361,11 +462,13 @@ def calculate_zones_from_data_tradingview(df, instrument_name, calculation_type,
     """
     try:
         if df is None or df.empty or len(df) < 50:
-            print(f"❌ Insufficient data for {instrument_name} using {data_source}: {len(df) if df is not None else 0} records")
+            logger.error(f"❌ Insufficient data for {instrument_name} using {data_source}: {len(df) if df is not None else 0} records")
             return None, None
 
-        # 1. Resample daily data to weekly, starting on Monday.
-        weekly_df = df.resample('W-MON', label='left', closed='left').agg({
+        # 1. Resample daily data to weekly, starting on Monday (on IST trading days,
+        #    since DhanHQ stamps a day's candle at 18:30 UTC of the day before).
+        daily_df = df.set_axis(candle_store.trading_days(df.index), axis=0)
+        weekly_df = daily_df.resample('W-MON', label='left', closed='left').agg({
             'Open': 'first',
             'High': 'max',
             'Low': 'min',
@@ -373,7 +476,7 @@ def calculate_zones_from_data_tradingview(df, instrument_name, calculation_type,
         }).dropna()
 
         if len(weekly_df) < 11:
-            print(f"❌ Insufficient weekly data from {data_source} for {instrument_name} (need at least 11 weeks, got {len(weekly_df)})")
+            logger.error(f"❌ Insufficient weekly data from {data_source} for {instrument_name} (need at least 11 weeks, got {len(weekly_df)})")
             return None, None
 
         # 2. Isolate the current, forming week and the previous completed weeks.
@@ -403,13 +506,13 @@ def calculate_zones_from_data_tradingview(df, instrument_name, calculation_type,
         supply_zone = max(supply_raw_5, supply_raw_10)
         demand_zone = min(demand_raw_5, demand_raw_10)
 
-        print(f"📊 TradingView Zone Calculation for {instrument_name} ({calculation_type}):")
-        print(f"   Current price: ₹{df['Close'].iloc[-1]:.2f}")
-        print(f"   Base (Current Week Open): ₹{base_open:.2f}")
-        print(f"   RNG5 (SMA of H-L): ₹{latest_rng5:.2f}")
-        print(f"   RNG10 (SMA of H-L): ₹{latest_rng10:.2f}")
-        print(f"   Supply Zone (Raw): ₹{supply_zone:.2f}")
-        print(f"   Demand Zone (Raw): ₹{demand_zone:.2f}")
+        logger.debug(f"📊 TradingView Zone Calculation for {instrument_name} ({calculation_type}):")
+        logger.debug(f"   Current price: ₹{df['Close'].iloc[-1]:.2f}")
+        logger.debug(f"   Base (Current Week Open): ₹{base_open:.2f}")
+        logger.debug(f"   RNG5 (SMA of H-L): ₹{latest_rng5:.2f}")
+        logger.debug(f"   RNG10 (SMA of H-L): ₹{latest_rng10:.2f}")
+        logger.debug(f"   Supply Zone (Raw): ₹{supply_zone:.2f}")
+        logger.debug(f"   Demand Zone (Raw): ₹{demand_zone:.2f}")
 
         # Round to nearest 50 for NIFTY, 100 for BANKNIFTY
         if 'NIFTY' in instrument_name.upper() and 'BANK' not in instrument_name.upper():
@@ -419,14 +522,53 @@ def calculate_zones_from_data_tradingview(df, instrument_name, calculation_type,
             supply_zone_rounded = round(supply_zone / 100) * 100
             demand_zone_rounded = round(demand_zone / 100) * 100
 
-        print(f"✅ {calculation_type} zones calculated using {data_source} for {instrument_name}:")
-        print(f"   Supply Zone (Rounded): ₹{supply_zone_rounded}")
-        print(f"   Demand Zone (Rounded): ₹{demand_zone_rounded}")
+        logger.info(f"✅ {calculation_type} zones calculated using {data_source} for {instrument_name}:")
+        logger.debug(f"   Supply Zone (Rounded): ₹{supply_zone_rounded}")
+        logger.debug(f"   Demand Zone (Rounded): ₹{demand_zone_rounded}")
 
         return supply_zone_rounded, demand_zone_rounded
 
     except Exception as e:
-        print(f"❌ Error calculating TradingView zones from data: {e}")
+        logger.error(f"❌ Error calculating TradingView zones from data: {e}")
+        import traceback
+        traceback.print_exc()
+        return None, None
+
+@run_log.stage('zone_calc')
+def calculate_zones_incremental(df, instrument_name, calculation_type, data_source):
+    """
+    Same zones as calculate_zones_from_data_tradingview, read from the incremental
+    zone engine. Only candles newer than the last ingested day are folded in, and
+    all timeframes are kept up to date in the same pass. Production zones stay on
+    weekly bars for every calculation type, as in the TradingView logic.
+    """
+    try:
+        if df is None or df.empty or len(df) < 50:
+            logger.error(f"❌ Insufficient data for {instrument_name} using {data_source}: {len(df) if df is not None else 0} records")
+            return None, None
+
+        zone_engine.ingest(instrument_name, df)
+        if candle_store.update_candles(instrument_name, df):
+            # New or revised candles: zones cached from the old history may be stale
+            invalidate_zone_cache(instrument_name)
+        details = zone_engine.details(instrument_name, 'Weekly')
+        if details is None:
+            logger.error(f"❌ Insufficient weekly data from {data_source} for {instrument_name} (need at least 11 weeks)")
+            return None, None
+
+        supply_zone, demand_zone = zone_engine.zones(instrument_name, 'Weekly')
+        logger.debug(f"📊 Incremental Zone Calculation for {instrument_name} ({calculation_type}):")
+        logger.debug(f"   Current price: ₹{df['Close'].iloc[-1]:.2f}")
+        logger.debug(f"   Base (Current Week Open): ₹{details['base_open']:.2f}")
+        logger.debug(f"   RNG5 (SMA of H-L): ₹{details['rng5']:.2f}")
+        logger.debug(f"   RNG10 (SMA of H-L): ₹{details['rng10']:.2f}")
+        logger.info(f"✅ {calculation_type} zones calculated using {data_source} for {instrument_name}:")
+        logger.debug(f"   Supply Zone (Rounded): ₹{supply_zone}")
+        logger.debug(f"   Demand Zone (Rounded): ₹{demand_zone}")
+        return supply_zone, demand_zone
+
+    except Exception as e:
+        logger.error(f"❌ Error calculating incremental zones from data: {e}")
         import traceback
         traceback.print_exc()
         return None, None
@@ -437,7 +579,7 @@ def calculate_zones_from_data(df, instrument_name, calculation_type, data_source
     """
     try:
         if len(df) < 10:
-            print(f"❌ Insufficient data for {instrument_name}")
+            logger.error(f"❌ Insufficient data for {instrument_name}")
             return None, None
         
         # Determine period for zone calculation
@@ -504,16 +646,16 @@ def calculate_zones_from_data(df, instrument_name, calculation_type, data_source
             supply_zone = round(supply_zone / 100) * 100
             demand_zone = round(demand_zone / 100) * 100
         
-        print(f"✅ {calculation_type} zones calculated using {data_source} for {instrument_name}:")
-        print(f"   Current Price: ₹{current_price}")
-        print(f"   Supply Zone: ₹{supply_zone}")
-        print(f"   Demand Zone: ₹{demand_zone}")
-        print(f"   Zone Range: ₹{supply_zone - demand_zone}")
+        logger.info(f"✅ {calculation_type} zones calculated using {data_source} for {instrument_name}:")
+        logger.debug(f"   Current Price: ₹{current_price}")
+        logger.debug(f"   Supply Zone: ₹{supply_zone}")
+        logger.debug(f"   Demand Zone: ₹{demand_zone}")
+        logger.debug(f"   Zone Range: ₹{supply_zone - demand_zone}")
         
         return supply_zone, demand_zone
         
     except Exception as e:
-        print(f"❌ Error calculating zones from data: {e}")
+        logger.error(f"❌ Error calculating zones from data: {e}")
         return None, None
 
 def calculate_fallback_zones(instrument_name, calculation_type):
@@ -549,16 +691,16 @@ def calculate_fallback_zones(instrument_name, calculation_type):
         supply_zone = round(supply_zone / strike_increment) * strike_increment
         demand_zone = round(demand_zone / strike_increment) * strike_increment
         
-        print(f"✅ {calculation_type} zones calculated using mathematical model for {instrument_name}:")
-        print(f"   Current Price: ₹{current_price}")
-        print(f"   Supply Zone: ₹{supply_zone}")
-        print(f"   Demand Zone: ₹{demand_zone}")
-        print(f"   Zone Range: ₹{supply_zone - demand_zone}")
+        logger.info(f"✅ {calculation_type} zones calculated using mathematical model for {instrument_name}:")
+        logger.debug(f"   Current Price: ₹{current_price}")
+        logger.debug(f"   Supply Zone: ₹{supply_zone}")
+        logger.debug(f"   Demand Zone: ₹{demand_zone}")
+        logger.debug(f"   Zone Range: ₹{supply_zone - demand_zone}")
         
         return supply_zone, demand_zone
         
     except Exception as e:
-        print(f"❌ Error in fallback zone calculation for {instrument_name}: {e}")
+        logger.error(f"❌ Error in fallback zone calculation for {instrument_name}: {e}")
         return None, None
 
 def get_current_market_price(instrument_name):
@@ -570,7 +712,7 @@ def get_current_market_price(instrument_name):
         if DHAN_AVAILABLE and getattr(settings, 'USE_DHAN_API', True):
             price = get_dhan_price(instrument_name)
             if price and price > 0:
-                print(f"✅ DhanHQ price for {instrument_name}: ₹{price}")
+                logger.info(f"✅ DhanHQ price for {instrument_name}: ₹{price}")
                 return price
         
         # Fallback to option chain data
@@ -588,6 +730,7 @@ def get_current_market_price(instrument_name):
         pass
     return None
 
+@run_log.stage('chain_fetch')
 def get_option_chain_data(symbol, force_full_data=False, expiry_date=None):
     """
     Get option chain data using cached expiry dates when available
@@ -598,17 +741,17 @@ def get_option_chain_data(symbol, force_full_data=False, expiry_date=None):
     try:
         # If expiry_date is specified, always fetch fresh data for that specific expiry
         if expiry_date:
-            print(f"🔄 Fetching option chain data for {symbol} with specific expiry {expiry_date}...")
+            logger.info(f"🔄 Fetching option chain data for {symbol} with specific expiry {expiry_date}...")
             return _fetch_fresh_option_chain_data_with_expiry(symbol, expiry_date)
         
         # If force_full_data is True, always fetch fresh data with complete option chain
         if force_full_data:
-            print(f"🔄 Force fetching complete option chain data for {symbol}...")
+            logger.info(f"🔄 Force fetching complete option chain data for {symbol}...")
             return _fetch_fresh_option_chain_data(symbol)
         
         # Check if we should refresh expiry cache (every Thursday)
         if should_refresh_expiry_cache():
-            print(f"🔄 Thursday refresh: Updating expiry cache for {symbol}...")
+            logger.info(f"🔄 Thursday refresh: Updating expiry cache for {symbol}...")
             fresh_data = _fetch_fresh_option_chain_data(symbol)
             if fresh_data and 'expiryDates' in fresh_data:
                 update_expiry_cache(symbol, fresh_data['expiryDates'])
@@ -617,7 +760,7 @@ def get_option_chain_data(symbol, force_full_data=False, expiry_date=None):
         # Try to get from cache first - this is the main optimization
         cached_expiry_dates = get_cached_expiry_dates(symbol)
         if cached_expiry_dates:
-            print(f"✅ Using local cached expiry dates for {symbol}: {len(cached_expiry_dates)} dates (no API call needed)")
+            logger.info(f"✅ Using local cached expiry dates for {symbol}: {len(cached_expiry_dates)} dates (no API call needed)")
             # Return cached data structure without fetching fresh option chain
             return {
                 'expiryDates': cached_expiry_dates,
@@ -627,7 +770,7 @@ def get_option_chain_data(symbol, force_full_data=False, expiry_date=None):
             }
         
         # Only fetch fresh data if no cache exists
-        print(f"🔄 No cache available, fetching fresh data for {symbol} (first time)...")
+        logger.info(f"🔄 No cache available, fetching fresh data for {symbol} (first time)...")
         fresh_data = _fetch_fresh_option_chain_data(symbol)
         if fresh_data and 'expiryDates' in fresh_data:
             update_expiry_cache(symbol, fresh_data['expiryDates'])
@@ -637,7 +780,7 @@ def get_option_chain_data(symbol, force_full_data=False, expiry_date=None):
         return get_fallback_expiry_data(symbol)
             
     except Exception as e:
-        print(f"❌ Error in option chain fetch for {symbol}: {e}")
+        logger.error(f"❌ Error in option chain fetch for {symbol}: {e}")
         return get_fallback_expiry_data(symbol)
 
 def _fetch_fresh_option_chain_data_with_expiry(symbol, expiry_date):
@@ -647,18 +790,18 @@ def _fetch_fresh_option_chain_data_with_expiry(symbol, expiry_date):
     try:
         # Try DhanHQ first with specific expiry
         if DHAN_AVAILABLE and getattr(settings, 'USE_DHAN_API', True):
-            print(f"🔄 Attempting DhanHQ option chain for {symbol} with expiry {expiry_date}...")
+            logger.info(f"🔄 Attempting DhanHQ option chain for {symbol} with expiry {expiry_date}...")
             dhan_data = get_dhan_option_chain_with_expiry(symbol, expiry_date)
             if dhan_data:
-                print(f"✅ DhanHQ option chain for {symbol} with expiry {expiry_date}")
+                logger.info(f"✅ DhanHQ option chain for {symbol} with expiry {expiry_date}")
                 return dhan_data
         
         # Fallback to regular fetch without specific expiry
-        print(f"⚠️ Falling back to regular option chain fetch for {symbol}")
+        logger.warning(f"⚠️ Falling back to regular option chain fetch for {symbol}")
         return _fetch_fresh_option_chain_data(symbol)
         
     except Exception as e:
-        print(f"❌ Error fetching option chain for {symbol} with expiry {expiry_date}: {e}")
+        logger.error(f"❌ Error fetching option chain for {symbol} with expiry {expiry_date}: {e}")
         return _fetch_fresh_option_chain_data(symbol)
 
 
@@ -669,22 +812,22 @@ def _fetch_fresh_option_chain_data(symbol):
     try:
         # Try DhanHQ first
         if DHAN_AVAILABLE and getattr(settings, 'USE_DHAN_API', True):
-            print(f"🔄 Attempting DhanHQ option chain for {symbol}...")
+            logger.info(f"🔄 Attempting DhanHQ option chain for {symbol}...")
             dhan_data = get_dhan_option_chain(symbol)
             if dhan_data and 'expiryDates' in dhan_data:
-                print(f"✅ DhanHQ option chain for {symbol}: {len(dhan_data['expiryDates'])} expiry dates")
+                logger.info(f"✅ DhanHQ option chain for {symbol}: {len(dhan_data['expiryDates'])} expiry dates")
                 return dhan_data
             elif dhan_data:
-                print(f"⚠️  DhanHQ returned data but no expiry dates for {symbol}")
+                logger.warning(f"⚠️  DhanHQ returned data but no expiry dates for {symbol}")
                 # Try to extract expiry dates from the data structure
                 expiry_dates = extract_expiry_dates_from_dhan_data(dhan_data, symbol)
                 if expiry_dates:
                     dhan_data['expiryDates'] = expiry_dates
-                    print(f"✅ Extracted {len(expiry_dates)} expiry dates from DhanHQ data")
+                    logger.info(f"✅ Extracted {len(expiry_dates)} expiry dates from DhanHQ data")
                     return dhan_data
         
         # Fallback to NSE API
-        print(f"🔄 Falling back to NSE API for {symbol}...")
+        logger.info(f"🔄 Falling back to NSE API for {symbol}...")
         if getattr(settings, 'FALLBACK_TO_NSE', True):
             session = requests.Session()
             headers = {
@@ -698,14 +841,14 @@ def _fetch_fresh_option_chain_data(symbol):
             time.sleep(1)
             response = session.get(api_url, headers=headers, timeout=15)
             response.raise_for_status()
-            print(f"✅ NSE option chain fallback for {symbol}")
+            logger.info(f"✅ NSE option chain fallback for {symbol}")
             return response.json()
             
     except requests.exceptions.RequestException as e:
-        print(f"❌ Error fetching option chain for {symbol}: {e}")
+        logger.error(f"❌ Error fetching option chain for {symbol}: {e}")
         return None
     except Exception as e:
-        print(f"❌ General error in fetch for {symbol}: {e}")
+        logger.error(f"❌ General error in fetch for {symbol}: {e}")
         return None
 
 def extract_expiry_dates_from_dhan_data(dhan_data, symbol):
@@ -736,7 +879,7 @@ def extract_expiry_dates_from_dhan_data(dhan_data, symbol):
         
         # If no expiry dates found, calculate them
         if not expiry_dates:
-            print(f"⚠️  No expiry dates found in DhanHQ response, calculating fallback dates for {symbol}")
+            logger.warning(f"⚠️  No expiry dates found in DhanHQ response, calculating fallback dates for {symbol}")
             from datetime import datetime, timedelta
             current_date = datetime.now()
             
@@ -753,7 +896,7 @@ def extract_expiry_dates_from_dhan_data(dhan_data, symbol):
         return expiry_dates[:10]  # Return first 10 expiry dates
         
     except Exception as e:
-        print(f"❌ Error extracting expiry dates from DhanHQ data: {e}")
+        logger.error(f"❌ Error extracting expiry dates from DhanHQ data: {e}")
         return []
 
 def get_fallback_expiry_data(symbol):
@@ -812,7 +955,7 @@ def get_fallback_expiry_data(symbol):
         # Sort expiries
         expiries.sort(key=lambda x: datetime.strptime(x, "%d-%b-%Y"))
         
-        print(f"🔄 Using fallback expiry dates for {symbol}: {expiries[:3]}...")
+        logger.info(f"🔄 Using fallback expiry dates for {symbol}: {expiries[:3]}...")
         
         # Return in consistent format
         return {
@@ -828,7 +971,7 @@ def get_fallback_expiry_data(symbol):
         }
         
     except Exception as e:
-        print(f"❌ Fallback expiry generation error: {e}")
+        logger.error(f"❌ Fallback expiry generation error: {e}")
         # Ultimate fallback with static dates
         return {
             'expiryDates': [
@@ -854,79 +997,46 @@ def get_fallback_expiry_data(symbol):
 
 # In analyzer/utils.py
 
-def generate_pl_update_image(data_for_image, timestamp):
-    """Generates a styled image from P/L data for Telegram updates."""
-    num_lines = 1 + sum(len(trades) + 1.5 for _, trades in data_for_image['tags'].items())
-    fig_height = max(3, num_lines * 0.4)
-
-    fig, ax = plt.subplots(figsize=(8, fig_height), facecolor='#1e1e1e')
-    ax.axis('off')
-
-    fig.text(0.5, 0.95, data_for_image['title'], ha='center', va='top', fontsize=18, fontweight='bold', color='#f0f0f0')
-
-    y_pos = 0.85
-    line_height = 1.0 / (num_lines + 2)
-
-    for tag, trades in sorted(data_for_image['tags'].items()):
-        tag_pnl = sum(t['pnl'] for t in trades)
-        tag_color = '#28a745' if tag_pnl >= 0 else '#dc3545'
-        ax.text(0.1, y_pos, f"{tag}", ha='left', va='top', fontsize=14, fontweight='bold', color='#007bff')
-        ax.text(0.9, y_pos, f"₹{tag_pnl:,.2f}", ha='right', va='top', fontsize=14, fontweight='bold', color=tag_color)
-        y_pos -= line_height * 1.2
-
-        for trade in trades:
-            pnl = trade['pnl']
-            pnl_color = '#28a745' if pnl >= 0 else '#dc3545'
-
-            ax.text(0.15, y_pos, f"• {trade['reward_type']}:", ha='left', va='top', fontsize=13, color='#cccccc')
-            ax.text(0.85, y_pos, f"₹{pnl:,.2f}", ha='right', va='top', fontsize=13, color=pnl_color, family='monospace')
-            y_pos -= line_height
-
-        y_pos -= (line_height / 2)
-
-    timestamp_str = timestamp.strftime("%d-%b-%Y %I:%M:%S %p")
-    fig.text(0.98, 0.02, timestamp_str, ha='right', va='bottom', fontsize=9, color='#888888')
-
-    filename = f"pl_update_{uuid.uuid4().hex}.png"
-    filepath = os.path.join(STATIC_FOLDER_PATH, filename)
-    plt.savefig(filepath, dpi=150, bbox_inches='tight', facecolor=fig.get_facecolor(), pad_inches=0.1)
-    plt.close(fig)
-    return filepath
+def generate_pl_update_image(data_for_image, timestamp, in_memory=False):
+    """
+    Generates a styled image from P/L data for Telegram updates. Returns its absolute
+    path, or with `in_memory` a BytesIO PNG that is never written to disk.
+    """
+    payload = {
+        'title': data_for_image['title'],
+        'tags': {tag: [{'reward_type': t['reward_type'], 'pnl': float(t['pnl'])} for t in trades]
+                 for tag, trades in data_for_image['tags'].items()},
+        'timestamp': timestamp.strftime("%d-%b-%Y %I:%M:%S %p"),
+    }
+    if in_memory:
+        return render_service.render_buffer('pl_update', payload, f"pl_update_{timestamp:%H%M%S}.png")
+    return os.path.join(settings.BASE_DIR, chart_store.get_or_render('pl_update', payload))
 
 def send_telegram_message(message="", image_paths=None):
-    """Send message and/or images to Telegram."""
+    """
+    Queue a message and/or images for Telegram (see notifications.py); returns at once.
+    Each image can be a file path or a binary file-like object such as the BytesIO
+    from render_service.render_buffer().
+    """
+    return queue_telegram_message(message, image_paths)[0]
+
+@run_log.stage('telegram')
+def queue_telegram_message(message="", image_paths=None):
+    """send_telegram_message() returning (status, notification id); the id is None if nothing was queued."""
     app_settings = load_settings()
     bot_token = app_settings.get("bot_token")
     chat_id = app_settings.get("chat_id")
 
     if not bot_token or not chat_id:
-        return "Telegram credentials are not configured in Settings."
+        return "Telegram credentials are not configured in Settings.", None
 
+    if isinstance(image_paths, (str, os.PathLike)) or hasattr(image_paths, 'read'): image_paths = [image_paths]
     try:
-        if image_paths:
-            if isinstance(image_paths, str): image_paths = [image_paths]
-            if len(image_paths) > 1:
-                url = f"https://api.telegram.org/bot{bot_token}/sendMediaGroup"
-                files, media = {}, []
-                for i, path in enumerate(image_paths):
-                    file_name = os.path.basename(path)
-                    files[file_name] = open(path, 'rb')
-                    photo_media = {'type': 'photo', 'media': f'attach://{file_name}'}
-                    if i == 0 and message: photo_media['caption'] = message
-                    media.append(photo_media)
-                response = requests.post(url, data={'chat_id': chat_id, 'media': json.dumps(media)}, files=files)
-                for f in files.values(): f.close()
-            elif len(image_paths) == 1:
-                url = f"https://api.telegram.org/bot{bot_token}/sendPhoto"
-                with open(image_paths[0], 'rb') as img:
-                    response = requests.post(url, data={'chat_id': chat_id, 'caption': message}, files={'photo': img})
-        else:
-            url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
-            response = requests.post(url, data={'chat_id': chat_id, 'text': message, 'parse_mode': 'Markdown'})
-        response.raise_for_status()
-        return "Message sent to Telegram."
-    except requests.exceptions.RequestException as e:
-        return f"Failed to send to Telegram: {e}"
+        notification_id = notification_queue.enqueue(chat_id, message, image_paths)
+        return "Message queued for Telegram.", notification_id
+    except Exception as e:
+        logger.error(f"❌ Failed to queue Telegram message: {e}")
+        return f"Failed to send to Telegram: {e}", None
 
 def send_telegram_message_with_credentials(message, bot_token, chat_id):
     """Send a test message using provided credentials (for testing purposes)."""
@@ -939,11 +1049,11 @@ def send_telegram_message_with_credentials(message, bot_token, chat_id):
             'chat_id': chat_id, 
             'text': message, 
             'parse_mode': 'Markdown'
-        })
+        }, timeout=notifications.REQUEST_TIMEOUT)
         response.raise_for_status()
         return True
     except requests.exceptions.RequestException as e:
-        print(f"Failed to send test message to Telegram: {e}")
+        logger.info(f"Failed to send test message to Telegram: {notifications.redact_token(str(e), bot_token)}")
         return False
 
 def send_trade_alert(trade_action, trade_data, additional_message=""):
@@ -1019,6 +1129,7 @@ Please review and adjust strategy if needed."""
     
     return send_telegram_message(message)
 
+@alerts.cycle("Target/Stoploss Check")
 def check_target_stoploss_alerts():
     """Check all active trades for target/stoploss alerts."""
     trades = load_trades()
@@ -1062,7 +1173,7 @@ def check_target_stoploss_alerts():
                 trade['status'] = 'Target'
                 trade['final_pnl'] = pnl
                 trade['closed_date'] = datetime.now().isoformat()
-                send_trade_alert("target_hit", trade, f"{pnl:.2f}")
+                alerts.emit(alerts.TARGET_HIT, trade['id'], pnl, started=trade.get('start_time'))
                 alerts_sent += 1
             
             # Check for stoploss hit  
@@ -1070,7 +1181,7 @@ def check_target_stoploss_alerts():
                 trade['status'] = 'Stoploss'
                 trade['final_pnl'] = pnl
                 trade['closed_date'] = datetime.now().isoformat()
-                send_trade_alert("stoploss_hit", trade, f"{pnl:.2f}")
+                alerts.emit(alerts.STOPLOSS_HIT, trade['id'], pnl, started=trade.get('start_time'))
                 alerts_sent += 1
     
     # Save any status changes
@@ -1079,202 +1190,136 @@ def check_target_stoploss_alerts():
     
     return alerts_sent
 
-def generate_payoff_chart(strategies_df, lot_size, current_price, instrument_name, zone_label, expiry_label):
-    """Generate a clean enterprise-style payoff diagram with professional styling."""
-    # Price range for payoff calculation
-    price_range = np.linspace(current_price * 0.85, current_price * 1.15, 300)
-    
-    strategy = strategies_df.iloc[0]
-    ce_strike, pe_strike, premium = strategy['CE_Strike'], strategy['PE_Strike'], strategy['Combined_Premium']
-    
-    # Calculate payoff for short straddle/strangle with max loss limit
-    pnl = (premium - np.maximum(price_range - ce_strike, 0) - np.maximum(pe_strike - price_range, 0)) * lot_size
-    
-    # Limit maximum loss to -15000
-    pnl = np.maximum(pnl, -15000)
-    
-    # Calculate max profit and breakeven points
-    max_profit = premium * lot_size
-    be_lower = pe_strike - premium
-    be_upper = ce_strike + premium
-    
-    # Create clean enterprise chart with expanded size for external text
-    plt.style.use('default')
-    fig, ax = plt.subplots(figsize=(16, 9), facecolor='white')
-    ax.set_facecolor('white')
-    
-    # Adjust subplot to make room for external text
-    plt.subplots_adjust(right=0.75)
-    
-    # Plot payoff line with thinner line styling
-    ax.plot(price_range, pnl, color='#2563eb', linewidth=2, label='Payoff Curve', alpha=0.9)
-    
-    # Fill profit/loss areas with clean colors
-    ax.fill_between(price_range, pnl, 0, where=(pnl >= 0), 
-                    color='#16a34a', alpha=0.2, label='Profit Zone', interpolate=True)
-    ax.fill_between(price_range, pnl, 0, where=(pnl < 0), 
-                    color='#dc2626', alpha=0.2, label='Loss Zone', interpolate=True)
-    
-    # Add breakeven lines with thinner styling
-    ax.axvline(x=be_lower, color='#f59e0b', linestyle='--', alpha=0.8, linewidth=1.5,
-               label=f'Lower BE: {be_lower:.0f}')
-    ax.axvline(x=be_upper, color='#f59e0b', linestyle='--', alpha=0.8, linewidth=1.5,
-               label=f'Upper BE: {be_upper:.0f}')
-    
-    # Add current price line with thinner styling
-    ax.axvline(x=current_price, color='#1e293b', linestyle='-', alpha=0.9, linewidth=2,
-               label=f'Current: {current_price:.0f}')
-    
-    # Zero line
-    ax.axhline(y=0, color='#64748b', linestyle='-', alpha=0.4, linewidth=1)
-    
-    # Highlight max profit point with better positioning
-    mid_point = (pe_strike + ce_strike) / 2
-    ax.scatter([mid_point], [max_profit], color='#16a34a', s=100, zorder=5, 
-              edgecolor='white', linewidth=2)
-    
-    # Position annotation to avoid overlap - adjust based on chart position
-    annotation_offset_y = 20 if max_profit > 0 else -30
-    ax.annotate(f'₹{max_profit:.0f}', 
-               xy=(mid_point, max_profit), xytext=(0, annotation_offset_y),
-               textcoords='offset points', color='#16a34a', fontweight='bold',
-               fontsize=10, ha='center', va='center',
-               arrowprops=dict(arrowstyle='->', color='#16a34a', alpha=0.7, lw=1.5),
-               bbox=dict(boxstyle='round,pad=0.3', facecolor='white', 
-                        edgecolor='#16a34a', alpha=0.9, linewidth=1))
-    
-    # Professional title and labels - centered
-    ax.set_title(f'{instrument_name} Payoff Analysis - {expiry_label}', 
-                fontsize=16, fontweight='bold', color='#1e293b', pad=20)
-    ax.set_xlabel('Price at Expiry (₹)', fontsize=12, color='#374151', fontweight='600')
-    ax.set_ylabel('Profit/Loss (₹)', fontsize=12, color='#374151', fontweight='600')
-    
-    # Clean grid
-    ax.grid(True, alpha=0.3, linestyle='-', color='#e5e7eb', linewidth=0.8)
-    ax.set_axisbelow(True)
-    
-    # Calculate auto-adjusted Y-axis limits based on data
-    min_pnl = min(pnl)
-    max_pnl = max(pnl)
-    y_margin = max(abs(min_pnl), abs(max_pnl)) * 0.1  # 10% margin
-    y_min = min_pnl - y_margin
-    y_max = max_pnl + y_margin
-    
-    # Set auto-adjusted Y-axis limits
-    ax.set_ylim(y_min, y_max)
-    
-    # Auto-adjust X-axis for better view
-    x_margin = (current_price * 0.15 - current_price * 0.85) * 0.05  # 5% margin
-    ax.set_xlim(current_price * 0.85 - x_margin, current_price * 1.15 + x_margin)
-    
-    # Professional title and labels - with better spacing
-    ax.set_title(f'{instrument_name} Payoff Analysis - {expiry_label}', 
-                fontsize=16, fontweight='bold', color='#1e293b', pad=30)
-    ax.set_xlabel('Price at Expiry (₹)', fontsize=12, color='#374151', fontweight='600')
-    ax.set_ylabel('Profit/Loss (₹)', fontsize=12, color='#374151', fontweight='600')
-    
-    # Clean grid
-    ax.grid(True, alpha=0.3, linestyle='-', color='#e5e7eb', linewidth=0.8)
-    ax.set_axisbelow(True)
-    
-    # Style legend with better positioning - move to upper left to avoid overlap
-    legend = ax.legend(loc='upper left', fancybox=True, shadow=False, 
-                      frameon=True, facecolor='white', edgecolor='#e5e7eb',
-                      fontsize=10, framealpha=0.95)
-    legend.get_frame().set_linewidth(1)
-    for text in legend.get_texts():
-        text.set_color('#374151')
-    
-    # Clean tick styling
-    ax.tick_params(colors='#6b7280', which='both', labelsize=10)
-    for spine in ax.spines.values():
-        spine.set_color('#d1d5db')
-        spine.set_linewidth(1)
-    
-    # Improved statistics box positioning - move to upper right, outside plot area
-    stats_text = f'''Max Profit: ₹{max_profit:.0f}
-Breakeven: {be_lower:.0f} - {be_upper:.0f}
-Max Loss: ₹{min_pnl:.0f}'''
-    
-    ax.text(1.02, 0.98, stats_text, transform=ax.transAxes, fontsize=10, ha='left',
-            verticalalignment='top', fontfamily='monospace',
-            bbox=dict(boxstyle='round,pad=0.5', facecolor='#f8fafc', 
-                     alpha=0.95, edgecolor='#e2e8f0', linewidth=1),
-            color='#334155')
-    
-    # Move FiFTO branding to bottom right, outside plot area
-    ax.text(1.02, 0.02, "FiFTO Analytics", transform=ax.transAxes, ha='left', va='bottom',
-            fontsize=10, color='#16a34a', fontweight='bold', alpha=0.8)
-    
-    # Save chart with expanded bbox to include external text
-    filename = f"payoff_{uuid.uuid4().hex}.png"
-    filepath = os.path.join(STATIC_FOLDER_PATH, filename)
-    plt.tight_layout()
-    plt.savefig(filepath, dpi=150, bbox_inches='tight', facecolor='white', 
-                edgecolor='none', pad_inches=0.5)
-    plt.close(fig)
-    
-    return f'static/{filename}'  # Return the relative path for web access
-
-def generate_analysis(instrument_name, calculation_type, selected_expiry_str):
-    # Create a debug log file
-    debug_file = r"C:\Users\manir\Desktop\debug_log.txt"
-    
-    def debug_log(message):
-        with open(debug_file, 'a', encoding='utf-8') as f:
-            from datetime import datetime
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            f.write(f"[{timestamp}] UTILS: {message}\n")
-        print(f"UTILS: {message}")  # Also print to console
-    
-    debug_log(f"=== generate_analysis() called ===")
-    debug_log(f"Parameters: instrument={instrument_name}, calc_type={calculation_type}, expiry={selected_expiry_str}")
+def payoff_chart_data(strategies_df, lot_size, current_price, expiry=None):
+    """Payoff series of the first strategy row, drawn by the payoff PNG and by the browser chart."""
+    legs = payoff.analysis_legs(strategies_df.iloc[:1], lot_size, expiry)
+    payoff_data = payoff.compute_payoff(legs, current_price, expiry)
+    has_today = len(payoff_data['days_to_expiry']) > 1
+    return {
+        'current_price': float(current_price),
+        'prices': payoff_data['prices'],
+        'expiry_pnl': payoff_data['expiry_pnl'],
+        'today_pnl': payoff_data['surface'][0] if has_today else None,
+        'today_dte': payoff_data['days_to_expiry'][0],
+        'max_profit': payoff_data['max_profit'],
+        'breakevens': payoff_data['breakevens'],
+        'max_profit_range': payoff_data['max_profit_range'],
+    }
+
+def _summary_chart_payload(analysis_data):
+    return {
+        'instrument': analysis_data['instrument'],
+        'expiry_label': datetime.strptime(analysis_data['expiry'], '%d-%b-%Y').strftime("%d-%b"),
+        'current_price': analysis_data['current_price'],
+        'generated': datetime.now().strftime('%d-%b-%Y %H:%M'),
+        'rows': [[row['Entry'], row['CE_Strike'], row['CE_Price'], row['PE_Strike'], row['PE_Price'], row['Target']]
+                 for row in analysis_data['df_data']],
+    }
+
+def _payoff_chart_payload(analysis_data):
+    return {
+        'instrument': analysis_data['instrument'],
+        'expiry_label': datetime.strptime(analysis_data['expiry'], '%d-%b-%Y').strftime("%d-%b"),
+        **analysis_data['payoff'],
+    }
+
+def render_analysis_charts(analysis_data, progress=None):
+    """
+    Render the summary and payoff PNGs of an analysis to static/charts if it does not
+    have them yet (the analysis page draws the payoff in the browser instead).
+    Fills in analysis_data['summary_file'] and ['payoff_file'] and returns analysis_data.
+    """
+    report = progress or (lambda stage, percent: None)
+    if not analysis_data.get('summary_file'):
+        report('summary_chart', 70)
+        analysis_data['summary_file'] = chart_store.get_or_render('summary', _summary_chart_payload(analysis_data))
+    if not analysis_data.get('payoff_file'):
+        report('payoff_chart', 85)
+        analysis_data['payoff_file'] = chart_store.get_or_render('payoff', _payoff_chart_payload(analysis_data))
+    return analysis_data
+
+def analysis_chart_buffers(analysis_data):
+    """The summary and payoff PNGs of an analysis as in-memory buffers, e.g. for a Telegram upload."""
+    name = f"{analysis_data['instrument']}_{analysis_data['expiry']}"
+    return [render_service.render_buffer('summary', _summary_chart_payload(analysis_data), f"summary_{name}.png"),
+            render_service.render_buffer('payoff', _payoff_chart_payload(analysis_data), f"payoff_{name}.png")]
+
+def generate_analysis(instrument_name, calculation_type, selected_expiry_str, zones=None, option_chain_data=None,
+                      selection=None, progress=None, render_charts=True):
+    """
+    Build the strike table and payoff data for one instrument/expiry, plus the summary
+    and payoff PNGs unless `render_charts` is False (the web page draws them from JSON;
+    render_analysis_charts() can add the PNGs later).
+    `zones` (supply, demand) and `option_chain_data` can be passed in when they were
+    already fetched, e.g. by analyzer.batch; otherwise they are fetched here.
+    `selection` overrides strike_selection.DEFAULT_SELECTION (ladder depth, ranking rules).
+    `progress(stage, percent)` is called as each stage starts, e.g. by analyzer.jobs.
+    """
+    report = progress or (lambda stage, percent: None)
+    logger.debug(f"=== generate_analysis() called ===")
+    logger.debug(f"Parameters: instrument={instrument_name}, calc_type={calculation_type}, expiry={selected_expiry_str}")
     
     TICKERS = {"NIFTY": "^NSEI", "BANKNIFTY": "^NSEBANK"}
     if not all([instrument_name, calculation_type, selected_expiry_str]):
-        debug_log("❌ Missing required parameters")
+        logger.debug("❌ Missing required parameters")
         return None, "Please select valid inputs."
 
     ticker_symbol = TICKERS[instrument_name]
-    debug_log(f"Using ticker symbol: {ticker_symbol}")
+    logger.debug(f"Using ticker symbol: {ticker_symbol}")
     
     lot_size = get_lot_size(instrument_name)
     strike_increment = 50 if instrument_name == "NIFTY" else 100
     
     # Calculate weekly supply/demand zones using the original logic
-    debug_log(f"📊 Calculating {calculation_type} supply/demand zones...")
-    supply_zone, demand_zone = calculate_weekly_zones(instrument_name, calculation_type)
+    report('zones', 10)
+    if zones is not None:
+        supply_zone, demand_zone = zones
+    else:
+        logger.debug(f"📊 Calculating {calculation_type} supply/demand zones...")
+        supply_zone, demand_zone = calculate_weekly_zones(instrument_name, calculation_type)
     
     if supply_zone is not None and demand_zone is not None:
-        debug_log(f"✅ Zones calculated - Supply: ₹{supply_zone}, Demand: ₹{demand_zone}")
+        logger.debug(f"✅ Zones calculated - Supply: ₹{supply_zone}, Demand: ₹{demand_zone}")
     else:
-        debug_log("❌ Failed to calculate zones, using fallback method")
+        logger.debug("❌ Failed to calculate zones, using fallback method")
         supply_zone = None
         demand_zone = None
     
     zone_label = calculation_type
     
     # Single option chain fetch - on-demand only when analysis is requested for specific expiry
-    print(f"📡 Fetching option chain data for {instrument_name} expiry {selected_expiry_str}...")
-    try:
-        # Fetch option chain for the specific expiry date being analyzed
-        option_chain_data = get_option_chain_data(instrument_name, expiry_date=selected_expiry_str)
-        if option_chain_data:
-            print(f"✅ Option chain data fetched successfully for {selected_expiry_str}")
-            debug_log(f"✅ Option chain fetch successful for expiry {selected_expiry_str}")
-        else:
-            print(f"❌ Option chain data is None for {selected_expiry_str}")
-    except Exception as e:
-        print(f"❌ Exception fetching option chain for {selected_expiry_str}: {e}")
-        return None, f"Error fetching option chain: {e}"
-    
+    report('option_chain', 35)
+    if option_chain_data is None:
+        logger.info(f"📡 Fetching option chain data for {instrument_name} expiry {selected_expiry_str}...")
+        try:
+            # Fetch option chain for the specific expiry date being analyzed
+            option_chain_data = get_option_chain_data(instrument_name, expiry_date=selected_expiry_str)
+            if option_chain_data:
+                logger.info(f"✅ Option chain data fetched successfully for {selected_expiry_str}")
+                logger.debug(f"✅ Option chain fetch successful for expiry {selected_expiry_str}")
+            else:
+                logger.error(f"❌ Option chain data is None for {selected_expiry_str}")
+        except Exception as e:
+            logger.error(f"❌ Exception fetching option chain for {selected_expiry_str}: {e}")
+            return None, f"Error fetching option chain: {e}"
+    
+    cache_key = analysis_cache.fingerprint(instrument_name, calculation_type, selected_expiry_str,
+                                           (supply_zone, demand_zone), option_chain_data, lot_size, selection)
+    cached = analysis_cache.analysis_cache.get(cache_key)
+    if cached is not None:
+        logger.info(f"📋 Reusing cached {calculation_type} analysis for {instrument_name} {selected_expiry_str}")
+        if render_charts:
+            render_analysis_charts(cached[0], report)
+        report('done', 100)
+        return cached
+
     if not option_chain_data:
-        print("❌ No option chain data available - using sample data for testing")
+        logger.error("❌ No option chain data available - using sample data for testing")
         # Use sample data for testing when API fails
         current_price = 24750 if instrument_name == "NIFTY" else 51500
         ce_prices = {24800: 45.5, 24850: 35.2, 24900: 26.8}
         pe_prices = {24700: 42.3, 24650: 33.1, 24600: 25.7}
-        debug_log("🔄 Using sample data due to API unavailability")
+        logger.debug("🔄 Using sample data due to API unavailability")
     else:
         try:
             # Try different possible structures for underlying value
@@ -1287,11 +1332,11 @@ def generate_analysis(instrument_name, calculation_type, selected_expiry_str):
             else:
                 # Fallback to current market price
                 current_price = get_current_market_price(instrument_name) or (24750 if instrument_name == "NIFTY" else 51500)
-                debug_log(f"⚠️ Could not find underlying value in option chain data, using fallback: {current_price}")
+                logger.debug(f"⚠️ Could not find underlying value in option chain data, using fallback: {current_price}")
         except Exception as e:
-            debug_log(f"❌ Error reading underlying value: {e}")
+            logger.debug(f"❌ Error reading underlying value: {e}")
             current_price = get_current_market_price(instrument_name) or (24750 if instrument_name == "NIFTY" else 51500)
-            debug_log(f"🔄 Using fallback current price: {current_price}")
+            logger.debug(f"🔄 Using fallback current price: {current_price}")
     expiry_label = datetime.strptime(selected_expiry_str, '%d-%b-%Y').strftime("%d-%b")
     
     # This part of the code is crucial for the final analysis data.
@@ -1304,7 +1349,7 @@ def generate_analysis(instrument_name, calculation_type, selected_expiry_str):
         # Get current price from the chain data
         if 'data' in option_chain_data and 'last_price' in option_chain_data['data']:
             current_price = option_chain_data['data']['last_price']
-            debug_log(f"📊 Updated current price from option chain: {current_price}")
+            logger.debug(f"📊 Updated current price from option chain: {current_price}")
         
         # Extract option data from DhanHQ structure
         if 'data' in option_chain_data and 'oc' in option_chain_data['data']:
@@ -1324,7 +1369,7 @@ def generate_analysis(instrument_name, calculation_type, selected_expiry_str):
                 except (ValueError, KeyError) as e:
                     continue
                     
-            debug_log(f"📊 DhanHQ API data - CE: {len(ce_prices)}, PE: {len(pe_prices)} strikes")
+            logger.debug(f"📊 DhanHQ API data - CE: {len(ce_prices)}, PE: {len(pe_prices)} strikes")
         else:
             # Fallback: try old NSE structure if DhanHQ structure not found
             if 'records' in option_chain_data and 'data' in option_chain_data['records']:
@@ -1332,60 +1377,26 @@ def generate_analysis(instrument_name, calculation_type, selected_expiry_str):
                     if item.get("expiryDate") == selected_expiry_str:
                         if item.get("CE"): ce_prices[item['strikePrice']] = item["CE"]["lastPrice"]
                         if item.get("PE"): pe_prices[item['strikePrice']] = item["PE"]["lastPrice"]
-                debug_log(f"📊 Fallback NSE data - CE: {len(ce_prices)}, PE: {len(pe_prices)} strikes")
+                logger.debug(f"📊 Fallback NSE data - CE: {len(ce_prices)}, PE: {len(pe_prices)} strikes")
+    
+    # Strike selection over the normalized chain arrays (defaults reproduce the exact FifSel.py picks)
+    chain = greeks.normalize_chain(option_chain_data, selected_expiry_str) if option_chain_data else None
+    if chain is None:
+        chain = strike_selection.chain_from_prices(ce_prices, pe_prices, current_price)
     
-    # Zone-based strike selection (using supply/demand zones) - exact FifSel.py logic
     if supply_zone is not None and demand_zone is not None:
-        debug_log("📊 Using zone-based strike selection")
-        
-        # CE strikes based on supply zone (resistance) - exact FifSel.py logic
-        ce_high = math.ceil(supply_zone / strike_increment) * strike_increment
-        strikes_ce = [ce_high, ce_high + strike_increment, ce_high + (2 * strike_increment)]
-        
-        # PE strikes based on demand zone (support) - exact FifSel.py logic
-        pe_high = math.floor(demand_zone / strike_increment) * strike_increment
-        
-        # Select best PE strikes below demand zone with highest premiums - exact FifSel.py logic
-        candidate_puts = sorted([s for s in pe_prices if s < pe_high and pe_prices.get(s, 0) > 0], 
-                               key=lambda s: pe_prices.get(s, 0), reverse=True)
-        
-        # Exact FifSel.py PE strike selection logic
-        pe_mid = (candidate_puts[0] if candidate_puts else pe_high - strike_increment)
-        pe_high = math.floor(demand_zone / strike_increment) * strike_increment
-        
-        # Select best PE strikes below demand zone with highest premiums - exact FifSel.py logic
-        candidate_puts = sorted([s for s in pe_prices if s < pe_high and pe_prices.get(s, 0) > 0], 
-                               key=lambda s: pe_prices.get(s, 0), reverse=True)
-        
-        # Exact FifSel.py PE strike selection logic
-        pe_mid = (candidate_puts[0] if candidate_puts else pe_high - strike_increment)
-        pe_low = (candidate_puts[1] if len(candidate_puts) > 1 else (candidate_puts[0] if candidate_puts else pe_high - strike_increment) - strike_increment)
-        strikes_pe = [pe_high, pe_mid, pe_low]
-        
-        debug_log(f"📊 Zone-based strikes:")
-        debug_log(f"   CE strikes (from supply ₹{supply_zone}): {strikes_ce}")
-        debug_log(f"   PE strikes (from demand ₹{demand_zone}): {strikes_pe}")
-        
+        logger.debug("📊 Using zone-based strike selection")
+        upper, lower = supply_zone, demand_zone
     else:
-        debug_log("📊 Using fallback current price-based strike selection")
-        
-        # Fallback to current price-based selection - exact FifSel.py logic
-        ce_high = math.ceil(current_price / strike_increment) * strike_increment
-        strikes_ce = [ce_high, ce_high + strike_increment, ce_high + (2 * strike_increment)]
-        pe_high = math.floor(current_price / strike_increment) * strike_increment
-        candidate_puts = sorted([s for s in pe_prices if s < pe_high and pe_prices.get(s, 0) > 0], 
-                               key=lambda s: pe_prices.get(s, 0), reverse=True)
-        pe_mid = (candidate_puts[0] if candidate_puts else pe_high - strike_increment)
-        pe_low = (candidate_puts[1] if len(candidate_puts) > 1 else pe_mid - strike_increment)
-        strikes_pe = [pe_high, pe_mid, pe_low]
+        logger.debug("📊 Using fallback current price-based strike selection")
+        upper = lower = current_price
+    
     # Create DataFrame with exact FifSel.py structure and logic
-    df = pd.DataFrame({
-        "Entry": ["High Reward", "Mid Reward", "Low Reward"], 
-        "CE_Strike": strikes_ce, 
-        "CE_Price": [ce_prices.get(s, 0.0) for s in strikes_ce], 
-        "PE_Strike": strikes_pe, 
-        "PE_Price": [pe_prices.get(s, 0.0) for s in strikes_pe]
-    })
+    report('strikes', 60)
+    df = strike_selection.select_strikes(chain, upper, lower, strike_increment, selection)
+    logger.debug(f"📊 Selected strikes:")
+    logger.debug(f"   CE strikes (from ₹{upper}): {df['CE_Strike'].tolist()}")
+    logger.debug(f"   PE strikes (from ₹{lower}): {df['PE_Strike'].tolist()}")
     df["Combined_Premium"] = df["CE_Price"] + df["PE_Price"]
     
     # Calculate target and stoploss - exact FifSel.py logic (80% of premium for both Target and Stoploss)
@@ -1397,102 +1408,13 @@ def generate_analysis(instrument_name, calculation_type, selected_expiry_str):
     display_df['Target_SL'] = df['Target']
     
     # Debug: Log the DataFrame data
-    debug_log(f"📊 DataFrame created with shape: {df.shape}")
-    debug_log(f"📊 Display DataFrame: \n{display_df.to_string()}")
-    debug_log(f"📊 CE Prices found: {len(ce_prices)} items")
-    debug_log(f"📊 PE Prices found: {len(pe_prices)} items")
-    
-    title, zone_label = f"FiFTO - {calculation_type} {instrument_name} Selling", calculation_type
-    summary_filename = f"summary_{uuid.uuid4().hex}.png"
-    summary_filepath = os.path.join(STATIC_FOLDER_PATH, summary_filename)
-    
-    # Create clean enterprise-style analysis chart
-    plt.style.use('default')  # Use clean default style
-    fig, ax = plt.subplots(figsize=(12, 8))
-    fig.patch.set_facecolor('white')
-    ax.axis('off')
-    
-    # Professional title with global theme styling
-    fig.suptitle(f'{instrument_name} Options Analysis - {expiry_label}', 
-                fontsize=18, fontweight='bold', y=0.94, color='#1e293b', ha='center')
-    
-    # Enhanced info box with global theme styling
-    info_text = f"{instrument_name}: ₹{current_price}\nExpiry: {expiry_label}\nGenerated: {datetime.now().strftime('%d-%b-%Y %H:%M')}"
-    ax.text(0.5, 0.85, info_text, transform=ax.transAxes, ha='center', va='center', 
-            fontsize=12, fontfamily='monospace', color='#1e293b', fontweight='600',
-            bbox=dict(boxstyle='round,pad=0.8', facecolor='#f1f5f9', 
-                     edgecolor='#2563eb', linewidth=1.5, alpha=0.95))
-    
-    # Create professional table with global UI styling
-    table = plt.table(cellText=display_df.values, 
-                     colLabels=['Entry', 'CE Strike', 'CE Price', 'PE Strike', 'PE Price', 'Target/SL'],
-                     colColours=['#2563eb'] * len(display_df.columns),  # Professional blue header
-                     cellLoc='center', 
-                     loc='center',
-                     bbox=[0.05, 0.25, 0.9, 0.45])
-    
-    # Style the table to match global UI theme
-    table.auto_set_font_size(False)
-    table.set_fontsize(10)
-    table.scale(1, 2.5)  # Better row height
-    
-    # Header styling - matching Bootstrap primary theme
-    for col in range(len(display_df.columns)):
-        cell = table[(0, col)]
-        cell.get_text().set_color('white')
-        cell.get_text().set_fontweight('bold')
-        cell.set_facecolor('#2563eb')  # Professional blue matching our theme
-        cell.set_text_props(fontsize=11)
-        cell.set_edgecolor('#1d4ed8')  # Darker blue border
-        cell.set_linewidth(1.5)
-    
-    # Data cell styling with clean alternating colors matching global theme
-    for row in range(1, len(display_df) + 1):
-        for col in range(len(display_df.columns)):
-            cell = table[(row, col)]
-            # Match our global clean card colors
-            if row % 2 == 0:
-                cell.set_facecolor('#f8fafc')  # Light gray-blue like our cards
-            else:
-                cell.set_facecolor('#ffffff')  # Pure white
-            
-            # Text styling matching global theme
-            cell.get_text().set_color('#1e293b')  # Dark text matching our headings
-            cell.get_text().set_fontweight('600')  # Semi-bold like our table data
-            cell.set_edgecolor('#e2e8f0')  # Light border matching our cards
-            cell.set_linewidth(1)
-            
-            # Add special styling for numeric columns (prices and targets)
-            if col in [2, 4, 5]:  # Price and Target columns
-                cell.get_text().set_fontfamily('monospace')  # Monospace for numbers
-                cell.get_text().set_fontweight('bold')
-                if col == 5:  # Target/SL column - format as integer since rounded to 50
-                    cell.get_text().set_color('#16a34a')  # Green for target amounts
-                    # Format target values as integers since they're rounded to 50
-                    current_text = cell.get_text().get_text()
-                    if current_text and current_text.replace('.', '').isdigit():
-                        cell.get_text().set_text(f"₹{int(float(current_text))}")
-    
-    # Enhanced footer with global theme styling
-    footer_text = f"Risk Management: 1:1 Target/SL Ratio"
-    ax.text(0.5, 0.15, footer_text, transform=ax.transAxes, ha='center', va='center',
-            fontsize=12, fontweight='bold', color='#16a34a',
-            bbox=dict(boxstyle='round,pad=0.4', facecolor='#f0fdf4', 
-                     edgecolor='#16a34a', alpha=0.8, linewidth=1))
-    
-    # Clean disclaimer with global theme
-    ax.text(0.5, 0.06, "For educational purposes only", 
-            transform=ax.transAxes, ha='center', va='center',
-            fontsize=9, color='#64748b', style='italic')
-    
-    # Centered FiFTO branding with enhanced styling
-    ax.text(0.5, 0.02, "FiFTO Analytics", transform=ax.transAxes, ha='center', va='center',
-            fontsize=11, color='#16a34a', fontweight='bold', alpha=0.9)
-    
-    plt.savefig(summary_filepath, dpi=150, bbox_inches='tight', facecolor='white', 
-                edgecolor='none', pad_inches=0.3)
-    plt.close(fig)
-    payoff_filepath = generate_payoff_chart(df, lot_size, current_price, instrument_name, zone_label, expiry_label)
+    logger.debug(f"📊 DataFrame created with shape: {df.shape}")
+    logger.debug(f"📊 Display DataFrame: \n{display_df.to_string()}")
+    logger.debug(f"📊 CE Prices found: {len(ce_prices)} items")
+    logger.debug(f"📊 PE Prices found: {len(pe_prices)} items")
+    
+    report('payoff', 70)
+    payoff_data = payoff_chart_data(df, lot_size, current_price, selected_expiry_str)
     
     # Create enhanced HTML table for web display
     table_html = f"""
@@ -1534,45 +1456,51 @@ def generate_analysis(instrument_name, calculation_type, selected_expiry_str):
         "expiry": selected_expiry_str, 
         "lot_size": lot_size, 
         "df_data": df.to_dict('records'), 
-        "summary_file": f'static/{summary_filename}', 
-        "payoff_file": payoff_filepath, 
+        "current_price": float(current_price),
+        "payoff": payoff_data,
+        "summary_file": None,
+        "payoff_file": None,
         "display_df_html": table_html,
         "supply_zone": supply_zone,
         "demand_zone": demand_zone,
         "zone_based": supply_zone is not None and demand_zone is not None
     }
     
-    debug_log(f"✅ Analysis completed successfully for {instrument_name}")
-    debug_log(f"Generated files: {summary_filename}, {payoff_filepath}")
+    if render_charts:
+        render_analysis_charts(analysis_data, report)
+
+    logger.debug(f"✅ Analysis completed successfully for {instrument_name}")
+    logger.debug(f"Generated files: {analysis_data['summary_file']}, {analysis_data['payoff_file']}")
     
     # Create status message based on whether zones were used
     if supply_zone is not None and demand_zone is not None:
         status_message = f"✅ {calculation_type} analysis completed with supply/demand zones (Supply: ₹{supply_zone:.0f}, Demand: ₹{demand_zone:.0f})"
     else:
         status_message = f"✅ {calculation_type} analysis completed with price-based strike selection"
-    
+
+    analysis_cache.analysis_cache.put(cache_key, calculation_type, analysis_data, status_message)
     return analysis_data, status_message
 
 # --- Trade Action Functions ---
 def add_to_analysis(analysis_data):
-    print("🔍 ADD_TO_ANALYSIS DEBUG START")
-    print(f"📊 Analysis data received: {analysis_data is not None}")
+    logger.debug("🔍 ADD_TO_ANALYSIS DEBUG START")
+    logger.debug(f"📊 Analysis data received: {analysis_data is not None}")
     
     if not analysis_data or not analysis_data.get('df_data'): 
-        print("❌ No analysis data or df_data")
+        logger.error("❌ No analysis data or df_data")
         return "Generate an analysis first."
     
-    print(f"📈 df_data entries: {len(analysis_data.get('df_data', []))}")
-    print(f"📋 Sample df_data: {analysis_data.get('df_data', [])[:1]}")
+    logger.info(f"📈 df_data entries: {len(analysis_data.get('df_data', []))}")
+    logger.debug(f"📋 Sample df_data: {analysis_data.get('df_data', [])[:1]}")
     
     trades = load_trades()
-    print(f"📊 Existing trades: {len(trades)}")
+    logger.debug(f"📊 Existing trades: {len(trades)}")
     
     # Show existing trade IDs for debugging
     if trades:
-        print("🔍 Existing trade IDs:")
+        logger.debug("🔍 Existing trade IDs:")
         for trade in trades:
-            print(f"   - {trade.get('id', 'NO_ID')}")
+            logger.debug(f"   - {trade.get('id', 'NO_ID')}")
     
     new_trades_added = 0
     start_time = datetime.now().strftime("%Y-%m-%d %H:%M")
@@ -1582,35 +1510,35 @@ def add_to_analysis(analysis_data):
     # Add timestamp to make trade IDs more unique
     timestamp_suffix = datetime.now().strftime("%H%M")
     
-    print(f"🏷️ Entry tag: {entry_tag}")
-    print(f"⏰ Timestamp suffix: {timestamp_suffix}")
+    logger.info(f"🏷️ Entry tag: {entry_tag}")
+    logger.info(f"⏰ Timestamp suffix: {timestamp_suffix}")
     
     for i, entry in enumerate(analysis_data['df_data']):
-        print(f"\n🔄 Processing entry {i+1}: {entry}")
+        logger.info(f"\n🔄 Processing entry {i+1}: {entry}")
         
         # Check if the entry has the required fields
         if 'Entry' not in entry:
-            print(f"❌ Missing 'Entry' field in entry: {entry}")
+            logger.error(f"❌ Missing 'Entry' field in entry: {entry}")
             continue
             
         # Generate more unique trade ID with timestamp
         base_id = f"{analysis_data['instrument']}_{analysis_data['expiry']}_{entry['Entry'].replace(' ', '')}"
         trade_id = f"{base_id}_{timestamp_suffix}"
-        print(f"🆔 Generated trade ID: {trade_id}")
+        logger.info(f"🆔 Generated trade ID: {trade_id}")
         
         # Check for duplicates
         existing_trade = any(t['id'] == trade_id for t in trades)
-        print(f"🔍 Duplicate check: {existing_trade}")
+        logger.debug(f"🔍 Duplicate check: {existing_trade}")
         
         if existing_trade: 
-            print(f"⚠️ Skipping duplicate trade: {trade_id}")
+            logger.warning(f"⚠️ Skipping duplicate trade: {trade_id}")
             # Try without timestamp for backward compatibility
             fallback_id = base_id
             if not any(t['id'] == fallback_id for t in trades):
                 trade_id = fallback_id
-                print(f"🔄 Using fallback ID: {trade_id}")
+                logger.info(f"🔄 Using fallback ID: {trade_id}")
             else:
-                print(f"❌ Both IDs exist, skipping")
+                logger.error(f"❌ Both IDs exist, skipping")
                 continue
             
         # Create trade object
@@ -1629,20 +1557,20 @@ def add_to_analysis(analysis_data):
             "stoploss_amount": entry.get('Stoploss', 0)
         }
         
-        print(f"✅ Adding trade: {new_trade}")
+        logger.info(f"✅ Adding trade: {new_trade}")
         trades.append(new_trade)
         new_trades_added += 1
     
-    print(f"💾 Saving {len(trades)} total trades ({new_trades_added} new)")
+    logger.info(f"💾 Saving {len(trades)} total trades ({new_trades_added} new)")
     save_trades(trades)
     
     # Verify the save worked
     saved_trades = load_trades()
-    print(f"✅ Verification: {len(saved_trades)} trades now in file")
+    logger.info(f"✅ Verification: {len(saved_trades)} trades now in file")
     
     result = f"Added {new_trades_added} new trade(s) tagged as '{entry_tag}'."
-    print(f"📝 Result: {result}")
-    print("🔍 ADD_TO_ANALYSIS DEBUG END\n")
+    logger.info(f"📝 Result: {result}")
+    logger.debug("🔍 ADD_TO_ANALYSIS DEBUG END\n")
     
     return result
 
@@ -1660,6 +1588,7 @@ def auto_add_to_portfolio(analysis_data, auto_tag="Auto Generated"):
     
     # Check if any trades from this analysis already exist
     existing_trade_ids = {t['id'] for t in trades}
+    added_ids = []
     
     for entry in analysis_data['df_data']:
         trade_id = f"{analysis_data['instrument']}_{analysis_data['expiry']}_{entry['Entry'].replace(' ', '')}"
@@ -1683,22 +1612,15 @@ def auto_add_to_portfolio(analysis_data, auto_tag="Auto Generated"):
             }
             trades.append(new_trade)
             new_trades_added += 1
+            added_ids.append(trade_id)
     
     if new_trades_added > 0:
         save_trades(trades)
         
-        # Send Telegram notification about auto-added trades
-        notification_message = f"""🤖 *Auto Portfolio Update*
-
-📊 Generated charts automatically added to portfolio:
-- Instrument: {analysis_data['instrument']}
-- Expiry: {analysis_data['expiry']}
-- Trades Added: {new_trades_added}
-- Tag: {auto_tag}
-
-These trades are now being monitored for target/stoploss alerts."""
-        
-        send_telegram_message(notification_message)
+        # Announce the auto-added trades (part of the run's digest when inside an alert cycle)
+        for trade_id in added_ids:
+            alerts.emit(alerts.AUTO_ADDED, trade_id, detail=f"({auto_tag})", source="Auto Portfolio Update",
+                        started=start_time)
         
         return f"✅ Auto-added {new_trades_added} trade(s) to portfolio with tag '{auto_tag}'"
     else:
@@ -1760,15 +1682,18 @@ def close_selected_trade(trade_id_to_close):
     save_trades(all_trades)
 
 def send_daily_chart_to_telegram(analysis_data):
-    summary_path = os.path.join(settings.BASE_DIR, analysis_data['summary_file'])
-    payoff_path = os.path.join(settings.BASE_DIR, analysis_data['payoff_file'])
+    if analysis_data.get('payoff'):
+        images = analysis_chart_buffers(analysis_data)
+    else:  # Analyses from before payoff data was stored only have their image files
+        images = [os.path.join(settings.BASE_DIR, analysis_data['summary_file']),
+                  os.path.join(settings.BASE_DIR, analysis_data['payoff_file'])]
     day_name = datetime.now().strftime('%A')
     title = f"📊 **{day_name} Selling Summary**"
     message_lines = [title]
     for entry in analysis_data['df_data']:
         amount = entry['Combined Premium'] * analysis_data['lot_size']
         message_lines.append(f"- {entry['Entry']}: ₹{amount:.2f}")
-    return send_telegram_message("\n".join(message_lines), image_paths=[summary_path, payoff_path])
+    return send_telegram_message("\n".join(message_lines), image_paths=images)
     return True
 
 def run_automated_chart_generation():
@@ -1783,7 +1708,7 @@ def run_automated_chart_generation():
     
     # Check if auto-generation is enabled
     if not settings.get('enable_auto_generation', False):
-        print("Auto-generation is disabled")
+        logger.info("Auto-generation is disabled")
         return "Auto-generation is disabled"
     
     # System readiness check
@@ -1792,7 +1717,7 @@ def run_automated_chart_generation():
         required_settings = ['auto_gen_instruments', 'auto_gen_days', 'auto_gen_time']
         for setting in required_settings:
             if not settings.get(setting):
-                print(f"Missing required setting: {setting}")
+                logger.info(f"Missing required setting: {setting}")
                 return f"System not ready: Missing {setting} configuration"
         
         # Get current time in IST timezone
@@ -1812,11 +1737,11 @@ def run_automated_chart_generation():
         else:
             market_status = f"✅ MARKET HOURS: Active trading time - IST Time: {current_time.strftime('%H:%M')}"
         
-        print(market_status)
+        logger.info(market_status)
         # Continue execution regardless of market hours
             
     except Exception as e:
-        print(f"System readiness check failed: {str(e)}")
+        logger.info(f"System readiness check failed: {str(e)}")
         return f"System readiness check failed: {str(e)}"
     
     # Get automation settings
@@ -1830,10 +1755,10 @@ def run_automated_chart_generation():
     today = current_time.strftime('%A').lower()
     if today not in [day.lower() for day in auto_gen_days]:
         day_status = f"📅 NON-SCHEDULED DAY: Today ({today}) is not in scheduled days ({auto_gen_days}) but running anyway"
-        print(day_status)
+        logger.info(day_status)
     else:
         day_status = f"📅 SCHEDULED DAY: Today ({today}) is a scheduled day for auto-generation"
-        print(day_status)
+        logger.info(day_status)
     
     # Enhanced time check with proper scheduling logic (using IST)
     schedule_hour, schedule_minute = map(int, auto_gen_time.split(':'))
@@ -1845,10 +1770,10 @@ def run_automated_chart_generation():
     time_diff = (current_time - scheduled_time).total_seconds() / 60  # minutes
     
     if time_diff < -15:  # More than 15 minutes before scheduled time
-        print(f"Current IST time ({current_time.strftime('%H:%M')}) is before scheduled time ({auto_gen_time}) - waiting...")
+        logger.info(f"Current IST time ({current_time.strftime('%H:%M')}) is before scheduled time ({auto_gen_time}) - waiting...")
         return f"Current IST time ({current_time.strftime('%H:%M')}) is before scheduled time ({auto_gen_time})"
     elif time_diff > 60:  # More than 1 hour after scheduled time
-        print(f"Scheduled time ({auto_gen_time}) has passed by more than 1 hour - skipping for today")
+        logger.info(f"Scheduled time ({auto_gen_time}) has passed by more than 1 hour - skipping for today")
         return f"Scheduled time ({auto_gen_time}) has passed by more than 1 hour - skipping for today"
     
     results = []
@@ -1878,22 +1803,17 @@ def run_automated_chart_generation():
         
         return next_expiry.strftime('%d-%b-%Y')
     
+    jobs = []
     for instrument in auto_gen_instruments:
-        try:
-            calc_type = nifty_calc_type if instrument == 'NIFTY' else banknifty_calc_type
-            expiry = get_next_expiry(calc_type)
-            
-            print(f"🤖 Auto-generating charts for {instrument} {calc_type} expiring {expiry}")
-            
-            # Use the updated chart generation function
-            chart_result = generate_chart_for_instrument(instrument, calc_type)
-            results.append(f"{instrument}: {chart_result}")
-            print(f"Chart generation result: {chart_result}")
-            
-        except Exception as e:
-            error_result = f"❌ {instrument}: Error - {str(e)}"
-            results.append(error_result)
-            print(error_result)
+        calc_type = nifty_calc_type if instrument == 'NIFTY' else banknifty_calc_type
+        logger.info(f"🤖 Auto-generating charts for {instrument} {calc_type} expiring {get_next_expiry(calc_type)}")
+        jobs.append((instrument, calc_type))
+    
+    # All instruments run concurrently, each reporting its own timing
+    if jobs:
+        results = generate_charts_for_instruments(jobs)
+        for chart_result in results:
+            logger.info(f"Chart generation result: {chart_result}")
     
     # Prepare final result with market status notification
     if results:
@@ -1902,9 +1822,9 @@ def run_automated_chart_generation():
         # Send to Telegram if configured
         try:
             send_telegram_message(final_message)
-            print("📱 Results sent to Telegram")
+            logger.info("📱 Results sent to Telegram")
         except Exception as e:
-            print(f"⚠️ Failed to send to Telegram: {str(e)}")
+            logger.warning(f"⚠️ Failed to send to Telegram: {str(e)}")
         
         return final_message
     else:
@@ -1914,12 +1834,21 @@ def run_automated_chart_generation():
 
 # In analyzer/utils.py
 
+# One full monitor pass at a time in this process: scheduled, EOD and LTP probe escalations
+# all load and save active_trades.json (reentrant so a holder can run the pass itself)
+monitor_lock = threading.RLock()
+
 def monitor_trades(is_eod_report=False):
+    with monitor_lock:
+        return _monitor_trades(is_eod_report)
+
+@alerts.cycle("P&L Monitor")
+def _monitor_trades(is_eod_report=False):
     now = datetime.now(pytz.timezone('Asia/Kolkata'))
-    print(f"[{now.strftime('%Y-%m-%d %H:%M:%S')}] Running trade monitoring...")
+    logger.info(f"[{now.strftime('%Y-%m-%d %H:%M:%S')}] Running trade monitoring...")
     trades = load_trades()
     if not trades:
-        print("[*] No active trades to monitor.")
+        logger.info("[*] No active trades to monitor.")
         return
 
     active_trades = [t for t in trades if t.get('status') == 'Running']
@@ -1932,10 +1861,13 @@ def monitor_trades(is_eod_report=False):
 
     pl_data_for_image = {'title': f"Live P/L Update", 'tags': defaultdict(list)}
     any_trade_updated = False
+    chains = {}
+    priced_pnl = {}
 
     for instrument, trades_in_group in instrument_groups.items():
         chain = get_option_chain_data(instrument)
         if not chain: continue
+        chains[instrument] = chain
         lot_size = get_lot_size(instrument)
 
         for trade in trades_in_group:
@@ -1951,32 +1883,48 @@ def monitor_trades(is_eod_report=False):
 
             pnl = (trade['initial_premium'] - (current_ce + current_pe)) * lot_size
             any_trade_updated = True
+            priced_pnl[trade['id']] = pnl
 
             tag_key = trade.get('entry_tag', 'General Trades')
-            pl_data_for_image['tags'][tag_key].append({'reward_type': trade['reward_type'], 'pnl': pnl})
+            pl_data_for_image['tags'][tag_key].append({'id': trade['id'], 'reward_type': trade['reward_type'], 'pnl': pnl,
+                                                       'target_amount': trade.get('target_amount')})
 
             # Check for Target or Stoploss
             if pnl >= trade['target_amount']:
                 trade['status'] = 'Target'
                 trade['final_pnl'] = pnl
                 trade['closed_date'] = datetime.now().isoformat()
-                msg = f"✅ TARGET HIT: {trade['id']} ({tag_key})\nP/L: ₹{pnl:.2f}"
-                print(msg)
-                send_telegram_message(msg)
+                logger.info(f"✅ TARGET HIT: {trade['id']} ({tag_key}) P/L: ₹{pnl:.2f}")
+                alerts.emit(alerts.TARGET_HIT, trade['id'], pnl, f"({tag_key})", started=trade.get('start_time'))
             elif pnl <= -trade['stoploss_amount']:
                 trade['status'] = 'Stoploss'
                 trade['final_pnl'] = pnl
                 trade['closed_date'] = datetime.now().isoformat()
-                msg = f"❌ STOPLOSS HIT: {trade['id']} ({tag_key})\nP/L: ₹{pnl:.2f}"
-                print(msg)
-                send_telegram_message(msg)
+                logger.warning(f"❌ STOPLOSS HIT: {trade['id']} ({tag_key}) P/L: ₹{pnl:.2f}")
+                alerts.emit(alerts.STOPLOSS_HIT, trade['id'], pnl, f"({tag_key})", started=trade.get('start_time'))
+
+    # Refresh book-level Greeks and scenario grid for the risk view
+    if chains:
+        risk.refresh_risk_snapshot(active_trades, chains)
+        # Baseline for the LTP probes that run between full passes
+        ltp_monitor.record_baseline(active_trades, chains, priced_pnl)
 
-    # Send periodic update image to Telegram
+    # Send periodic update image to Telegram, only when some tag's P/L moved meaningfully
     if any_trade_updated and not is_eod_report:
-        image_path = generate_pl_update_image(pl_data_for_image, now)
-        send_telegram_message(message="", image_paths=[image_path])
-        os.remove(image_path)
-        print("[+] Sent P/L update to Telegram.")
+        action, detail = pnl_change_detector.decide(pl_data_for_image['tags'], load_settings(), now)
+        notification_id = None
+        if action == pnl_change.RENDER:
+            image = generate_pl_update_image(pl_data_for_image, now, in_memory=True)
+            status, notification_id = queue_telegram_message(message="", image_paths=[image])
+            logger.info(f"[+] P/L update for {', '.join(detail)}: {status}")
+        elif action == pnl_change.HEARTBEAT:
+            status, notification_id = queue_telegram_message(detail)
+            logger.info(f"[+] P/L heartbeat: {status}")
+        else:
+            logger.info(f"[*] P/L update skipped: {detail}")
+        # The baseline moves once the worker delivers it (see pnl_change.py)
+        if notification_id is not None:
+            pnl_change_detector.mark_queued(action, pl_data_for_image['tags'], notification_id)
 
     # Save any status changes
     save_trades(active_trades + completed_trades)
@@ -1984,7 +1932,7 @@ def monitor_trades(is_eod_report=False):
 def test_specific_automation(automation_config):
     """Test a specific automation configuration."""
     try:
-        print(f"[DEBUG] Testing automation: {automation_config['name']}")
+        logger.debug(f"[DEBUG] Testing automation: {automation_config['name']}")
         
         # Prepare test parameters
         test_instruments = automation_config.get('instruments', [])
@@ -1998,136 +1946,167 @@ def test_specific_automation(automation_config):
         result_messages = []
         
         if 'NIFTY' in test_instruments:
-            print(f"[DEBUG] Generating NIFTY chart with {nifty_calc_type} calculation")
+            logger.debug(f"[DEBUG] Generating NIFTY chart with {nifty_calc_type} calculation")
             nifty_result = generate_chart_for_instrument('NIFTY', nifty_calc_type)
             result_messages.append(f"NIFTY ({nifty_calc_type}): {nifty_result}")
         
         if 'BANKNIFTY' in test_instruments:
-            print(f"[DEBUG] Generating BANKNIFTY chart with {banknifty_calc_type} calculation")
+            logger.debug(f"[DEBUG] Generating BANKNIFTY chart with {banknifty_calc_type} calculation")
             banknifty_result = generate_chart_for_instrument('BANKNIFTY', banknifty_calc_type)
             result_messages.append(f"BANKNIFTY ({banknifty_calc_type}): {banknifty_result}")
         
         final_result = "\n".join(result_messages) if result_messages else "No charts generated"
-        print(f"[DEBUG] Test automation completed: {final_result}")
+        logger.debug(f"[DEBUG] Test automation completed: {final_result}")
         return final_result
         
     except Exception as e:
         error_msg = f"Test automation failed: {str(e)}"
-        print(f"[ERROR] {error_msg}")
+        logger.error(f"[ERROR] {error_msg}")
         return error_msg
 
+def default_expiry_for(calc_type, today=None):
+    """Expiry used by automated chart generation: next Thursday for Weekly, else last Thursday of next month."""
+    today = today or datetime.now()
+    if calc_type == 'Weekly':
+        # Find next Thursday
+        days_ahead = 3 - today.weekday()  # Thursday is 3
+        if days_ahead <= 0:  # Thursday already passed
+            days_ahead += 7
+        next_expiry = today + timedelta(days=days_ahead)
+    else:  # Monthly
+        # Find last Thursday of next month
+        if today.month == 12:
+            next_month = today.replace(year=today.year + 1, month=1, day=1)
+        else:
+            next_month = today.replace(month=today.month + 1, day=1)
+        last_day = (next_month + timedelta(days=31)).replace(day=1) - timedelta(days=1)
+        last_thursday = last_day - timedelta(days=(last_day.weekday() - 3) % 7)
+        next_expiry = last_thursday
+    return next_expiry.strftime('%d-%b-%Y')
+
 def generate_chart_for_instrument(instrument, calc_type):
     """Generate chart for a specific instrument and calculation type."""
     try:
-        print(f"🚀 Starting chart generation for {instrument} with {calc_type} calculation")
+        logger.info(f"🚀 Starting chart generation for {instrument} with {calc_type} calculation")
         
         # Get next expiry date based on calculation type
-        today = datetime.now()
-        if calc_type == 'Weekly':
-            # Find next Thursday
-            days_ahead = 3 - today.weekday()  # Thursday is 3
-            if days_ahead <= 0:  # Thursday already passed
-                days_ahead += 7
-            next_expiry = today + timedelta(days=days_ahead)
-        else:  # Monthly
-            # Find last Thursday of next month
-            if today.month == 12:
-                next_month = today.replace(year=today.year + 1, month=1, day=1)
-            else:
-                next_month = today.replace(month=today.month + 1, day=1)
-            last_day = (next_month + timedelta(days=31)).replace(day=1) - timedelta(days=1)
-            last_thursday = last_day - timedelta(days=(last_day.weekday() - 3) % 7)
-            next_expiry = last_thursday
-        
-        expiry_str = next_expiry.strftime('%d-%b-%Y')
-        print(f"📅 Using expiry date: {expiry_str}")
+        expiry_str = default_expiry_for(calc_type)
+        logger.info(f"📅 Using expiry date: {expiry_str}")
         
         # Call the actual analysis function
         analysis_data, status_message = generate_analysis(instrument, calc_type, expiry_str)
         
         if analysis_data:
-            print(f"✅ Chart generation successful for {instrument}")
+            logger.info(f"✅ Chart generation successful for {instrument}")
             
             # Auto-add to portfolio if enabled
             try:
                 settings = load_settings()
                 if settings.get('auto_portfolio_enabled', False):
                     add_result = add_to_analysis(analysis_data)
-                    print(f"📊 Auto-added to portfolio: {add_result}")
+                    logger.debug(f"📊 Auto-added to portfolio: {add_result}")
             except Exception as e:
-                print(f"⚠️ Failed to auto-add to portfolio: {str(e)}")
+                logger.warning(f"⚠️ Failed to auto-add to portfolio: {str(e)}")
             
             return f"✅ Chart generated successfully for {instrument} ({calc_type}) - {status_message}"
         else:
-            print(f"❌ Chart generation failed for {instrument}: {status_message}")
+            logger.error(f"❌ Chart generation failed for {instrument}: {status_message}")
             return f"❌ Failed to generate chart for {instrument}: {status_message}"
             
     except Exception as e:
         error_msg = f"❌ Chart generation error for {instrument}: {str(e)}"
-        print(error_msg)
+        logger.error(error_msg)
         return error_msg
 
+def schedule_instrument_jobs(schedule):
+    """(instrument, calc_type) pairs a schedule generates charts for."""
+    jobs = []
+    if 'NIFTY' in schedule.get('instruments', []):
+        jobs.append(('NIFTY', schedule.get('nifty_calc_type', 'Weekly')))
+    if 'BANKNIFTY' in schedule.get('instruments', []):
+        jobs.append(('BANKNIFTY', schedule.get('banknifty_calc_type', 'Monthly')))
+    return jobs
+
+def generate_charts_for_instruments(jobs):
+    """
+    Generate charts for several (instrument, calc_type) pairs concurrently, sharing
+    fetches, the DhanHQ rate limits and the render workers (see batch.py).
+    Returns one result line per instrument with its start, finish and duration.
+    """
+    from . import batch
+
+    ist = pytz.timezone('Asia/Kolkata')
+    logger.info(f"🚀 Starting concurrent chart generation for {', '.join(f'{i} ({c})' for i, c in jobs)}")
+    try:
+        batch_result = batch.run_analysis_batch(jobs)
+    except Exception as e:
+        logger.error(f"❌ Concurrent chart generation failed: {str(e)}")
+        return [f"{instrument}: ❌ Chart generation error for {instrument}: {str(e)}" for instrument, _ in jobs]
+
+    auto_portfolio = load_settings().get('auto_portfolio_enabled', False)
+    run_start = batch_result['timings']['started']
+    results = []
+    for result in batch_result['results']:
+        instrument, calc_type, timings = result['instrument'], result['calc_type'], result['timings']
+        if result['analysis_data']:
+            logger.info(f"✅ Chart generation successful for {instrument}")
+            if auto_portfolio:
+                try:
+                    add_result = add_to_analysis(result['analysis_data'])
+                    logger.debug(f"📊 Auto-added to portfolio: {add_result}")
+                except Exception as e:
+                    logger.warning(f"⚠️ Failed to auto-add to portfolio: {str(e)}")
+            line = f"✅ Chart generated successfully for {instrument} ({calc_type}) - {result['status']}"
+        else:
+            logger.error(f"❌ Chart generation failed for {instrument}: {result['status']}")
+            line = f"❌ Failed to generate chart for {instrument}: {result['status']}"
+
+        started = datetime.fromtimestamp(run_start + timings['started_at'], ist)
+        finished = datetime.fromtimestamp(run_start + timings['finished_at'], ist)
+        logger.info(f"⏱️ {instrument}: started {started:%H:%M:%S}, finished {finished:%H:%M:%S} ({timings['duration']:.1f}s)")
+        results.append(f"{instrument}: {line}\n⏱️ {started:%H:%M:%S} → {finished:%H:%M:%S} ({timings['duration']:.1f}s)")
+
+    logger.info(f"⏱️ Chart generation for {len(jobs)} instruments took {batch_result['timings']['total']:.1f}s")
+    return results
+
 def start_permanent_schedule(schedule):
-    """Start a permanent schedule that runs daily until manually turned off."""
+    """Start a permanent schedule that runs daily until manually turned off (see scheduler_service.py)."""
     try:
-        from apscheduler.schedulers.background import BackgroundScheduler
-        import atexit
-        
-        # Create or get the global scheduler
-        if not hasattr(start_permanent_schedule, 'scheduler'):
-            start_permanent_schedule.scheduler = BackgroundScheduler()
-            start_permanent_schedule.scheduler.start()
-            atexit.register(lambda: start_permanent_schedule.scheduler.shutdown())
-        
-        scheduler = start_permanent_schedule.scheduler
-        job_id = f"permanent_schedule_{schedule['id']}"
-        
-        # Remove existing job if any
-        try:
-            scheduler.remove_job(job_id)
-        except:
-            pass
-        
-        # Schedule the job to run daily
-        hour, minute = schedule['time'].split(':')
-        scheduler.add_job(
-            func=run_permanent_schedule,
-            trigger='cron',
-            hour=int(hour),
-            minute=int(minute),
-            id=job_id,
-            args=[schedule],
-            replace_existing=True
-        )
-        
-        print(f"[+] Started permanent schedule '{schedule['name']}' at {schedule['time']} daily")
+        from .scheduler_service import scheduler_service
+
+        scheduler_service.start()
+        if scheduler_service.sync():
+            logger.info(f"[+] Started permanent schedule '{schedule['name']}' at {schedule['time']}")
+        else:
+            logger.info(f"[+] Saved permanent schedule '{schedule['name']}'; the scheduler leader will pick it up")
         return True
         
     except Exception as e:
-        print(f"[ERROR] Failed to start permanent schedule: {str(e)}")
+        logger.error(f"[ERROR] Failed to start permanent schedule: {str(e)}")
         return False
 
 def stop_permanent_schedule(schedule_id):
     """Stop a permanent schedule."""
     try:
-        if hasattr(start_permanent_schedule, 'scheduler'):
-            scheduler = start_permanent_schedule.scheduler
-            job_id = f"permanent_schedule_{schedule_id}"
-            scheduler.remove_job(job_id)
-            print(f"[+] Stopped permanent schedule {schedule_id}")
-            return True
+        from .scheduler_service import scheduler_service
+
+        if scheduler_service.remove(schedule_id):
+            logger.info(f"[+] Stopped permanent schedule {schedule_id}")
+        else:
+            logger.info(f"[+] Stopped permanent schedule {schedule_id}; the scheduler leader will drop its job")
+        return True
     except Exception as e:
-        print(f"[ERROR] Failed to stop permanent schedule {schedule_id}: {str(e)}")
+        logger.error(f"[ERROR] Failed to stop permanent schedule {schedule_id}: {str(e)}")
         return False
 
 def run_permanent_schedule(schedule):
     """Execute a permanent schedule."""
     try:
-        print(f"[+] Running permanent schedule: {schedule['name']}")
+        logger.info(f"[+] Running permanent schedule: {schedule['name']}")
         
         # Check if enabled
         if not schedule.get('enabled', False):
-            print(f"[!] Schedule '{schedule['name']}' is disabled, skipping")
+            logger.warning(f"[!] Schedule '{schedule['name']}' is disabled, skipping")
             return
         
         # Get current time and check market status
@@ -2145,18 +2124,14 @@ def run_permanent_schedule(schedule):
         else:
             market_status = f"✅ MARKET HOURS: Active trading time"
         
-        print(f"Market Status: {market_status}")
+        logger.info(f"Market Status: {market_status}")
         
         # Generate charts for selected instruments
         results = []
         
-        if 'NIFTY' in schedule.get('instruments', []):
-            nifty_result = generate_chart_for_instrument('NIFTY', schedule.get('nifty_calc_type', 'Weekly'))
-            results.append(f"NIFTY: {nifty_result}")
-        
-        if 'BANKNIFTY' in schedule.get('instruments', []):
-            banknifty_result = generate_chart_for_instrument('BANKNIFTY', schedule.get('banknifty_calc_type', 'Monthly'))
-            results.append(f"BANKNIFTY: {banknifty_result}")
+        jobs = schedule_instrument_jobs(schedule)
+        if jobs:
+            results = generate_charts_for_instruments(jobs)
         
         # Update schedule with last run information
         schedule['last_run'] = current_time.isoformat()
@@ -2165,15 +2140,9 @@ def run_permanent_schedule(schedule):
         else:
             schedule['last_result'] = "No instruments selected"
         
-        # Save updated schedule
-        settings = load_settings()
-        multiple_schedules = settings.get('multiple_schedules', [])
-        for i, sched in enumerate(multiple_schedules):
-            if sched.get('id') == schedule.get('id'):
-                multiple_schedules[i] = schedule
-                break
-        settings['multiple_schedules'] = multiple_schedules
-        save_settings(settings)
+        # Record the run outside the settings file
+        from .scheduler_service import scheduler_service
+        scheduler_service.record_run(schedule['id'], schedule['last_run'], schedule['last_result'])
         
         # Send results to Telegram with market status
         if results:
@@ -2183,27 +2152,22 @@ def run_permanent_schedule(schedule):
             message = f"🤖 Automated Schedule Run - {schedule['name']}\n{market_status}\nNo instruments selected for generation"
             send_telegram_message(message)
         
-        print(f"[+] Completed permanent schedule: {schedule['name']}")
+        logger.info(f"[+] Completed permanent schedule: {schedule['name']}")
         
     except Exception as e:
         error_msg = f"[ERROR] Permanent schedule '{schedule['name']}' failed: {str(e)}"
-        print(error_msg)
+        logger.error(error_msg)
+        run_log.fail(error_msg)
         
         # Update schedule with error information
         current_time = datetime.now(pytz.timezone('Asia/Kolkata'))
         schedule['last_run'] = current_time.isoformat()
         schedule['last_result'] = f"Error: {str(e)}"
         
-        # Save updated schedule
+        # Record the failed run
         try:
-            settings = load_settings()
-            multiple_schedules = settings.get('multiple_schedules', [])
-            for i, sched in enumerate(multiple_schedules):
-                if sched.get('id') == schedule.get('id'):
-                    multiple_schedules[i] = schedule
-                    break
-            settings['multiple_schedules'] = multiple_schedules
-            save_settings(settings)
+            from .scheduler_service import scheduler_service
+            scheduler_service.record_run(schedule['id'], schedule['last_run'], schedule['last_result'])
         except:
             pass
         
@@ -2212,55 +2176,32 @@ def run_permanent_schedule(schedule):
 def run_test_automation_now():
     """Run a quick test of automation system."""
     try:
-        print(f"[DEBUG] Running quick automation test")
+        logger.debug(f"[DEBUG] Running quick automation test")
         
         # Test with default settings
         nifty_result = generate_chart_for_instrument('NIFTY', 'Weekly')
         banknifty_result = generate_chart_for_instrument('BANKNIFTY', 'Monthly')
         
         result = f"NIFTY (Weekly): {nifty_result}\nBANKNIFTY (Monthly): {banknifty_result}"
-        print(f"[DEBUG] Quick test completed: {result}")
+        logger.debug(f"[DEBUG] Quick test completed: {result}")
         return result
         
     except Exception as e:
         error_msg = f"Quick test failed: {str(e)}"
-        print(f"[ERROR] {error_msg}")
+        logger.error(f"[ERROR] {error_msg}")
         return error_msg
 
 def add_automation_activity(title, description, status='success'):
-    """Add an automation activity to recent activities log."""
+    """Add an automation activity to recent activities log (see activity_log.py)."""
     try:
-        settings = load_settings()
-        activities = settings.get('automation_activities', [])
-        
-        # Create new activity
-        activity = {
-            'title': title,
-            'description': description,
-            'status': status,
-            'time': datetime.now().strftime('%d %b %Y, %I:%M %p'),
-            'timestamp': datetime.now().isoformat()
-        }
-        
-        # Add to beginning of list
-        activities.insert(0, activity)
-        
-        # Keep only last 50 activities
-        activities = activities[:50]
-        
-        # Save back to settings
-        settings['automation_activities'] = activities
-        save_settings(settings)
-        
+        activity_log.add(title, description, status)
     except Exception as e:
-        print(f"[ERROR] Failed to add automation activity: {str(e)}")
+        logger.error(f"[ERROR] Failed to add automation activity: {str(e)}")
 
 def get_recent_automation_activities(limit=10):
     """Get recent automation activities."""
     try:
-        settings = load_settings()
-        activities = settings.get('automation_activities', [])
-        return activities[:limit]
+        return activity_log.recent(limit)
     except Exception as e:
-        print(f"[ERROR] Failed to get automation activities: {str(e)}")
+        logger.error(f"[ERROR] Failed to get automation activities: {str(e)}")
         return []
\ No newline at end of file
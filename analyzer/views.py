@@ -6,6 +6,7 @@ from django.contrib import messages
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.urls import reverse
+from django.template.loader import render_to_string
 import json
 import pandas as pd
 import os
@@ -13,8 +14,23 @@ import time
 from datetime import datetime
 from collections import defaultdict
 from . import utils
+from . import greeks
+from . import risk
+from . import log_service
+from . import alerts
+from . import run_log
 from .utils import generate_analysis, load_settings, save_settings
 from .pnl_updater import pnl_updater, PnLUpdater
+from .jobs import job_runner
+from .analysis_cache import analysis_cache
+from .render_service import render_service
+from .notifications import notification_queue
+from .scheduler_service import scheduler_service
+from .ltp_monitor import ltp_monitor
+from .charts import PAYOFF_LOSS_FLOOR
+import logging
+
+logger = logging.getLogger(__name__)
 
 # Global cache for option chain data with timestamps
 _option_data_cache = {}
@@ -32,18 +48,18 @@ def get_cached_option_data(instrument, sleep_time=0.0, force_fresh=False):
     # Check if we have valid cached data (skip cache if force_fresh=True)
     if (not force_fresh and cache_key in _option_data_cache and 
         current_time - _option_data_cache[cache_key]['timestamp'] < _cache_duration):
-        print(f"📋 Using cached data for {instrument} (immediate load)")
+        logger.debug(f"📋 Using cached data for {instrument} (immediate load)")
         return _option_data_cache[cache_key]['data']
     
     # Add sleep only if explicitly requested (for manual refresh operations)
     if sleep_time > 0:
-        print(f"⏳ Sleeping {sleep_time}s before fetching {instrument} data...")
+        logger.info(f"⏳ Sleeping {sleep_time}s before fetching {instrument} data...")
         time.sleep(sleep_time)
     else:
-        print(f"🚀 Immediate fetch for {instrument} data (no delay)")
+        logger.info(f"🚀 Immediate fetch for {instrument} data (no delay)")
     
     # Fetch fresh data
-    print(f"🔄 Fetching fresh option data for {instrument}")
+    logger.info(f"🔄 Fetching fresh option data for {instrument}")
     try:
         # For option chain page, we need full data including strikes and prices
         data = utils.get_option_chain_data(instrument, force_full_data=True)
@@ -56,10 +72,10 @@ def get_cached_option_data(instrument, sleep_time=0.0, force_fresh=False):
         
         return data
     except Exception as e:
-        print(f"❌ Error fetching option data for {instrument}: {e}")
+        logger.error(f"❌ Error fetching option data for {instrument}: {e}")
         # Return cached data if available, even if expired
         if cache_key in _option_data_cache:
-            print(f"⚠️ Using expired cached data for {instrument}")
+            logger.warning(f"⚠️ Using expired cached data for {instrument}")
             return _option_data_cache[cache_key]['data']
         return None
 
@@ -75,13 +91,13 @@ def index(request):
     # Check if this is an AJAX request for expiry dates
     is_ajax = request.headers.get('X-Requested-With') == 'XMLHttpRequest' or request.GET.get('ajax')
     
-    print(f"🔄 Index view called - instrument: {instrument}, AJAX: {is_ajax}")
+    logger.info(f"🔄 Index view called - instrument: {instrument}, AJAX: {is_ajax}")
     
     # Always load option chain data for expiry dates (needed for both regular and AJAX requests)
     expiries = []
     
     try:
-        print(f"🔄 Loading option data for instrument: {instrument}")
+        logger.info(f"🔄 Loading option data for instrument: {instrument}")
         chain = get_cached_option_data(instrument, sleep_time=0.1)
         
         if chain and 'expiryDates' in chain:
@@ -90,7 +106,7 @@ def index(request):
             from datetime import datetime as dt, timedelta
             current_date = dt.now().date()
             
-            print(f"📅 Raw expiry dates from API: {len(all_expiries)} dates")
+            logger.info(f"📅 Raw expiry dates from API: {len(all_expiries)} dates")
             
             for expiry_str in all_expiries:
                 try:
@@ -105,30 +121,30 @@ def index(request):
                         if expiry_date >= current_date:
                             expiries.append(expiry_str)
                     except ValueError:
-                        print(f"⚠️ Could not parse expiry date: {expiry_str}")
+                        logger.warning(f"⚠️ Could not parse expiry date: {expiry_str}")
                         continue
                         
             # Sort by date
             expiries.sort(key=lambda x: dt.strptime(x, "%d-%b-%Y"))
-            print(f"✅ Processed {len(expiries)} valid future expiry dates for {instrument}")
+            logger.info(f"✅ Processed {len(expiries)} valid future expiry dates for {instrument}")
             
             if len(expiries) > 0:
-                print(f"📊 First few expiries: {expiries[:3]}")
+                logger.debug(f"📊 First few expiries: {expiries[:3]}")
             
         else:
-            print(f"⚠️ No expiry dates found in option chain for {instrument}")
+            logger.warning(f"⚠️ No expiry dates found in option chain for {instrument}")
             expiries = []
             
     except Exception as e:
-        print(f"❌ Error processing expiry dates for {instrument}: {e}")
+        logger.error(f"❌ Error processing expiry dates for {instrument}: {e}")
         import traceback
-        print(f"Traceback: {traceback.format_exc()}")
+        logger.info(f"Traceback: {traceback.format_exc()}")
         expiries = []
         
     # Ensure we have at least some expiries (fallback)
     if not expiries:
         from datetime import datetime as dt, timedelta
-        print(f"🔄 Generating fallback expiry dates for {instrument}")
+        logger.info(f"🔄 Generating fallback expiry dates for {instrument}")
         base_date = dt.now().date()
         for i in range(1, 5):  # Next 4 weeks
             fallback_date = base_date + timedelta(weeks=i)
@@ -136,7 +152,13 @@ def index(request):
             days_to_add = (3 - fallback_date.weekday()) % 7
             thursday = fallback_date + timedelta(days=days_to_add)
             expiries.append(thursday.strftime("%d-%b-%Y"))
-        print(f"🔄 Generated {len(expiries)} fallback expiry dates")
+        logger.info(f"🔄 Generated {len(expiries)} fallback expiry dates")
+
+    # Warm the analysis cache for the nearest expiries while the user picks inputs
+    try:
+        analysis_cache.precompute(instrument, expiries)
+    except Exception as e:
+        logger.warning(f"⚠️ Could not start analysis precompute: {e}")
             
     context = {
         'expiries': expiries,
@@ -148,126 +170,144 @@ def index(request):
     return render(request, 'analyzer/index.html', context)
 
 def generate_and_show_analysis(request):
-    # Create a debug log file
-    debug_file = r"C:\Users\manir\Desktop\debug_log.txt"
-    
-    def debug_log(message):
-        with open(debug_file, 'a', encoding='utf-8') as f:
-            from datetime import datetime
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            f.write(f"[{timestamp}] {message}\n")
-        print(message)  # Also print to console
-    
-    debug_log("=== Generate Analysis View Called ===")
-    debug_log(f"Request method: {request.method}")
+    logger.debug("=== Generate Analysis View Called ===")
+    logger.debug(f"Request method: {request.method}")
     
     if request.method == 'POST':
         instrument = request.POST.get('instrument')
         calc_type = request.POST.get('calc_type')
         expiry = request.POST.get('expiry')
         
-        debug_log(f"Form data received:")
-        debug_log(f"  Instrument: {instrument}")
-        debug_log(f"  Calculation Type: {calc_type}")
-        debug_log(f"  Expiry: {expiry}")
-        
+        logger.debug(f"Form data received:")
+        logger.debug(f"  Instrument: {instrument}")
+        logger.debug(f"  Calculation Type: {calc_type}")
+        logger.debug(f"  Expiry: {expiry}")
+
+        # AJAX submissions run as a background job; the page polls task_status
+        if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+            try:
+                task_id = job_runner.submit('analysis', {'instrument': instrument, 'calc_type': calc_type,
+                                                         'expiry': expiry})
+                return JsonResponse({'success': True, 'task_id': task_id,
+                                     'status_url': reverse('check_task_status', args=[task_id])})
+            except Exception as e:
+                logger.error(f"❌ Failed to queue analysis job: {e}")
+                return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
         try:
-            debug_log("Calling utils.generate_analysis()...")
-            analysis_data, status = utils.generate_analysis(instrument, calc_type, expiry)
-            debug_log(f"Analysis result: {type(analysis_data)}, Status: {status}")
+            logger.debug("Calling utils.generate_analysis()...")
+            analysis_data, status = utils.generate_analysis(instrument, calc_type, expiry, render_charts=False)
+            logger.debug(f"Analysis result: {type(analysis_data)}, Status: {status}")
             
             if analysis_data:
                 request.session['analysis_data'] = analysis_data
                 messages.success(request, status)
-                debug_log("✅ Analysis successful - data saved to session")
+                logger.debug("✅ Analysis successful - data saved to session")
 
                 # If it's an AJAX request, render the results partial and return as HTML
                 if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
                     return render(request, 'analyzer/partials/analysis_results.html', {'analysis_data': analysis_data})
             else:
                 messages.error(request, status)
-                debug_log(f"❌ Analysis failed: {status}")
+                logger.debug(f"❌ Analysis failed: {status}")
         except Exception as e:
             error_msg = f"Error generating analysis: {str(e)}"
             messages.error(request, error_msg)
-            debug_log(f"❌ Exception occurred: {error_msg}")
+            logger.debug(f"❌ Exception occurred: {error_msg}")
             import traceback
-            debug_log(f"Traceback: {traceback.format_exc()}")
+            logger.debug(f"Traceback: {traceback.format_exc()}")
         
         return redirect(reverse('index'))
     
-    debug_log("❌ Non-POST request - redirecting to index")
+    logger.debug("❌ Non-POST request - redirecting to index")
     return redirect(reverse('index'))
 
 def check_task_status(request, task_id):
-    """Simple status check - not needed for basic version."""
-    return JsonResponse({
-        'success': True,
-        'completed': True,
-        'message': 'Task completed'
-    })
+    """
+    Status of a background job: stage and percent while it runs; on completion
+    an analysis is saved to the session and returned as the rendered results partial.
+    """
+    job = job_runner.get(task_id)
+    if job is None:
+        return JsonResponse({'success': False, 'error': 'Unknown task'}, status=404)
+
+    response = {
+        'success': job['status'] != 'failed',
+        'status': job['status'],
+        'stage': job['stage'],
+        'progress': job['progress'],
+        'completed': job['status'] in ('completed', 'failed'),
+        'message': job['error'] if job['status'] == 'failed' else job['stage'],
+    }
+    if job['status'] == 'completed' and job['kind'] == 'analysis':
+        analysis_data = job['result']['analysis_data']
+        request.session['analysis_data'] = analysis_data
+        response['message'] = job['result']['status']
+        response['html'] = render_to_string('analyzer/partials/analysis_results.html',
+                                            {'analysis_data': analysis_data}, request=request)
+    return JsonResponse(response)
 
 def add_trades(request):
     """
     Add analysis results to active trades portfolio
     """
-    print("🚀 ADD_TRADES FUNCTION CALLED!")
+    logger.info("🚀 ADD_TRADES FUNCTION CALLED!")
     
     analysis_data = request.session.get('analysis_data')
-    print(f"📊 Analysis data found: {analysis_data is not None}")
+    logger.debug(f"📊 Analysis data found: {analysis_data is not None}")
     
     if analysis_data:
-        print(f"📈 Analysis data keys: {list(analysis_data.keys())}")
-        print(f"📊 Instrument: {analysis_data.get('instrument', 'Not found')}")
-        print(f"📅 Expiry: {analysis_data.get('expiry', 'Not found')}")
-        print(f"📋 df_data length: {len(analysis_data.get('df_data', []))}")
+        logger.info(f"📈 Analysis data keys: {list(analysis_data.keys())}")
+        logger.debug(f"📊 Instrument: {analysis_data.get('instrument', 'Not found')}")
+        logger.info(f"📅 Expiry: {analysis_data.get('expiry', 'Not found')}")
+        logger.debug(f"📋 df_data length: {len(analysis_data.get('df_data', []))}")
         if analysis_data.get('df_data'):
-            print(f"📝 Sample df_data entry: {analysis_data['df_data'][0] if analysis_data['df_data'] else 'Empty'}")
+            logger.info(f"📝 Sample df_data entry: {analysis_data['df_data'][0] if analysis_data['df_data'] else 'Empty'}")
     
     if not analysis_data:
-        print("⚠️ No analysis data found in session")
+        logger.warning("⚠️ No analysis data found in session")
         messages.warning(request, 'Please generate an analysis first before adding to portfolio.')
         return redirect(reverse('index'))
     
-    print(f"📈 Processing analysis for {analysis_data.get('instrument', 'Unknown')} {analysis_data.get('expiry', 'Unknown')}")
+    logger.info(f"📈 Processing analysis for {analysis_data.get('instrument', 'Unknown')} {analysis_data.get('expiry', 'Unknown')}")
     
     # Check trades before adding
     trades_before = utils.load_trades()
-    print(f"📊 Trades before adding: {len(trades_before)}")
+    logger.debug(f"📊 Trades before adding: {len(trades_before)}")
     
     # Show existing trade IDs to check for duplicates
     if trades_before:
-        print("🔍 Existing trade IDs:")
+        logger.debug("🔍 Existing trade IDs:")
         for trade in trades_before:
-            print(f"   - {trade.get('id', 'NO_ID')}")
+            logger.debug(f"   - {trade.get('id', 'NO_ID')}")
     
     try:
         status = utils.add_to_analysis(analysis_data)
-        print(f"📝 Add to analysis result: {status}")
+        logger.info(f"📝 Add to analysis result: {status}")
         
         # Check trades after adding
         trades_after = utils.load_trades()
-        print(f"📈 Trades after adding: {len(trades_after)}")
+        logger.info(f"📈 Trades after adding: {len(trades_after)}")
         
         if len(trades_after) > len(trades_before):
-            print("✅ New trades were added successfully!")
+            logger.info("✅ New trades were added successfully!")
             new_trades = trades_after[len(trades_before):]
             for trade in new_trades:
-                print(f"   🔹 Added: {trade['id']} | Status: {trade['status']} | Tag: {trade['entry_tag']}")
+                logger.debug(f"   🔹 Added: {trade['id']} | Status: {trade['status']} | Tag: {trade['entry_tag']}")
             
             messages.success(request, f"✅ {status}")
         else:
-            print("ℹ️ No new trades added (duplicates prevented)")
+            logger.info("ℹ️ No new trades added (duplicates prevented)")
             messages.info(request, f"ℹ️ {status}")
             
     except Exception as e:
         error_msg = f"Error adding trades: {str(e)}"
-        print(f"❌ {error_msg}")
+        logger.error(f"❌ {error_msg}")
         import traceback
         traceback.print_exc()
         messages.error(request, error_msg)
     
-    print("🔄 Redirecting to trades_list")
+    logger.info("🔄 Redirecting to trades_list")
     return redirect(reverse('trades_list'))
 
 
@@ -285,6 +325,7 @@ def add_trades(request):
         df_html = ""
     return render(request, 'analyzer/trades.html', {'trades_html': df_html})
 
+@alerts.cycle("Auto Close")
 def check_and_auto_close_trades(trades):
     """
     Check all running trades for target/stoploss conditions and auto-close them
@@ -336,7 +377,7 @@ def check_and_auto_close_trades(trades):
                 current_pnl = trade.get('pnl', 0)
                 
         except Exception as e:
-            print(f"Error calculating P&L for auto-close trade {trade.get('id')}: {e}")
+            logger.error(f"Error calculating P&L for auto-close trade {trade.get('id')}: {e}")
             current_pnl = trade.get('pnl', 0)
         
         # Check target condition
@@ -359,8 +400,8 @@ def check_and_auto_close_trades(trades):
             trade['closed_date'] = datetime.now().isoformat()
             auto_closed.append(trade['id'])
             
-            # Send Telegram notification
-            utils.send_telegram_message(f"🤖 Auto Close: Trade {trade['id']} closed due to {close_reason} with P&L ₹{current_pnl:.2f}")
+            # Announced in this pass's alert digest
+            alerts.emit(alerts.AUTO_CLOSED, trade['id'], current_pnl, f"({close_reason})", started=trade.get('start_time'))
     
     # Save trades if any were auto-closed
     if auto_closed:
@@ -502,7 +543,7 @@ def trades_list(request):
                         else:
                             current_pnl = trade.get('pnl', 0)
                     except Exception as e:
-                        print(f"Error calculating P&L for trade {trade.get('id')}: {e}")
+                        logger.error(f"Error calculating P&L for trade {trade.get('id')}: {e}")
                         current_pnl = trade.get('pnl', 0)
                     
                     trade['status'] = 'Manually Closed'
@@ -625,8 +666,8 @@ def trades_list(request):
     
     # 🚀 IMMEDIATE LOADING: Skip market data fetching on initial page load
     # Market data is only fetched when user clicks refresh button
-    print(f"🚀 Immediate load: Skipping market data fetch for faster page loading")
-    print(f"📊 Active trades loaded immediately without P&L calculation")
+    logger.info(f"🚀 Immediate load: Skipping market data fetch for faster page loading")
+    logger.debug(f"📊 Active trades loaded immediately without P&L calculation")
     
     for trade in active_trades:
         try:
@@ -765,6 +806,9 @@ def settings_view(request):
         enable_trade_alerts = 'enable_trade_alerts' in request.POST
         enable_bulk_alerts = 'enable_bulk_alerts' in request.POST
         enable_summary_alerts = 'enable_summary_alerts' in request.POST
+        pl_update_min_change = float(request.POST.get('pl_update_min_change', 500))
+        pl_update_min_change_pct = float(request.POST.get('pl_update_min_change_pct', 10))
+        pl_update_heartbeat_minutes = int(request.POST.get('pl_update_heartbeat_minutes', 60))
         
         # Get lot size configuration
         nifty_lot_size = int(request.POST.get('nifty_lot_size', 75))
@@ -791,6 +835,9 @@ def settings_view(request):
             'enable_trade_alerts': enable_trade_alerts,
             'enable_bulk_alerts': enable_bulk_alerts,
             'enable_summary_alerts': enable_summary_alerts,
+            'pl_update_min_change': pl_update_min_change,
+            'pl_update_min_change_pct': pl_update_min_change_pct,
+            'pl_update_heartbeat_minutes': pl_update_heartbeat_minutes,
             
             # Lot size configuration
             'nifty_lot_size': nifty_lot_size,
@@ -950,7 +997,7 @@ def automation_view(request):
             elif action == 'get_schedule':
                 # Get schedule data for editing
                 schedule_id = request.POST.get('schedule_id')
-                schedule = next((s for s in multiple_schedules if s['id'] == schedule_id), None)
+                schedule = next((s for s in scheduler_service.with_run_state(multiple_schedules) if s['id'] == schedule_id), None)
                 
                 if schedule:
                     return JsonResponse({'success': True, 'schedule': schedule})
@@ -989,6 +1036,7 @@ def automation_view(request):
                 if schedule_index is not None:
                     schedule_name = multiple_schedules[schedule_index]['name']
                     utils.stop_permanent_schedule(schedule_id)
+                    scheduler_service.forget_runs(schedule_id)
                     del multiple_schedules[schedule_index]
                     
                     settings['multiple_schedules'] = multiple_schedules
@@ -1050,7 +1098,7 @@ def automation_view(request):
     
     # Load current settings for display
     current_settings = utils.load_settings()
-    multiple_schedules = current_settings.get('multiple_schedules', [])
+    multiple_schedules = scheduler_service.with_run_state(current_settings.get('multiple_schedules', []))
     
     # Add last run information to schedules
     for schedule in multiple_schedules:
@@ -1072,7 +1120,7 @@ def closed_trades_view(request):
     Display closed trades with filtering and statistics.
     Optimized to only load trade data, no external market data needed.
     """
-    print("📊 Loading closed trades page - no external API calls needed")
+    logger.debug("📊 Loading closed trades page - no external API calls needed")
     
     # Handle POST requests for delete operations
     if request.method == 'POST':
@@ -1191,6 +1239,7 @@ def closed_trades_view(request):
     
     return render(request, 'analyzer/closed_trades.html', context)
 
+@alerts.cycle("Automation Test Run")
 def test_automation_view(request):
     """Test automation functionality manually."""
     if request.method == 'POST':
@@ -1418,7 +1467,7 @@ def option_chain_view(request):
     instrument = request.GET.get('instrument', 'NIFTY')
     expiry = request.GET.get('expiry', None)
     
-    print(f"📊 Loading option chain for {instrument} - using cached data where possible")
+    logger.debug(f"📊 Loading option chain for {instrument} - using cached data where possible")
     
     try:
         # Use cached option chain data with rate limiting
@@ -1449,6 +1498,9 @@ def option_chain_view(request):
                 expiry = expiry_dates[0]
                 context['current_expiry'] = expiry
             
+            # Model IV and Greeks for the whole chain (cached per snapshot)
+            chain_greeks = greeks.get_chain_greeks(option_chain_data)
+            
             # Process strikes data for display
             strikes_data = []
             for strike_str, strike_data in strikes_dict.items():
@@ -1466,6 +1518,7 @@ def option_chain_view(request):
                         'iv': round(ce_data.get('implied_volatility', 0), 2),
                         'bid': ce_data.get('top_bid_price', 0),
                         'ask': ce_data.get('top_ask_price', 0),
+                        **greeks.strike_greeks(chain_greeks, 'ce', strike),
                     }
                     
                     pe_obj = {
@@ -1476,6 +1529,7 @@ def option_chain_view(request):
                         'iv': round(pe_data.get('implied_volatility', 0), 2),
                         'bid': pe_data.get('top_bid_price', 0),
                         'ask': pe_data.get('top_ask_price', 0),
+                        **greeks.strike_greeks(chain_greeks, 'pe', strike),
                     }
                     
                     strike_obj = {
@@ -1515,26 +1569,26 @@ def option_chain_view(request):
                 'symbol': instrument,  # Add symbol for JavaScript
             })
             
-            print(f"✅ Context updated successfully with {len(strikes_data[:50])} strikes")
+            logger.info(f"✅ Context updated successfully with {len(strikes_data[:50])} strikes")
             
             # Debug logging
-            print(f"🔍 Option Chain Debug - Symbol: {instrument}, Strikes Count: {len(strikes_data[:50])}")
+            logger.debug(f"🔍 Option Chain Debug - Symbol: {instrument}, Strikes Count: {len(strikes_data[:50])}")
             if strikes_data and len(strikes_data) > 0:
                 first_strike = strikes_data[0]
-                print(f"📊 First strike sample: Strike={first_strike['strike_price']}")
-                print(f"📊 CE LTP={first_strike.get('CE', {}).get('ltp', 'N/A')}, PE LTP={first_strike.get('PE', {}).get('ltp', 'N/A')}")
-                print(f"📦 Template context keys: instrument={instrument}, current_expiry={expiry}, strikes count={len(strikes_data[:50])}")
+                logger.debug(f"📊 First strike sample: Strike={first_strike['strike_price']}")
+                logger.debug(f"📊 CE LTP={first_strike.get('CE', {}).get('ltp', 'N/A')}, PE LTP={first_strike.get('PE', {}).get('ltp', 'N/A')}")
+                logger.info(f"📦 Template context keys: instrument={instrument}, current_expiry={expiry}, strikes count={len(strikes_data[:50])}")
             else:
-                print("⚠️  No strikes data found!")
+                logger.warning("⚠️  No strikes data found!")
             
-            print(f"🔵 End of successful processing block")
+            logger.info(f"🔵 End of successful processing block")
             
         else:
-            print("❌ Entering ELSE clause - option chain data failed")
+            logger.error("❌ Entering ELSE clause - option chain data failed")
             context['error_message'] = f"Could not load option chain data for {instrument}"
             
     except Exception as e:
-        print(f"❌ Exception occurred: {str(e)}")
+        logger.error(f"❌ Exception occurred: {str(e)}")
         # Only override context if it doesn't have valid data
         if 'strikes' not in context or len(context.get('strikes', [])) == 0:
             context = {
@@ -1550,9 +1604,9 @@ def option_chain_view(request):
             }
         else:
             # Preserve successful data - don't set error_message to avoid hiding table
-            print(f"⚠️ Exception occurred but preserving {len(context.get('strikes', []))} strikes")
+            logger.warning(f"⚠️ Exception occurred but preserving {len(context.get('strikes', []))} strikes")
     
-    print(f"🎯 Final context before template: strikes={len(context.get('strikes', []))}, instrument={context.get('instrument', 'None')}")
+    logger.info(f"🎯 Final context before template: strikes={len(context.get('strikes', []))}, instrument={context.get('instrument', 'None')}")
     
     return render(request, 'analyzer/option_chain.html', context)
 
@@ -1637,7 +1691,7 @@ def basket_orders_view(request):
     View all basket orders - optimized for fast loading
     Only loads basket data from session, no external API calls
     """
-    print("📋 Loading basket orders page - no external data needed")
+    logger.debug("📋 Loading basket orders page - no external data needed")
     basket_orders = request.session.get('basket_orders', [])
     
     context = {
@@ -1679,6 +1733,7 @@ def nse_test_view(request):
 
 
 @csrf_exempt
+@alerts.cycle("Trades Refresh")
 def refresh_trades_api(request):
     """
     API endpoint for manual refresh of trades data with proper sleep delays
@@ -1704,14 +1759,14 @@ def refresh_trades_api(request):
         for trade in active_trades:
             unique_instruments.add(trade.get('instrument', 'NIFTY'))
         
-        print(f"🔄 Manual refresh: Loading market data for {len(unique_instruments)} instruments with sleep delays")
+        logger.info(f"🔄 Manual refresh: Loading market data for {len(unique_instruments)} instruments with sleep delays")
         
         # Load market data with sleep delays for manual refresh to prevent rate limiting
         market_data = {}
         for i, instrument in enumerate(unique_instruments):
             sleep_time = 0.8 if i > 0 else 0.3  # Sleep for manual refresh
             market_data[instrument] = get_cached_option_data(instrument, sleep_time=sleep_time, force_fresh=True)
-            print(f"✅ Manual refresh completed for {instrument} (with {sleep_time}s delay)")
+            logger.info(f"✅ Manual refresh completed for {instrument} (with {sleep_time}s delay)")
         
         # Update trades with fresh P&L calculations
         updated_trades = []
@@ -1747,10 +1802,10 @@ def refresh_trades_api(request):
                     if current_ce > 0 and current_pe > 0:
                         pnl_calculated = True
                         data_source = 'DhanHQ'
-                        print(f"✅ DhanHQ P&L data for {trade['id']}: CE=₹{current_ce}, PE=₹{current_pe}")
+                        logger.info(f"✅ DhanHQ P&L data for {trade['id']}: CE=₹{current_ce}, PE=₹{current_pe}")
             
             except Exception as e:
-                print(f"⚠️ DhanHQ P&L calculation failed for {trade['id']}: {e}")
+                logger.warning(f"⚠️ DhanHQ P&L calculation failed for {trade['id']}: {e}")
             
             # Fallback to NSE option chain if DhanHQ failed
             if not pnl_calculated:
@@ -1767,7 +1822,7 @@ def refresh_trades_api(request):
                     if current_ce > 0 and current_pe > 0:
                         pnl_calculated = True
                         data_source = 'NSE'
-                        print(f"✅ NSE P&L data for {trade['id']}: CE=₹{current_ce}, PE=₹{current_pe}")
+                        logger.info(f"✅ NSE P&L data for {trade['id']}: CE=₹{current_ce}, PE=₹{current_pe}")
             
             # Final fallback: Use PnLUpdater's option price methods
             if not pnl_calculated:
@@ -1792,10 +1847,10 @@ def refresh_trades_api(request):
                     if current_ce > 0 and current_pe > 0:
                         pnl_calculated = True
                         data_source = 'PnLUpdater'
-                        print(f"✅ PnLUpdater P&L data for {trade['id']}: CE=₹{current_ce}, PE=₹{current_pe}")
+                        logger.info(f"✅ PnLUpdater P&L data for {trade['id']}: CE=₹{current_ce}, PE=₹{current_pe}")
                         
                 except Exception as e:
-                    print(f"⚠️ PnLUpdater fallback failed for {trade['id']}: {e}")
+                    logger.warning(f"⚠️ PnLUpdater fallback failed for {trade['id']}: {e}")
             
             # Calculate P&L if we have valid prices
             lot_size = utils.get_lot_size(trade['instrument'])
@@ -1810,7 +1865,7 @@ def refresh_trades_api(request):
                 trade['last_refresh'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
                 total_updated_pnl += pnl
                 updated_trades.append(trade)
-                print(f"📊 Updated P&L for {trade['id']}: ₹{pnl} ({data_source})")
+                logger.debug(f"📊 Updated P&L for {trade['id']}: ₹{pnl} ({data_source})")
                 
                 # Check for target/stoploss hits during refresh
                 target_amount = trade.get('target_amount', 0)
@@ -1818,12 +1873,10 @@ def refresh_trades_api(request):
                 
                 if pnl >= target_amount and target_amount > 0:
                     trade['status'] = 'Target'
-                    # Send Telegram alert
-                    utils.send_telegram_message(f"🎯 TARGET HIT!\nTrade: {trade['id']}\nP&L: ₹{pnl:,.2f}")
+                    alerts.emit(alerts.TARGET_HIT, trade['id'], pnl, started=trade.get('start_time'))
                 elif pnl <= -stoploss_amount and stoploss_amount > 0:
                     trade['status'] = 'Stoploss'
-                    # Send Telegram alert
-                    utils.send_telegram_message(f"🛑 STOPLOSS HIT!\nTrade: {trade['id']}\nP&L: ₹{pnl:,.2f}")
+                    alerts.emit(alerts.STOPLOSS_HIT, trade['id'], pnl, started=trade.get('start_time'))
             else:
                 # No valid prices available from any source
                 trade['pnl'] = "N/A"
@@ -1831,11 +1884,14 @@ def refresh_trades_api(request):
                 trade['data_source'] = 'No Data'
                 trade['last_refresh'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
                 updated_trades.append(trade)
-                print(f"⚠️ No option price data available for {trade['id']} - CE: {current_ce}, PE: {current_pe}")
+                logger.warning(f"⚠️ No option price data available for {trade['id']} - CE: {current_ce}, PE: {current_pe}")
         
         # Save updated trades
         utils.save_trades(trades)
         
+        # Refresh book-level Greeks and scenario grid with the same chain data
+        risk.refresh_risk_snapshot(trades, market_data)
+        
         return JsonResponse({
             'success': True,
             'message': f'Refreshed {len(updated_trades)} active trades successfully',
@@ -1845,8 +1901,157 @@ def refresh_trades_api(request):
         })
         
     except Exception as e:
-        print(f"❌ Error in refresh trades API: {e}")
+        logger.error(f"❌ Error in refresh trades API: {e}")
         return JsonResponse({
             'success': False,
             'error': str(e)
-        }, status=500)
\ No newline at end of file
+        }, status=500)
+
+
+@require_http_methods(["GET"])
+def portfolio_risk_api(request):
+    """
+    Net Greeks by instrument, expiry and entry tag plus the spot x vol scenario grid.
+    Serves the snapshot from the latest P&L cycle; pass ?refresh=1 to recompute
+    from cached option chains.
+    """
+    try:
+        report = risk.get_latest_risk_snapshot()
+        if report is None or request.GET.get('refresh'):
+            trades = utils.load_trades()
+            instruments = {t.get('instrument') for t in trades if t.get('status') == 'Running'}
+            chains = {instrument: get_cached_option_data(instrument) for instrument in instruments if instrument}
+            report = risk.refresh_risk_snapshot(trades, chains)
+        if report is None:
+            return JsonResponse({'success': False, 'error': 'Risk report unavailable'})
+        return JsonResponse({'success': True, 'risk': report})
+    except Exception as e:
+        logger.error(f"❌ Error in portfolio risk API: {e}")
+        return JsonResponse({'success': False, 'error': str(e)})
+
+
+def logs_view(request):
+    """Recent application log entries from the in-memory ring buffer."""
+    context = {
+        'log_level': logging.getLevelName(logging.getLogger(log_service.LOGGER_NAME).getEffectiveLevel()),
+        'levels': ['DEBUG', 'INFO', 'WARNING', 'ERROR'],
+    }
+    return render(request, 'analyzer/logs.html', context)
+
+
+def logs_api(request):
+    """
+    Buffered log entries as JSON. Query params: limit (default 200), level
+    (minimum), logger (name prefix) and after (last seen id, for polling).
+    """
+    try:
+        after = request.GET.get('after')
+        entries = log_service.recent_logs(
+            limit=int(request.GET.get('limit', 200)),
+            level=request.GET.get('level') or None,
+            logger_name=request.GET.get('logger') or None,
+            after_id=int(after) if after else None,
+        )
+        return JsonResponse({'success': True, 'logs': entries})
+    except Exception as e:
+        logger.error(f"❌ Error in logs API: {e}")
+        return JsonResponse({'success': False, 'error': str(e)})
+
+
+def render_stats_api(request):
+    """Chart render timings per chart kind (worker render and end-to-end seconds)."""
+    return JsonResponse({'success': True, 'render_stats': render_service.stats()})
+
+
+def _requested_analysis(request):
+    """Analysis of a finished job (?task_id=) or else the one in the session."""
+    task_id = request.GET.get('task_id')
+    if task_id:
+        job = job_runner.get(task_id)
+        if job and job['kind'] == 'analysis' and job['status'] == 'completed':
+            return job['result']['analysis_data']
+        return None
+    return request.session.get('analysis_data')
+
+
+def analysis_data_api(request):
+    """Zones, strike table and payoff summary of the current analysis (or ?task_id=)."""
+    analysis_data = _requested_analysis(request)
+    if not analysis_data:
+        return JsonResponse({'success': False, 'error': 'No analysis available'}, status=404)
+    payoff_data = analysis_data.get('payoff') or {}
+    return JsonResponse({'success': True, 'analysis': {
+        'instrument': analysis_data['instrument'],
+        'expiry': analysis_data['expiry'],
+        'lot_size': analysis_data['lot_size'],
+        'current_price': analysis_data.get('current_price'),
+        'supply_zone': analysis_data.get('supply_zone'),
+        'demand_zone': analysis_data.get('demand_zone'),
+        'strikes': analysis_data['df_data'],
+        'max_profit': payoff_data.get('max_profit'),
+        'breakevens': payoff_data.get('breakevens'),
+    }})
+
+
+def payoff_data_api(request):
+    """Payoff series (expiry and today), breakevens and zones for drawing the payoff chart in the browser."""
+    analysis_data = _requested_analysis(request)
+    if not analysis_data:
+        return JsonResponse({'success': False, 'error': 'No analysis available'}, status=404)
+    if not analysis_data.get('payoff'):
+        return JsonResponse({'success': False, 'error': 'This analysis has no payoff data, generate it again'}, status=404)
+    return JsonResponse({'success': True, 'payoff': {
+        **analysis_data['payoff'],
+        'instrument': analysis_data['instrument'],
+        'expiry': analysis_data['expiry'],
+        'supply_zone': analysis_data.get('supply_zone'),
+        'demand_zone': analysis_data.get('demand_zone'),
+        'loss_floor': PAYOFF_LOSS_FLOOR,
+    }})
+
+
+def notifications_api(request):
+    """Outbound Telegram queue: counts by status and recent deliveries with attempts and errors."""
+    try:
+        limit = int(request.GET.get('limit', 50))
+        return JsonResponse({'success': True, **notification_queue.status(limit)})
+    except Exception as e:
+        logger.error(f"❌ Error in notifications API: {e}")
+        return JsonResponse({'success': False, 'error': str(e)})
+
+
+def scheduler_status_api(request):
+    """Schedule runner: whether this process is the leader and the stored jobs with their next run."""
+    try:
+        return JsonResponse({'success': True, **scheduler_service.status()})
+    except Exception as e:
+        logger.error(f"❌ Error in scheduler status API: {e}")
+        return JsonResponse({'success': False, 'error': str(e)})
+
+
+def ltp_probe_api(request):
+    """LTP probe monitor: probe/escalation counts, baseline age and the last probe's estimates."""
+    try:
+        return JsonResponse({'success': True, **ltp_monitor.status()})
+    except Exception as e:
+        logger.error(f"❌ Error in LTP probe API: {e}")
+        return JsonResponse({'success': False, 'error': str(e)})
+
+
+def job_runs_api(request):
+    """Recent scheduled job runs with outcome and per-stage seconds; ?job=<id or prefix*>&limit=N."""
+    try:
+        runs = run_log.recent_runs(request.GET.get('job'), int(request.GET.get('limit', 50)))
+        return JsonResponse({'success': True, 'runs': runs})
+    except Exception as e:
+        logger.error(f"❌ Error in job runs API: {e}")
+        return JsonResponse({'success': False, 'error': str(e)})
+
+
+def job_runs_summary_api(request):
+    """p50/p95 run duration and per-stage seconds for every scheduled job."""
+    try:
+        return JsonResponse({'success': True, 'jobs': run_log.summary()})
+    except Exception as e:
+        logger.error(f"❌ Error in job runs summary API: {e}")
+        return JsonResponse({'success': False, 'error': str(e)})
@@ -0,0 +1,130 @@
+"""
+Warm-up Module - Fetch a scheduled run's inputs shortly before it starts
+
+A scheduled run at 09:20 used to start every fetch cold: the expiry list,
+months of history for the zones and the option chain, each behind the
+DhanHQ rate gates. SCHEDULE_WARMUP_SECONDS before each schedule (see
+scheduler_service.py and runapscheduler) warm_up() runs the fetch stage of
+the run on its own:
+
+- the expiry calendar (expiry cache) of each instrument;
+- history for any zones missing from the weekly zone cache, which also
+  merges the candles into the candle store;
+- the option chain of each (instrument, expiry), kept in chain_prefetch.
+
+The run then takes the prefetched chain instead of fetching it (see
+batch.py), as long as it is not older than the warm-up lead plus
+CHAIN_GRACE_SECONDS; a stale or missing chain is fetched as before.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+from . import batch, run_log, utils
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WARMUP_SECONDS = 120
+CHAIN_GRACE_SECONDS = 60  # Extra age allowed for a prefetched chain, for scheduler and run delays
+
+
+def warmup_seconds():
+    """How long before a scheduled run its warm-up starts; 0 disables warm-ups."""
+    return max(0, int(getattr(settings, 'SCHEDULE_WARMUP_SECONDS', DEFAULT_WARMUP_SECONDS)))
+
+
+class ChainPrefetch:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._chains = {}
+
+    def put(self, instrument, expiry, chain):
+        with self._lock:
+            self._chains[(instrument, expiry)] = (time.time(), chain)
+
+    def take(self, instrument, expiry, max_age=None):
+        """The prefetched chain for (instrument, expiry) if still fresh; each chain is used once."""
+        max_age = max_age if max_age is not None else warmup_seconds() + CHAIN_GRACE_SECONDS
+        with self._lock:
+            entry = self._chains.pop((instrument, expiry), None)
+        if entry is None:
+            return None
+        fetched_at, chain = entry
+        age = time.time() - fetched_at
+        if age > max_age:
+            logger.info(f"♨️ Prefetched {instrument} {expiry} chain is {age:.0f}s old, fetching a fresh one")
+            return None
+        logger.info(f"♨️ Using {instrument} {expiry} chain prefetched {age:.0f}s ago")
+        return chain
+
+
+def warm_up(jobs, max_workers=batch.DEFAULT_MAX_WORKERS):
+    """
+    Fetch the expiry calendar, missing zones (with their candles) and option
+    chains for (instrument, calc_type[, expiry]) jobs, concurrently.
+    Returns a summary with the per-step timings and any errors.
+    """
+    start = time.perf_counter()
+    jobs = batch.normalize_jobs(jobs)
+    if not jobs:
+        return {'jobs': 0, 'history_fetches': {}, 'chains': [], 'errors': [], 'timings': {'total': 0.0}}
+    plan = batch.plan_fetches(jobs)
+    instruments = list(dict.fromkeys(job['instrument'] for job in jobs))
+    logger.info(f"♨️ Warming up {', '.join(instruments)}: {len(plan['history'])} history fetches, "
+                f"{len(plan['chains'])} chains, {len(plan['cached_zones'])} cached zones")
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='warmup') as pool:
+        expiry_futures = {
+            instrument: run_log.submit(pool, batch._timed, utils.get_option_chain_data, instrument)
+            for instrument in instruments
+        }
+        zone_futures = {
+            instrument: run_log.submit(pool, batch._timed, batch._zones_for_instrument, instrument,
+                                       plan['missing_zones'][instrument], period)
+            for instrument, period in plan['history'].items()
+        }
+        chain_futures = {
+            (instrument, expiry): run_log.submit(pool, batch._timed, utils.get_option_chain_data, instrument,
+                                                 expiry_date=expiry)
+            for instrument, expiry in plan['chains']
+        }
+
+    timings, errors, chains = {}, [], []
+    for instrument, future in expiry_futures.items():
+        _, timings[f"expiries {instrument}"], error, _ = future.result()
+        if error:
+            errors.append(f"expiries {instrument}: {error}")
+    for instrument, future in zone_futures.items():
+        zones, timings[f"history {instrument}"], error, _ = future.result()
+        if error or not zones:
+            errors.append(f"history {instrument}: {error or 'no data'}")
+    for (instrument, expiry), future in chain_futures.items():
+        chain, timings[f"chain {instrument} {expiry}"], error, _ = future.result()
+        if chain:
+            chain_prefetch.put(instrument, expiry, chain)
+            chains.append(f"{instrument} {expiry}")
+        else:
+            errors.append(f"chain {instrument} {expiry}: {error or 'no data'}")
+
+    timings = {name: round(seconds, 3) for name, seconds in timings.items()}
+    timings['total'] = round(time.perf_counter() - start, 3)
+    if errors:
+        logger.warning(f"⚠️ Warm-up finished with errors in {timings['total']:.2f}s: {'; '.join(errors)}")
+    else:
+        logger.info(f"♨️ Warm-up finished in {timings['total']:.2f}s ({len(chains)} chains prefetched)")
+    return {'jobs': len(jobs), 'history_fetches': plan['history'], 'chains': chains, 'errors': errors, 'timings': timings}
+
+
+def warm_up_auto_generation():
+    """Warm-up for the legacy auto_gen_* automation run by runapscheduler."""
+    app_settings = utils.load_settings()
+    nifty_calc_type = app_settings.get('nifty_calc_type', 'Weekly')
+    banknifty_calc_type = app_settings.get('banknifty_calc_type', 'Monthly')
+    return warm_up([(instrument, nifty_calc_type if instrument == 'NIFTY' else banknifty_calc_type)
+                    for instrument in app_settings.get('auto_gen_instruments', [])])
+
+
+chain_prefetch = ChainPrefetch()
@@ -0,0 +1,178 @@
+"""
+Zone Engine - Incremental multi-timeframe supply/demand zones
+
+Daily candles are folded once into running weekly (Monday-Sunday), monthly
+and quarterly bars per instrument. Each timeframe keeps the ranges of its
+last 10 completed bars with running 5- and 10-bar sums, so a new candle
+costs O(1) per timeframe and zones for every instrument and timeframe are
+read in O(1) without resampling.
+
+Zones follow calculate_zones_from_data_tradingview: the base is the open
+of the forming bar and the range is the 5/10-bar SMA of (High - Low) of
+the completed bars before it.
+"""
+import logging
+import threading
+from collections import deque
+
+from . import candle_store
+
+logger = logging.getLogger(__name__)
+
+RANGE_SHORT = 5
+RANGE_LONG = 10
+ZONE_MULTIPLIER = 0.5
+
+
+def week_key(day):
+    return day.toordinal() - day.weekday()  # Ordinal of the Monday
+
+
+def month_key(day):
+    return day.year * 12 + day.month - 1
+
+
+def quarter_key(day):
+    return day.year * 4 + (day.month - 1) // 3
+
+
+TIMEFRAMES = {
+    'Weekly': week_key,
+    'Monthly': month_key,
+    'Quarterly': quarter_key,
+}
+
+
+def zone_step(instrument_name):
+    """Zones are rounded to 50 for NIFTY and 100 for other indices."""
+    name = instrument_name.upper()
+    return 50 if 'NIFTY' in name and 'BANK' not in name else 100
+
+
+class TimeframeState:
+    """Forming bar plus rolling range sums of the completed bars for one timeframe."""
+
+    def __init__(self, key_func):
+        self.key_func = key_func
+        self.key = None
+        self.open = self.high = self.low = self.close = None
+        self.ranges = deque(maxlen=RANGE_LONG)
+        self.sum_short = 0.0
+        self.sum_long = 0.0
+
+    def _complete_bar(self):
+        rng = self.high - self.low
+        if len(self.ranges) == RANGE_LONG:
+            self.sum_long -= self.ranges[0]
+        if len(self.ranges) >= RANGE_SHORT:
+            self.sum_short -= self.ranges[-RANGE_SHORT]
+        self.ranges.append(rng)
+        self.sum_long += rng
+        self.sum_short += rng
+
+    def update(self, day, open_, high, low, close):
+        """Fold one daily candle in. Returns True when it started a new bar."""
+        key = self.key_func(day)
+        if key == self.key:
+            self.high = max(self.high, high)
+            self.low = min(self.low, low)
+            self.close = close
+            return False
+        if self.key is not None:
+            self._complete_bar()
+        self.key = key
+        self.open, self.high, self.low, self.close = open_, high, low, close
+        return True
+
+    def zones(self):
+        """Raw (supply, demand, rng5, rng10, base_open), or None until 10 bars are complete."""
+        if self.key is None or len(self.ranges) < RANGE_LONG:
+            return None
+        rng5 = self.sum_short / RANGE_SHORT
+        rng10 = self.sum_long / RANGE_LONG
+        supply = max(self.open + ZONE_MULTIPLIER * rng5, self.open + ZONE_MULTIPLIER * rng10)
+        demand = min(self.open - ZONE_MULTIPLIER * rng5, self.open - ZONE_MULTIPLIER * rng10)
+        return supply, demand, rng5, rng10, self.open
+
+
+class ZoneEngine:
+    """Per-instrument running bars for every timeframe, fed with daily candles."""
+
+    def __init__(self):
+        self._states = {}
+        self._last_day = {}
+        self._lock = threading.Lock()
+
+    def ingest(self, instrument, df):
+        """
+        Fold a daily OHLC DataFrame (DatetimeIndex, Open/High/Low/Close) in.
+
+        Candles before the last ingested day are skipped, and the last day
+        itself is merged again so a still-forming daily candle can grow.
+        Returns the number of candles applied.
+        """
+        if df is None or df.empty:
+            return 0
+        with self._lock:
+            states = self._states.setdefault(
+                instrument, {name: TimeframeState(key) for name, key in TIMEFRAMES.items()})
+            last_day = self._last_day.get(instrument)
+            applied = 0
+            new_week = False
+            # IST trading days: DhanHQ stamps a day's candle at 18:30 UTC of the day before
+            for ts, open_, high, low, close in zip(candle_store.trading_days(df.index), df['Open'].values, df['High'].values,
+                                                   df['Low'].values, df['Close'].values):
+                day = ts.date()
+                if last_day is not None and day < last_day:
+                    continue
+                for name, state in states.items():
+                    started = state.update(day, float(open_), float(high), float(low), float(close))
+                    new_week |= started and name == 'Weekly'
+                last_day = day
+                applied += 1
+            self._last_day[instrument] = last_day
+
+        if new_week:
+            # A completed week changes every timeframe's rolling ranges
+            from . import utils
+            utils.invalidate_zone_cache(instrument)
+        return applied
+
+    def last_day(self, instrument):
+        return self._last_day.get(instrument)
+
+    def zones(self, instrument, timeframe='Weekly', rounded=True):
+        """(supply, demand) for the instrument's forming bar, or (None, None) without enough history."""
+        with self._lock:
+            state = self._states.get(instrument, {}).get(timeframe)
+            result = state.zones() if state else None
+        if result is None:
+            return None, None
+        supply, demand = result[0], result[1]
+        if rounded:
+            step = zone_step(instrument)
+            supply, demand = round(supply / step) * step, round(demand / step) * step
+        return supply, demand
+
+    def details(self, instrument, timeframe='Weekly'):
+        """Zone inputs for logging: base_open, rng5, rng10 and raw supply/demand."""
+        with self._lock:
+            state = self._states.get(instrument, {}).get(timeframe)
+            result = state.zones() if state else None
+        if result is None:
+            return None
+        supply, demand, rng5, rng10, base_open = result
+        return {'base_open': base_open, 'rng5': rng5, 'rng10': rng10, 'supply': supply, 'demand': demand}
+
+    def reset(self, instrument=None):
+        with self._lock:
+            if instrument is None:
+                self._states.clear()
+                self._last_day.clear()
+            else:
+                self._states.pop(instrument, None)
+                self._last_day.pop(instrument, None)
+
+
+# Global engine instance
+zone_engine = ZoneEngine()
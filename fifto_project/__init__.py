@@ -1,4 +0,0 @@
-# Temporarily disable celery import
-# from .celery import app as celery_app
-
-# __all__ = ('celery_app',)
@@ -9,8 +9,12 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 
 import os
 
+from django.apps import apps
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "fifto_project.settings")
 
 application = get_asgi_application()
+
+# Background services (render workers, notifications, schedules) run in the serving process only
+apps.get_app_config("analyzer").start_services()
@@ -113,10 +113,26 @@ ALLOW_MANUAL_REFRESH_WHEN_CLOSED = True   # Allow manual refresh even when marke
 # END DhanHQ Configuration
 # =============================================================================
 
-# Celery Configuration
-CELERY_BROKER_URL = 'redis://localhost:6379/0'
-CELERY_RESULT_BACKEND = 'redis://localhost:6379/0'
-CELERY_ACCEPT_CONTENT = ['application/json']
-CELERY_TASK_SERIALIZER = 'json'
-CELERY_RESULT_SERIALIZER = 'json'
-CELERY_TIMEZONE = 'Asia/Kolkata'
\ No newline at end of file
+# Logging Configuration (see analyzer/log_service.py)
+LOG_LEVEL = os.environ.get('FIFTO_LOG_LEVEL', 'INFO')  # DEBUG shows request/response details
+LOG_BUFFER_SIZE = 2000  # Recent entries kept in memory for the Logs page
+
+# Background Jobs (see analyzer/jobs.py) - persisted in ~/fifto_state.sqlite3, no broker needed
+JOB_WORKERS = 2  # Concurrent background analyses
+
+# Chart Rendering (see analyzer/render_service.py)
+RENDER_WORKERS = 2  # Pre-warmed matplotlib worker processes
+
+# Chart Store (see analyzer/chart_store.py) - unreferenced charts in static/charts are collected
+CHART_STORE_MAX_BYTES = 200 * 1024 * 1024  # Oldest unreferenced charts are deleted above this size
+CHART_STORE_MAX_AGE_DAYS = 7  # Unreferenced charts older than this are deleted
+
+# Automation Schedules (see analyzer/scheduler_service.py) - one leader process runs them, jobs in ~/fifto_state.sqlite3
+SCHEDULER_SYNC_SECONDS = 30  # How often the leader reloads schedules and followers retry the leader lock
+SCHEDULER_MISFIRE_GRACE_SECONDS = 10 * 60  # A run missed (e.g. during a restart) by less than this still happens
+SCHEDULE_WARMUP_SECONDS = 120  # Expiries, zones and option chains are pre-fetched this long before each run (see analyzer/warmup.py), 0 disables
+
+# LTP Probes (see analyzer/ltp_monitor.py) - index LTP polls between full P&L passes
+LTP_PROBE_SECONDS = 30  # Probe interval during market hours, 0 disables
+LTP_PROBE_BAND_PCT = 0.5  # Index move (percent) since the last full pricing that triggers a full pass
+LTP_PROBE_NEAR_PCT = 80  # Estimated P&L at this percent of a target/stoploss triggers a full pass
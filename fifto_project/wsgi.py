@@ -9,8 +9,12 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/wsgi/
 
 import os
 
+from django.apps import apps
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "fifto_project.settings")
 
 application = get_wsgi_application()
+
+# Background services (render workers, notifications, schedules) run in the serving process only
+apps.get_app_config("analyzer").start_services()